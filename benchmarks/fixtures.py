@@ -0,0 +1,103 @@
+"""
+生成基准测试用的RESX和TS资源文件
+
+文本由固定种子的随机词组组成，长度接近界面文案，并按比例包含重复文本，
+使去重、批次规划和翻译记忆的行为与真实项目接近。
+"""
+import os
+import random
+
+_WORDS = [
+    "仓库", "库位", "入库", "出库", "盘点", "拣货", "补货", "订单", "批次", "条码",
+    "数量", "单位", "供应商", "客户", "承运商", "托盘", "容器", "波次", "任务", "状态",
+    "确认", "取消", "保存", "删除", "查询", "导出", "打印", "提交", "审核", "完成",
+    "请选择", "不能为空", "已存在", "不存在", "失败", "成功", "是否继续", "操作",
+]
+
+RESX_HEADER = """<?xml version="1.0" encoding="utf-8"?>
+<root>
+  <resheader name="resmimetype">
+    <value>text/microsoft-resx</value>
+  </resheader>
+  <resheader name="version">
+    <value>2.0</value>
+  </resheader>
+  <resheader name="reader">
+    <value>System.Resources.ResXResourceReader, System.Windows.Forms, Version=4.0.0.0, Culture=neutral, PublicKeyToken=b77a5c561934e089</value>
+  </resheader>
+  <resheader name="writer">
+    <value>System.Resources.ResXResourceWriter, System.Windows.Forms, Version=4.0.0.0, Culture=neutral, PublicKeyToken=b77a5c561934e089</value>
+  </resheader>
+"""
+
+
+def generate_texts(count, duplicate_ratio=0.2, seed=0):
+    """
+    生成count条文本
+
+    Args:
+        count (int): 文本条数
+        duplicate_ratio (float): 与之前某条文本相同的比例
+        seed (int): 随机种子，相同参数生成相同内容
+
+    Returns:
+        list[str]
+    """
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        if texts and rng.random() < duplicate_ratio:
+            texts.append(rng.choice(texts))
+            continue
+        words = rng.choices(_WORDS, k=rng.randint(1, 8))
+        # 编号保证非重复文本互不相同
+        texts.append("".join(words) + f"{i}")
+    return texts
+
+
+def _xml_escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def write_resx(path, count, duplicate_ratio=0.2, seed=0):
+    """生成包含count条可翻译data的RESX文件，返回文件路径"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(RESX_HEADER)
+        for i, text in enumerate(generate_texts(count, duplicate_ratio, seed)):
+            f.write(f'  <data name="Text_{i}" xml:space="preserve">\n')
+            f.write(f"    <value>{_xml_escape(text)}</value>\n")
+            f.write("  </data>\n")
+        f.write("</root>")
+    return path
+
+
+def write_ts(path, count, duplicate_ratio=0.2, seed=0, group_size=50):
+    """生成 export default 导出的嵌套对象，每group_size个键一组，返回文件路径"""
+    texts = generate_texts(count, duplicate_ratio, seed)
+    lines = ["export default {"]
+    for start in range(0, len(texts), group_size):
+        lines.append(f"  group{start // group_size}: {{")
+        for i in range(start, min(start + group_size, len(texts))):
+            value = texts[i].replace("\\", "\\\\").replace("'", "\\'")
+            lines.append(f"    key{i}: '{value}',")
+        lines.append("  },")
+    lines.append("}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def write_ts_folder(folder, count, files=10, filename="zh-cn.ts", duplicate_ratio=0.2, seed=0):
+    """
+    生成包含files个模块目录的TS文件夹，count条文本平均分配到各文件
+
+    Returns:
+        str: 文件夹路径
+    """
+    files = max(1, min(files, count))
+    for index in range(files):
+        module = os.path.join(folder, f"module{index}")
+        os.makedirs(module, exist_ok=True)
+        share = count // files + (1 if index < count % files else 0)
+        write_ts(os.path.join(module, filename), share, duplicate_ratio, seed + index)
+    return folder
@@ -0,0 +1,284 @@
+"""
+本地模拟翻译服务，用于在没有真实模型端点时测量吞吐量
+
+同一个服务同时提供:
+    POST {url}/chat/completions   OpenAI兼容接口，支持stream=true的SSE响应
+    POST {url}/translate          DeepLX接口，text可以是字符串或数组
+
+可以单独运行，供界面或命令行模式手动测试:
+    python -m benchmarks.mock_servers --port 18080 --latency 0.2 --tokens-per-second 200
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from services.batch_planner import estimate_tokens
+
+# 译文前缀，便于确认输出来自模拟服务
+TRANSLATION_PREFIX = "译:"
+
+_JSON_TAIL = re.compile(r'(\{[\s\S]*\})\s*$')
+
+
+def percentile(values, pct):
+    """最近秩法百分位数，没有数据时返回None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class MockStats:
+    """服务端统计，所有处理线程共享"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.inflight = 0
+            self.max_inflight = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.latencies = []
+
+    def begin(self):
+        with self._lock:
+            self.requests += 1
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+
+    def end(self, seconds, error=False, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            self.inflight -= 1
+            self.latencies.append(seconds)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            if error:
+                self.errors += 1
+
+    def snapshot(self):
+        """返回统计快照，延迟为服务端从收到请求到响应写完的时间"""
+        with self._lock:
+            latencies = list(self.latencies)
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "max_inflight": self.max_inflight,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95)
+            }
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端进程退出时会断开保持中的连接，不是服务端错误
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockBackendServer:
+    """
+    模拟的ChatGPT和DeepLX服务
+
+    Args:
+        latency (float): 每个请求的基础延迟（秒）
+        jitter (float): 在基础延迟上随机增加 0~jitter 秒
+        error_rate (float): 返回503的概率，用于测量重试的影响
+        tokens_per_second (float): 模拟生成速度，按译文token数增加延迟，0表示不模拟
+        host (str): 监听地址
+        port (int): 监听端口，0表示自动分配
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, tokens_per_second=0.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self.stats = MockStats()
+        self._server = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """在当前线程运行，直到按Ctrl+C"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(_MockHandler):
+            backend = server
+
+        return Handler
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    backend = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        backend = self.backend
+        started = time.monotonic()
+        backend.stats.begin()
+        prompt_tokens = completion_tokens = 0
+        error = False
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(backend.latency + random.uniform(0, backend.jitter))
+
+            if random.random() < backend.error_rate:
+                error = True
+                self._send_json(503, {"error": "mock overloaded"})
+                return
+
+            if self.path.endswith("/chat/completions"):
+                content = self._translate_chat(body)
+                prompt_tokens = estimate_tokens(json.dumps(body.get("messages", []), ensure_ascii=False))
+                completion_tokens = estimate_tokens(content)
+                if body.get("stream"):
+                    usage = None
+                    if (body.get("stream_options") or {}).get("include_usage"):
+                        usage = {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens
+                        }
+                    self._stream_chat(content, usage)
+                else:
+                    self._generate_delay(completion_tokens)
+                    self._send_json(200, {
+                        "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens
+                        }
+                    })
+            elif self.path.endswith("/translate"):
+                text = body.get("text")
+                if isinstance(text, list):
+                    data = [TRANSLATION_PREFIX + item for item in text]
+                    completion_tokens = sum(estimate_tokens(item) for item in data)
+                else:
+                    data = TRANSLATION_PREFIX + (text or "")
+                    completion_tokens = estimate_tokens(data)
+                self._generate_delay(completion_tokens)
+                self._send_json(200, {"code": 200, "data": data})
+            else:
+                error = True
+                self._send_json(404, {"error": "not found"})
+        except (BrokenPipeError, ConnectionResetError):
+            error = True
+        finally:
+            backend.stats.end(time.monotonic() - started, error, prompt_tokens, completion_tokens)
+
+    def _translate_chat(self, body):
+        """批量请求按JSON逐个值加前缀返回，单条请求返回原文加前缀"""
+        messages = body.get("messages") or [{"content": ""}]
+        prompt = messages[-1].get("content", "")
+        match = _JSON_TAIL.search(prompt)
+        if match:
+            try:
+                texts = json.loads(match.group(1))
+                return json.dumps({key: TRANSLATION_PREFIX + value for key, value in texts.items()}, ensure_ascii=False)
+            except (json.JSONDecodeError, AttributeError, TypeError):
+                pass
+        return TRANSLATION_PREFIX + prompt.split("\n\n", 1)[-1]
+
+    def _generate_delay(self, tokens):
+        if self.backend.tokens_per_second > 0:
+            time.sleep(tokens / self.backend.tokens_per_second)
+
+    def _stream_chat(self, content, usage=None):
+        """按模拟的生成速度分段发送SSE事件，usage不为None时在最后单独发送一个用量事件"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = 16
+        for i in range(0, len(content), step):
+            piece = content[i:i + step]
+            event = {"choices": [{"delta": {"content": piece}, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self._generate_delay(estimate_tokens(piece))
+        event = {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+        self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        if usage is not None:
+            self._write_chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="运行模拟的ChatGPT和DeepLX服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency", type=float, default=0.05, help="基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机增加的最大延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503的概率")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="模拟生成速度，0表示不模拟")
+    args = parser.parse_args(argv)
+
+    server = MockBackendServer(
+        args.latency, args.jitter, args.error_rate, args.tokens_per_second, args.host, args.port
+    )
+    print(f"模拟服务已启动: {server.url}  (ChatGPT: {server.url}/chat/completions, DeepLX: {server.url}/translate)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
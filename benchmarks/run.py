@@ -0,0 +1,255 @@
+"""
+吞吐量基准测试：在本地模拟服务上测量批次大小、并发数和后端对翻译速度的影响
+
+每个场景在独立的子进程中运行，峰值内存互不影响；模拟服务在主进程中运行并统计请求。
+
+示例:
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1000,100000 --backends ChatGPT --concurrency 4,8,16 \\
+        --batch-token-budget 1500,3000,6000 --latency 0.5 --tokens-per-second 300 --json result.json
+
+输出指标:
+    entries/s   每秒完成的条目数（含去重合并的条目）
+    requests    发送到模拟服务的请求数（含重试）
+    p50/p95     服务端处理单个请求的时间
+    peak RSS    翻译进程的峰值常驻内存
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.fixtures import write_resx, write_ts_folder
+from benchmarks.mock_servers import MockBackendServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = ["resx", "ts-folder"]
+BACKENDS = ["DeepLX", "ChatGPT"]
+
+
+def split_list(value, convert=str):
+    return [convert(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="在本地模拟服务上测量翻译吞吐量")
+    parser.add_argument("--sizes", default="100,1000,10000", help="条目数，逗号分隔（100~100000）")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="resx、ts-folder，逗号分隔")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="DeepLX、ChatGPT，逗号分隔")
+    parser.add_argument("--concurrency", default="8", help="max_concurrent_requests，逗号分隔")
+    parser.add_argument("--batch-token-budget", default="3000", help="batch_token_budget，逗号分隔")
+    parser.add_argument("--ts-files", type=int, default=10, help="ts-folder场景的文件数，条目平均分配")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="重复文本的比例")
+    parser.add_argument("--streaming", action="store_true", help="ChatGPT使用流式响应")
+    parser.add_argument("--native-batch", action="store_true", help="DeepLX使用数组批量请求")
+
+    server = parser.add_argument_group("模拟服务")
+    server.add_argument("--latency", type=float, default=0.05, help="每个请求的基础延迟（秒）")
+    server.add_argument("--jitter", type=float, default=0.02, help="随机增加的最大延迟（秒）")
+    server.add_argument("--error-rate", type=float, default=0.0, help="返回503的概率")
+    server.add_argument("--tokens-per-second", type=float, default=0.0, help="模拟生成速度，0表示不模拟")
+
+    parser.add_argument("--work-dir", help="生成测试文件的目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("--json", help="将结果保存为JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB），无法获取时返回None"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux为KB，macOS为字节
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def run_worker(scenario):
+    """在子进程中运行一个场景，结果以JSON输出到标准输出的最后一行"""
+    import logging
+    # 先配置日志，翻译器中的basicConfig不会再输出INFO日志
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+
+    from cli import OverrideConfig
+    from config import Config
+    from services.deeplx_service import DeepLXService
+    from services.chatgpt_service import ChatGPTService
+    from translators.resx_translator import ResxTranslator
+    from translators.ts_translator import TsTranslator
+
+    overrides = {
+        "api_type": scenario["backend"],
+        "deeplx_url": scenario["url"],
+        "chatgpt_base": scenario["url"],
+        "chatgpt_key": "benchmark",
+        "chatgpt_model": "mock",
+        "target_lang": "英语",
+        "max_concurrent_requests": scenario["concurrency"],
+        "batch_token_budget": scenario["token_budget"],
+        "enable_streaming": scenario["streaming"],
+        "deeplx_native_batch": scenario["native_batch"],
+        "retry_base_delay": 0.1,
+        # 每次都完整翻译，不受翻译记忆、增量模式和断点日志影响
+        "enable_translation_memory": False,
+        "incremental_mode": False,
+        "enable_checkpoint": False
+    }
+    config = OverrideConfig(Config(os.path.join(scenario["work_dir"], "config.json")), overrides)
+    if scenario["backend"] == "DeepLX":
+        service = DeepLXService(config)
+    else:
+        service = ChatGPTService(config)
+
+    started = time.monotonic()
+    if scenario["target"] == "resx":
+        translator = ResxTranslator(config, service)
+        name, ext = os.path.splitext(scenario["path"])
+        success, message = translator.translate_file(scenario["path"], f"{name}.EN{ext}")
+    else:
+        translator = TsTranslator(config, service)
+        success, message = translator.scan_folder(scenario["path"], "zh-cn.ts", "英语")
+    seconds = time.monotonic() - started
+
+    print(json.dumps({
+        "success": success,
+        "message": message if not success else "",
+        "seconds": seconds,
+        "peak_rss_mb": peak_rss_mb()
+    }, ensure_ascii=False))
+
+
+def prepare_fixture(work_dir, target, size, args):
+    """生成（或复用已生成的）测试文件，返回路径"""
+    if target == "resx":
+        path = os.path.join(work_dir, f"Strings_{size}.resx")
+        if not os.path.exists(path):
+            write_resx(path, size, args.duplicate_ratio)
+        return path
+    folder = os.path.join(work_dir, f"locales_{size}")
+    if not os.path.exists(folder):
+        write_ts_folder(folder, size, args.ts_files, duplicate_ratio=args.duplicate_ratio)
+    return folder
+
+
+def run_scenario(server, scenario):
+    """在子进程中运行场景，合并服务端统计"""
+    server.stats.reset()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--worker", json.dumps(scenario, ensure_ascii=False)],
+        cwd=scenario["work_dir"],
+        env=env,
+        capture_output=True,
+        text=True,
+        encoding="utf-8"
+    )
+    lines = process.stdout.strip().splitlines()
+    if process.returncode != 0 or not lines:
+        raise RuntimeError(f"场景运行失败: {process.stderr.strip()[-2000:]}")
+    result = json.loads(lines[-1])
+    result.update(server.stats.snapshot())
+    result["entries_per_second"] = scenario["size"] / result["seconds"] if result["seconds"] else None
+    return result
+
+
+def format_row(values, widths):
+    return "  ".join(str(value).rjust(width) for value, width in zip(values, widths))
+
+
+def print_report(rows):
+    headers = ["target", "backend", "entries", "conc", "budget", "seconds", "entries/s",
+               "requests", "errors", "p50 ms", "p95 ms", "inflight", "peak MB"]
+    widths = [9, 7, 7, 4, 6, 8, 9, 8, 6, 7, 7, 8, 7]
+
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f}"
+
+    print(format_row(headers, widths))
+    for row in rows:
+        print(format_row([
+            row["target"],
+            row["backend"],
+            row["size"],
+            row["concurrency"],
+            row["token_budget"],
+            f"{row['seconds']:.2f}",
+            f"{row['entries_per_second']:.0f}" if row["entries_per_second"] else "-",
+            row["requests"],
+            row["errors"],
+            ms(row["latency_p50"]),
+            ms(row["latency_p95"]),
+            row["max_inflight"],
+            f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "-"
+        ], widths))
+        if not row["success"]:
+            print(f"  失败: {row['message']}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.worker:
+        run_worker(json.loads(args.worker))
+        return 0
+
+    work_dir = os.path.abspath(args.work_dir) if args.work_dir else tempfile.mkdtemp(prefix="translator_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    rows = []
+    server = MockBackendServer(args.latency, args.jitter, args.error_rate, args.tokens_per_second).start()
+    try:
+        for target in split_list(args.targets):
+            for size in split_list(args.sizes, int):
+                path = prepare_fixture(work_dir, target, size, args)
+                for backend in split_list(args.backends):
+                    for concurrency in split_list(args.concurrency, int):
+                        for token_budget in split_list(args.batch_token_budget, int):
+                            scenario = {
+                                "target": target,
+                                "backend": backend,
+                                "size": size,
+                                "concurrency": concurrency,
+                                "token_budget": token_budget,
+                                "streaming": args.streaming,
+                                "native_batch": args.native_batch,
+                                "path": path,
+                                "url": server.url,
+                                "work_dir": work_dir
+                            }
+                            print(f"运行 {target} / {backend} / {size} 条 / 并发 {concurrency} / 预算 {token_budget} ...",
+                                  file=sys.stderr)
+                            result = run_scenario(server, scenario)
+                            rows.append(dict(scenario, **result))
+    except KeyboardInterrupt:
+        print("已中断", file=sys.stderr)
+    finally:
+        server.stop()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(rows)
+    if args.json:
+        settings = {
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "tokens_per_second": args.tokens_per_second
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"server": settings, "results": rows}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+"""
+命令行模式：不启动界面，直接翻译RESX和TS文件，适合CI和定时任务
+
+示例:
+    python main.py src/Resources/*.resx -l 英语 --summary summary.json
+    python main.py web/src/locales --type ts --pattern zh-cn.ts -l ja --api-type ChatGPT
+    python main.py src/Resources/Strings.resx -l EN,ja,ko,de
+    python main.py web/src/locales --type ts -l 英语 --dry-run
+
+退出码: 0 全部成功，1 有文件或条目翻译失败，2 参数错误，130 被中断
+"""
+import os
+import sys
+import json
+import glob
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import Config
+from services.deeplx_service import DeepLXService
+from services.chatgpt_service import ChatGPTService
+from services.log_setup import setup_logging
+from services.metrics import write_prometheus, record_throughput, history_path
+from translators.base_translator import merge_estimates
+from translators.resx_translator import ResxTranslator
+from translators.ts_translator import TsTranslator
+
+# 与界面中可选的目标语言一致
+LANGUAGES = ["英语", "简体中文", "繁体中文", "日语", "韩语", "德语", "法语",
+             "西班牙语", "葡萄牙语", "意大利语", "俄语", "荷兰语", "波兰语", "泰语", "乌克兰语"]
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+class OverrideConfig:
+    """在Config之上叠加命令行参数，修改只在本次运行中生效，不写回配置文件"""
+
+    def __init__(self, base, overrides=None):
+        self.base = base
+        self.overrides = dict(overrides or {})
+
+    def get(self, key, default=None):
+        if key in self.overrides:
+            return self.overrides[key]
+        return self.base.get(key, default)
+
+    def set(self, key, value):
+        self.overrides[key] = value
+
+    def get_all(self):
+        config = self.base.get_all()
+        config.update(self.overrides)
+        return config
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="resource-translator",
+        description="不启动界面翻译RESX和TS资源文件"
+    )
+    parser.add_argument("inputs", nargs="+", help="文件、文件夹或通配符（支持 **）")
+    parser.add_argument("-t", "--type", choices=["auto", "resx", "ts"], default="auto",
+                        help="文件类型，auto按扩展名判断，文件夹默认按TS处理")
+    parser.add_argument("--pattern", help="文件夹中要查找的文件名，TS默认 zh-cn.ts，RESX默认 *.resx")
+    parser.add_argument("-l", "--target-lang", action="append",
+                        help="目标语言名称（如 英语）或代码（如 EN、ja），默认使用配置；"
+                             "可重复或用逗号分隔指定多个语言，源文件只解析一次")
+    parser.add_argument("-o", "--output", help="输出文件，只能用于单个RESX文件和单个目标语言")
+    parser.add_argument("--summary", help="JSON运行汇总的输出路径，- 表示标准输出，包含各阶段耗时和token用量")
+    parser.add_argument("--metrics-prometheus", metavar="PATH",
+                        help="同时将指标写为Prometheus文本格式（可供node_exporter textfile收集器读取）")
+
+    backend = parser.add_argument_group("翻译服务")
+    backend.add_argument("--config", help="配置文件路径，默认 ~/.resource_translator.json")
+    backend.add_argument("--api-type", choices=["DeepLX", "ChatGPT"])
+    backend.add_argument("--deeplx-url")
+    backend.add_argument("--chatgpt-base")
+    backend.add_argument("--chatgpt-key", help="也可以通过环境变量 RESOURCE_TRANSLATOR_CHATGPT_KEY 设置")
+    backend.add_argument("--model", dest="chatgpt_model")
+    backend.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                         help="覆盖任意配置项，值按JSON解析（如 --set enable_streaming=true）")
+
+    concurrency = parser.add_argument_group("并发")
+    concurrency.add_argument("--max-concurrent-requests", type=int)
+    concurrency.add_argument("--max-concurrent-files", type=int)
+    concurrency.add_argument("--batch-token-budget", type=int)
+
+    parser.add_argument("--dry-run", action="store_true",
+                        help="只解析文件，预估请求数、token数和耗时，不调用翻译接口，不写出文件")
+    parser.add_argument("--incremental", action="store_true", default=None, help="只翻译新增或原文有变化的键")
+    parser.add_argument("--no-memory", action="store_true", help="不使用翻译记忆")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出进度")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出详细日志")
+    return parser
+
+
+def parse_overrides(args):
+    """将命令行参数转换为配置覆盖项"""
+    overrides = {}
+    for item in args.set:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"--set 参数格式应为 KEY=VALUE: {item}")
+        try:
+            overrides[key] = json.loads(value)
+        except json.JSONDecodeError:
+            overrides[key] = value
+
+    chatgpt_key = args.chatgpt_key or os.environ.get("RESOURCE_TRANSLATOR_CHATGPT_KEY")
+    for key, value in (
+        ("api_type", args.api_type),
+        ("deeplx_url", args.deeplx_url),
+        ("chatgpt_base", args.chatgpt_base),
+        ("chatgpt_key", chatgpt_key),
+        ("chatgpt_model", args.chatgpt_model),
+        ("max_concurrent_requests", args.max_concurrent_requests),
+        ("max_concurrent_files", args.max_concurrent_files),
+        ("batch_token_budget", args.batch_token_budget),
+        ("incremental_mode", args.incremental),
+    ):
+        if value is not None:
+            overrides[key] = value
+    if args.no_memory:
+        overrides["enable_translation_memory"] = False
+    return overrides
+
+
+def resolve_language(value, translator):
+    """接受语言名称或代码，返回配置中使用的语言名称"""
+    for name in LANGUAGES:
+        if value == name or value.upper() == translator.get_language_code(name):
+            return name
+    raise ValueError(f"不支持的目标语言: {value}，可选: {', '.join(LANGUAGES)}")
+
+
+def resolve_languages(values, translator):
+    """展开可重复、逗号分隔的 -l 参数，去掉重复的语言并保持顺序"""
+    languages = []
+    for value in values:
+        for item in value.replace("，", ",").split(","):
+            if item.strip():
+                name = resolve_language(item.strip(), translator)
+                if name not in languages:
+                    languages.append(name)
+    if not languages:
+        raise ValueError("未指定目标语言")
+    return languages
+
+
+def create_translation_service(config):
+    if config.get("api_type", "DeepLX") == "DeepLX":
+        return DeepLXService(config)
+    return ChatGPTService(config)
+
+
+def detect_type(path, requested):
+    if requested != "auto":
+        return requested
+    if os.path.isdir(path):
+        return "ts"
+    return "resx" if path.lower().endswith(".resx") else "ts"
+
+
+def is_translated_resx(path, translator):
+    """判断是否是已翻译的输出文件（名称.语言代码.resx）"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    suffix = os.path.splitext(stem)[1][1:]
+    return bool(suffix) and any(suffix.upper() == translator.get_language_code(name) for name in LANGUAGES)
+
+
+def collect_jobs(args, resx_translator):
+    """
+    展开输入参数
+
+    Returns:
+        tuple: (RESX文件列表, TS文件列表, TS文件夹列表)
+    """
+    resx_files, ts_files, ts_folders = [], [], []
+    for pattern in args.inputs:
+        is_glob = glob.has_magic(pattern)
+        matches = sorted(glob.glob(pattern, recursive=True)) if is_glob else [pattern]
+        if not matches:
+            raise ValueError(f"没有匹配的文件: {pattern}")
+        for path in matches:
+            if not os.path.exists(path):
+                raise ValueError(f"文件不存在: {path}")
+            file_type = detect_type(path, args.type)
+            # 通配符会同时匹配到之前生成的译文文件，跳过
+            if is_glob and file_type == "resx" and is_translated_resx(path, resx_translator):
+                continue
+            if os.path.isdir(path):
+                if file_type == "ts":
+                    ts_folders.append(path)
+                else:
+                    folder_pattern = os.path.join(path, "**", args.pattern or "*.resx")
+                    resx_files.extend(
+                        found for found in sorted(glob.glob(folder_pattern, recursive=True))
+                        if not is_translated_resx(found, resx_translator)
+                    )
+            elif file_type == "resx":
+                resx_files.append(path)
+            else:
+                ts_files.append(path)
+    if args.output and (len(resx_files) != 1 or ts_files or ts_folders):
+        raise ValueError("--output 只能用于单个RESX文件")
+    return resx_files, ts_files, ts_folders
+
+
+class ProgressPrinter:
+    """将进度输出到标准错误，每秒最多一次"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.last = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, label):
+        def callback(progress, current, total, status=None):
+            if not self.enabled:
+                return
+            with self._lock:
+                now = time.monotonic()
+                if now - self.last < 1 and progress < 100:
+                    return
+                self.last = now
+            line = f"[{label}] {progress:5.1f}% ({current}/{total})"
+            if status:
+                line += " " + status.replace("\n", " ")
+            print(line, file=sys.stderr)
+        return callback
+
+
+def run(args):
+    base = Config(args.config)
+    config = OverrideConfig(base, parse_overrides(args))
+
+    service = create_translation_service(config)
+    resx_translator = ResxTranslator(config, service)
+    ts_translator = TsTranslator(config, service)
+
+    target_langs = resolve_languages(args.target_lang or [config.get("target_lang", "英语")], resx_translator)
+    config.set("target_lang", target_langs[0])
+    if args.output and len(target_langs) > 1:
+        raise ValueError("--output 只能用于单个目标语言")
+    resx_files, ts_files, ts_folders = collect_jobs(args, resx_translator)
+
+    progress = ProgressPrinter(not args.quiet)
+    started_at = datetime.now()
+    started = time.monotonic()
+    results = []
+    results_lock = threading.Lock()
+
+    def translate_one(file_type, translator, file_path, outputs):
+        if service.cancel_translation:
+            return
+        file_started = time.monotonic()
+        # 每个文件只解析一次，所有目标语言共用同一个并发请求池
+        file_results = translator.translate_file_languages(file_path, outputs, progress(os.path.basename(file_path)))
+        seconds = time.monotonic() - file_started
+        with results_lock:
+            for lang, result in file_results.items():
+                result.update(type=file_type, file=file_path, target_lang=lang, output=outputs[lang], seconds=seconds)
+                results.append(result)
+
+    # 单独列出的文件由文件级线程池并发翻译，文件夹由scan_folder自行并发
+    jobs = []
+    for file_path in resx_files:
+        name, ext = os.path.splitext(file_path)
+        outputs = {
+            lang: args.output or f"{name}.{resx_translator.get_language_code(lang)}{ext}"
+            for lang in target_langs
+        }
+        jobs.append(("resx", resx_translator, file_path, outputs))
+    for file_path in ts_files:
+        outputs = {
+            lang: os.path.join(os.path.dirname(file_path), f"{ts_translator.get_language_file_code(lang)}.ts")
+            for lang in target_langs
+        }
+        jobs.append(("ts", ts_translator, file_path, outputs))
+
+    if args.dry_run:
+        return run_estimate(args, config, jobs, ts_folders, ts_translator, target_langs)
+
+    try:
+        if jobs:
+            max_workers = max(1, min(int(config.get("max_concurrent_files", 4)), len(jobs)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(translate_one, *job) for job in jobs]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except KeyboardInterrupt:
+                    # 退出with前先取消，否则会等待所有文件翻译完
+                    service.cancel()
+                    raise
+
+        for folder in ts_folders:
+            if service.cancel_translation:
+                break
+            pattern = args.pattern or "zh-cn.ts"
+            success, message = ts_translator.scan_folder(folder, pattern, target_langs, progress(folder))
+            if not ts_translator.file_results and not success:
+                logging.error(message)
+            for result in ts_translator.file_results:
+                results.append(dict(
+                    result,
+                    type="ts",
+                    file=os.path.join(folder, result["file"]),
+                    output=result["output"]
+                ))
+    except KeyboardInterrupt:
+        # 取消所有正在进行的请求，已完成的文件保留在汇总中
+        service.cancel()
+        logging.warning("已中断，正在停止所有翻译")
+        interrupted = True
+    else:
+        interrupted = False
+
+    summary = build_summary(config, target_langs, results, started_at, time.monotonic() - started, interrupted)
+    summary["metrics"] = service.metrics.report()
+    # 记录实测速度，供之后 --dry-run 和界面预估耗时
+    record_throughput(
+        history_path(config),
+        service.backend,
+        getattr(service, "model_name", ""),
+        summary["metrics"],
+        service.request_concurrency()
+    )
+    write_summary(summary, args.summary)
+    metrics_path = args.metrics_prometheus or config.get("metrics_prometheus_path", "")
+    if metrics_path:
+        write_prometheus(metrics_path, service.metrics.to_prometheus({"backend": service.backend}))
+
+    if interrupted:
+        return EXIT_INTERRUPTED
+    return EXIT_OK if summary["success"] else EXIT_FAILED
+
+
+def run_estimate(args, config, jobs, ts_folders, ts_translator, target_langs):
+    """
+    --dry-run：解析所有文件，按与实际翻译相同的去重、翻译记忆、增量模式和批次规划预估工作量
+
+    不调用翻译接口，也不写出任何文件。预估汇总输出到标准输出，--summary 指定时同时保存JSON。
+    """
+    files = []
+    for file_type, translator, file_path, outputs in jobs:
+        estimate = translator.estimate_file_languages(file_path, outputs)
+        files.append(dict(estimate, type=file_type, source=file_path, target_langs=list(outputs)))
+    for folder in ts_folders:
+        estimate = ts_translator.estimate_folder(folder, args.pattern or "zh-cn.ts", target_langs)
+        files.append(dict(estimate, type="ts-folder", source=folder, target_langs=target_langs))
+
+    errors = [f"{item['source']}: {item['error']}" for item in files if item.get("error")]
+    for item in files:
+        errors.extend(f"{item['source']}: {error}" for error in item.get("errors", []))
+    totals = merge_estimates(item for item in files if not item.get("error"))
+    # 单独列出的文件按文件级线程池并发，文件夹内的文件由scan_folder并发
+    file_count = sum(1 for item in files if item["type"] != "ts-folder") + sum(
+        item.get("files", 0) for item in files if item["type"] == "ts-folder"
+    )
+    totals["files"] = file_count
+    totals["errors"] = errors
+    parallel_files = max(1, min(int(config.get("max_concurrent_files", 4)), file_count))
+    ts_translator.finish_estimate(totals, parallel_files)
+
+    summary = {
+        "dry_run": True,
+        "api_type": config.get("api_type", "DeepLX"),
+        "target_langs": target_langs,
+        "totals": totals,
+        "files": files
+    }
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.summary and args.summary != "-":
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text if args.summary == "-" else ts_translator.format_estimate(totals))
+    return EXIT_FAILED if errors else EXIT_OK
+
+
+def build_summary(config, target_langs, results, started_at, seconds, interrupted=False):
+    """生成机器可读的运行汇总，同时翻译多个语言时每个输出文件一项"""
+    files = [
+        {
+            "type": result["type"],
+            "source": result["file"],
+            "target_lang": result["target_lang"],
+            "output": result["output"],
+            "success": result["success"],
+            "translated": result["translated"],
+            "failed": result["failed"],
+            "unchanged": result["unchanged"],
+            "seconds": round(result["seconds"], 3),
+            "message": result["message"]
+        }
+        for result in sorted(results, key=lambda result: (result["file"], target_langs.index(result["target_lang"])))
+    ]
+    failed_files = sum(1 for result in files if not result["success"])
+    failed_entries = sum(result["failed"] for result in files)
+    return {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "seconds": round(seconds, 3),
+        "api_type": config.get("api_type", "DeepLX"),
+        "target_langs": target_langs,
+        "interrupted": interrupted,
+        "success": not interrupted and bool(files) and failed_files == 0 and failed_entries == 0,
+        "totals": {
+            "files": len(files),
+            "failed_files": failed_files,
+            "translated": sum(result["translated"] for result in files),
+            "failed": failed_entries,
+            "unchanged": sum(result["unchanged"] for result in files)
+        },
+        "files": files
+    }
+
+
+def write_summary(summary, path):
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if path == "-":
+        print(text)
+    elif path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    totals = summary["totals"]
+    print(
+        f"翻译{'完成' if summary['success'] else '未完成'}: {totals['files']} 个文件，"
+        f"失败 {totals['failed_files']} 个，成功翻译 {totals['translated']} 条，失败 {totals['failed']} 条，"
+        f"耗时 {summary['seconds']:.1f} 秒",
+        file=sys.stderr
+    )
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # 先配置日志，只输出到标准错误，翻译器中的setup_logging不会再添加日志文件
+    setup_logging(level=logging.INFO if args.verbose else logging.WARNING, log_file=False, stream=sys.stderr)
+
+    try:
+        return run(args)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return EXIT_USAGE
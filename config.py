@@ -3,8 +3,8 @@ import json
 import logging
 
 class Config:
-    def __init__(self):
-        self.config_file = os.path.join(os.path.expanduser("~"), ".resource_translator.json")
+    def __init__(self, config_file=None):
+        self.config_file = config_file or os.path.join(os.path.expanduser("~"), ".resource_translator.json")
         self.default_config = {
             "api_type": "DeepLX",
             "deeplx_url": "",
@@ -12,8 +12,48 @@ class Config:
             "chatgpt_key": "",
             "chatgpt_model": "gemma3:27b",
             "target_lang": "英语",
-            "enable_logging": False,
-            "batch_size": 5,
+            "extra_target_langs": [],  # 同时翻译的其他目标语言，源文件只解析一次
+            "enable_logging": False,  # 记录每个请求的详细日志（含请求和响应内容）
+            "log_payload_max_chars": 2000,  # 日志中单个请求或响应内容的最大字符数，超出部分截断，0表示不截断
+            "log_payload_sample_rate": 1.0,  # 记录请求和响应内容的请求比例，大批量翻译时可调低
+            "log_max_bytes": 10485760,  # 单个日志文件的大小上限，超过后轮转
+            "log_backup_count": 5,  # 保留的轮转日志文件数
+            "batch_token_budget": 3000,  # 每个批量请求的输入加输出token预算
+            "batch_max_entries": 100,  # 每个批次的最大条目数
+            "output_token_ratio": 1.5,  # 估算译文token时相对原文的膨胀系数
+            "max_output_tokens": 8192,  # 单个请求max_tokens的上限
+            "enable_streaming": False,  # ChatGPT使用流式响应，逐条提交译文并实时更新进度
+            "stream_include_usage": True,  # 流式响应时请求返回token用量（stream_options），服务端不支持时关闭
+            "chatgpt_rpm": 0,  # ChatGPT每分钟请求数上限，0表示不限制
+            "chatgpt_tpm": 0,  # ChatGPT每分钟token数上限，0表示不限制
+            "deeplx_rpm": 0,  # DeepLX每分钟请求数上限，0表示不限制
+            "deeplx_max_concurrent": 8,  # DeepLX同时进行的请求数，取代max_concurrent_requests
+            "deeplx_native_batch": False,  # DeepLX服务支持数组形式的text时，一个请求发送多条文本
+            "deeplx_native_batch_size": 50,  # 原生批量模式下每个请求的最大文本数
+            "max_retries": 3,  # 429/5xx及网络错误的最大重试次数
+            "retry_base_delay": 1.0,  # 指数退避的基础等待时间（秒）
+            "retry_max_delay": 60.0,  # 单次重试的最长等待时间（秒）
+            "deeplx_endpoints": [],  # 多个DeepLX实例 [{"url": ..., "weight": 1}]，为空时使用deeplx_url
+            "chatgpt_endpoints": [],  # 多个网关/key [{"url": ..., "key": ..., "weight": 1}]，为空时使用chatgpt_base和chatgpt_key（多个时按位置对应）
+            "load_balance_strategy": "least_outstanding",  # least_outstanding 或 weighted_round_robin
+            "endpoint_failure_threshold": 3,  # 连续失败多少次后暂时剔除端点
+            "endpoint_ejection_seconds": 30,  # 首次剔除时长（秒），再次剔除时加倍
+            "max_concurrent_requests": 4,  # 同时进行的批量请求数量
+            "max_concurrent_files": 4,  # 文件夹翻译时同时翻译的文件数量
+            "http_pool_size": 10,  # 每个主机保持的长连接数量
+            "http_connect_timeout": 10,  # 连接超时（秒）
+            "http_read_timeout": 60,  # 读取超时（秒）
+            "enable_translation_memory": True,  # 启用本地翻译记忆缓存
+            "tm_max_entries": 200000,  # 翻译记忆最大条目数，超出后清理最久未使用的条目
+            "tm_lru_size": 10000,  # 进程内LRU缓存条目数
+            "incremental_mode": False,  # 增量翻译：只翻译新增或原文有变化的键
+            "resx_output_mode": "preserve",  # RESX输出方式：preserve只替换译文所在位置，rewrite重新生成整个XML
+            "preview_sample_size": 5,  # 预览时随机翻译的条目数，作为一个批次请求，译文在执行翻译时复用
+            "enable_checkpoint": True,  # 断点续传：完成的批次写入断点日志，中断后再次运行只翻译剩余条目
+            "checkpoint_flush_interval": 60,  # 每隔多少秒写出一次部分结果，0表示只在完成或取消时写出
+            "save_run_report": True,  # 界面翻译完成后将性能指标保存为 logs/run_时间.json
+            "metrics_prometheus_path": "",  # 非空时同时写出Prometheus文本格式的指标，供textfile收集器读取
+            "throughput_history_path": "",  # 记录每次运行实测速度的文件，用于预估耗时，为空时使用 ~/.resource_translator_history.json
             "system_prompt": (
                 "你是一名经验丰富的翻译员，负责将指定文本翻译成目标语言，并确保译文准确、流畅且符合本地语言习惯。"
                 "你的目标是提供自然、专业的翻译，忠实传达原文的意义和语气，同时适应仓储系统的行业特点和专业术语。"
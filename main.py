@@ -1,7 +1,18 @@
-import tkinter as tk
-from ui.main_window import MainWindow
+import sys
 
-if __name__ == "__main__":
+
+def start_gui():
+    import tkinter as tk
+    from ui.main_window import MainWindow
+    
     root = tk.Tk()
     app = MainWindow(root)
-    root.mainloop() 
\ No newline at end of file
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    # 带参数时以命令行模式运行，不加载tkinter
+    if len(sys.argv) > 1:
+        from cli import main
+        sys.exit(main())
+    start_gui() 
\ No newline at end of file
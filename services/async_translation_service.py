@@ -0,0 +1,111 @@
+import abc
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncTranslationService(abc.ABC):
+    """批次调度器：在事件循环中调度批次，由线程池执行阻塞的HTTP请求
+
+    包装一个同步翻译服务，复用其配置、连接池和取消标志。请求仍是同步的requests调用，
+    每个请求占用线程池中的一个线程，并发上限就是服务的并发请求数，与直接使用同样大小的线程池相同。
+    事件循环只负责按完成顺序回调、在回调线程中汇总进度，以及让多个语言的批次共用同一个并发上限。
+    每次run()创建新的事件循环和线程池，运行结束（或取消）后关闭。
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.config = service.config
+        # 同时进行的请求数，由服务决定（DeepLX逐条请求时使用deeplx_max_concurrent）
+        self.max_concurrent = service.request_concurrency()
+        self._executor = None
+        self._semaphore = None
+
+    @property
+    def cancel_translation(self):
+        return self.service.cancel_translation
+
+    def cancel(self):
+        """取消翻译过程"""
+        self.service.cancel()
+
+    @abc.abstractmethod
+    async def batch_translate(self, texts_dict, target_lang, on_entry=None, stats=None):
+        """在线程池中批量翻译多个文本，on_entry在事件循环线程中逐条回调，stats为调用方的计数器"""
+        pass
+
+    async def _request(self, func, *args, **kwargs):
+        """在受信号量限制的线程池中执行一次阻塞请求，已取消时返回None"""
+        queued = time.monotonic()
+        async with self._semaphore:
+            self.service.metrics.observe("queue_wait", time.monotonic() - queued)
+            if self.cancel_translation:
+                return None
+            loop = asyncio.get_running_loop()
+            with self.service.metrics.track_inflight():
+                return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def _threadsafe(self, callback):
+        """包装回调，使工作线程中的调用转到事件循环线程执行"""
+        if callback is None:
+            return None
+        loop = asyncio.get_running_loop()
+        return lambda *args: loop.call_soon_threadsafe(callback, *args)
+
+    async def _gather_batches(self, batches, target_lang, on_batch_done=None, on_entry=None, stats=None):
+        async def run_batch(index, texts_dict):
+            entry_callback = None
+            if on_entry:
+                entry_callback = lambda key, translation: on_entry(index, key, translation)
+            lang = target_lang[index] if isinstance(target_lang, (list, tuple)) else target_lang
+            return index, await self.batch_translate(texts_dict, lang, entry_callback, stats)
+
+        tasks = [asyncio.create_task(run_batch(i, texts)) for i, texts in enumerate(batches)]
+        results = [None] * len(batches)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                results[index] = result or {}
+                if self.cancel_translation:
+                    break
+                if on_batch_done:
+                    on_batch_done(index, results[index])
+        finally:
+            for task in tasks:
+                task.cancel()
+        return results
+
+    async def _run_with_limits(self, coro_factory):
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return await coro_factory()
+
+    def run(self, coro_factory):
+        """在当前线程运行一个新的事件循环并返回协程结果
+
+        coro_factory 为无参函数，返回要执行的协程。
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        try:
+            return asyncio.run(self._run_with_limits(coro_factory))
+        finally:
+            # 取消时不等待仍在进行的请求
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._semaphore = None
+
+    def run_batches(self, batches, target_lang, on_batch_done=None, on_entry=None, stats=None):
+        """在当前线程运行事件循环，由线程池并发翻译所有批次
+
+        Args:
+            batches (list[dict]): 每个批次为 {文本ID: 原文}
+            target_lang (str | list[str]): 目标语言，为列表时与batches一一对应，
+                不同语言的批次共用同一个信号量，总请求数仍受服务的并发请求数限制
+            on_batch_done (callable, optional): 批次完成回调 (批次序号, 翻译结果)，按完成顺序调用
+            on_entry (callable, optional): 单条完成回调 (批次序号, 文本ID, 译文)，流式响应时批次完成前即可调用
+            stats (Metrics, optional): 本次调用的计数器，记录翻译记忆命中数和批次拆分次数
+
+        Returns:
+            list[dict]: 与batches顺序一致的翻译结果，取消时未完成的批次为None
+        """
+        return self.run(lambda: self._gather_batches(batches, target_lang, on_batch_done, on_entry, stats))
@@ -0,0 +1,59 @@
+import re
+import math
+
+# 中日韩字符及全角符号，通常每个字符约占一个token
+_CJK_PATTERN = re.compile(r'[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+# JSON批量请求中每个条目的键、引号、冒号和逗号等额外开销
+ENTRY_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text):
+    """粗略估算文本的token数：中日韩字符按1个token，其他字符按4个字符1个token"""
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def estimate_entry_tokens(key, text, output_ratio=1.5):
+    """估算一个批量条目的 (输入token, 输出token)"""
+    key_tokens = estimate_tokens(key) + ENTRY_OVERHEAD_TOKENS
+    text_tokens = estimate_tokens(text)
+    return key_tokens + text_tokens, key_tokens + math.ceil(text_tokens * output_ratio)
+
+
+def estimate_max_tokens(texts_dict, output_ratio=1.5, limit=8192):
+    """根据批次内容估算响应所需的max_tokens，预留20%余量"""
+    output_tokens = sum(estimate_entry_tokens(key, text, output_ratio)[1] for key, text in texts_dict.items())
+    return max(256, min(limit, math.ceil(output_tokens * 1.2) + 64))
+
+
+def plan_batches(entries, token_budget=3000, max_entries=100, output_ratio=1.5):
+    """
+    按token预算将条目打包成批次
+
+    Args:
+        entries (list[tuple]): (文本ID, 原文) 列表
+        token_budget (int): 每个请求的输入加输出token预算
+        max_entries (int): 每个批次的最大条目数
+        output_ratio (float): 译文相对原文的token膨胀系数
+
+    Returns:
+        list[list[tuple]]: 批次列表，超出预算的单个条目独占一个批次
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for key, text in entries:
+        input_tokens, output_tokens = estimate_entry_tokens(key, text, output_ratio)
+        cost = input_tokens + output_tokens
+        if current and (current_tokens + cost > token_budget or len(current) >= max_entries):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append((key, text))
+        current_tokens += cost
+    if current:
+        batches.append(current)
+    return batches
@@ -1,47 +1,159 @@
 import requests
 import json
 import re
+import logging
 import threading
 from .translation_service import TranslationService
+from .async_translation_service import AsyncTranslationService
+from .translation_memory import make_key
+from .batch_planner import estimate_max_tokens, estimate_tokens
+from .stream_parser import StreamingJSONObjectParser
+from .endpoint_pool import split_config_list
+from .log_setup import PayloadText
 
 class ChatGPTService(TranslationService):
+    backend = "ChatGPT"
+
     def __init__(self, config):
         super().__init__(config)
-        self.api_base = config.get("chatgpt_base", "")
-        self.api_key = config.get("chatgpt_key", "")
         self.model_name = config.get("chatgpt_model", "")
         self.system_prompt = config.get("system_prompt", "")
+        self.enable_streaming = config.get("enable_streaming", False)
+
+    def endpoint_specs(self, config):
+        """
+        端点池成员：优先使用chatgpt_endpoints列表，否则由chatgpt_base和chatgpt_key（均可用逗号分隔多个）组成
         
-        # 去除API URL末尾的斜杠
-        if self.api_base.endswith('/'):
-            self.api_base = self.api_base[:-1]
+        只有一个key时所有地址共用，只有一个地址时每个key各为一个成员，
+        否则按位置一一对应，不会把一个网关和另一个网关的key组合在一起。
+        """
+        endpoints = config.get("chatgpt_endpoints") or []
+        if endpoints:
+            return endpoints
+        bases = split_config_list(config.get("chatgpt_base", ""))
+        keys = split_config_list(config.get("chatgpt_key", ""))
+        if not keys:
+            return []
+        if len(keys) == 1:
+            return [{"url": base, "key": keys[0]} for base in bases]
+        if len(bases) == 1:
+            return [{"url": bases[0], "key": key} for key in keys]
+        if len(bases) != len(keys):
+            logging.error(f"chatgpt_base有 {len(bases)} 个地址，chatgpt_key有 {len(keys)} 个key，数量不一致，只使用能一一对应的部分")
+        return [{"url": base, "key": key} for base, key in zip(bases, keys)]
 
-    def translate_text(self, text, target_lang, system_prompt=None):
+    def as_async(self):
+        """获取共享本服务连接池和取消标志的批次调度器"""
+        return AsyncChatGPTService(self)
+
+    def memory_key(self, text, target_lang, system_prompt=None):
+        prompt = "\n".join(p for p in (system_prompt, self.system_prompt) if p)
+        return make_key(text, target_lang, "ChatGPT", self.model_name, prompt)
+
+    def _chat_completion(self, payload, on_delta=None, log_prefix="ChatGPT"):
+        """
+        发送chat/completions请求
+        
+        启用流式响应时逐段读取SSE数据，每收到一段内容调用on_delta，取消时立即停止读取。
+        
+        Returns:
+            tuple: (返回的内容, finish_reason)，已取消或没有返回内容时内容为None
+        """
+        # Authorization由端点池按所选成员的key添加
+        headers = {
+            "Content-Type": "application/json"
+        }
+        if self.enable_streaming:
+            payload = dict(payload, stream=True)
+            if self.config.get("stream_include_usage", True):
+                # 流式响应默认不返回usage，需要显式请求
+                payload["stream_options"] = {"include_usage": True}
+        
+        # 请求和响应按同一抽样结果记录，内容截断后延迟序列化
+        log_payload = self.sample_payload_logging()
+        if log_payload:
+            self.log_payload(f"{log_prefix}请求", payload)
+        
+        # 经过负载均衡、限流和重试，使用共享连接池发送带超时的请求
+        response = self._post(
+            "/chat/completions",
+            tokens=estimate_tokens(json.dumps(payload["messages"], ensure_ascii=False)) + payload.get("max_tokens", 0),
+            headers=headers,
+            json=payload,
+            stream=self.enable_streaming
+        )
+        if response is None:
+            return None, None
+        
+        with response, self.metrics.timer("response"):
+            response.raise_for_status()
+            
+            if not self.enable_streaming:
+                result = response.json()
+                if log_payload:
+                    self.log_payload(f"{log_prefix}响应", result)
+                self.metrics.record_usage(result.get("usage"))
+                if "choices" in result and len(result["choices"]) > 0:
+                    choice = result["choices"][0]
+                    return choice["message"]["content"].strip(), choice.get("finish_reason")
+                return None, None
+            
+            # SSE响应可能不带charset，统一按UTF-8解码
+            response.encoding = 'utf-8'
+            parts = []
+            finish_reason = None
+            for line in response.iter_lines(decode_unicode=True):
+                if self.cancel_translation:
+                    self.log_info("翻译已取消，停止读取流式响应")
+                    return None, None
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                
+                event = json.loads(data)
+                # include_usage时最后一个事件携带usage，choices为空
+                self.metrics.record_usage(event.get("usage"))
+                choices = event.get("choices") or []
+                if not choices:
+                    continue
+                finish_reason = choices[0].get("finish_reason") or finish_reason
+                delta = (choices[0].get("delta") or {}).get("content") or ""
+                if delta:
+                    parts.append(delta)
+                    if on_delta:
+                        on_delta(delta)
+            
+            content = "".join(parts)
+            if log_payload:
+                self.log_payload(f"{log_prefix}流式响应", content)
+            return content.strip() or None, finish_reason
+
+    def _translate_text(self, text, target_lang, system_prompt=None, on_delta=None):
         if not text.strip():
             return ""
-            
-        if not self.api_base or not self.api_key or not self.model_name:
+        
+        if not self.endpoints.members or not self.model_name:
             self.log_error("ChatGPT API信息不完整")
             return None
         
+        # 使用线程本地日志记录，避免多线程日志混乱
+        thread_id = threading.get_ident()
+        
         try:
             # 检查是否已取消
             if self.cancel_translation:
                 self.log_info("翻译已取消")
                 return None
             
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
             messages = []
             # 添加系统提示词
             if system_prompt:
                 messages.append({"role": "system", "content": system_prompt})
             if self.system_prompt.strip():
                 messages.append({"role": "system", "content": self.system_prompt})
-                
+            
             prompt = f"请将以下文本翻译成{target_lang}：\n\n{text}"
             messages.append({"role": "user", "content": prompt})
             
@@ -49,49 +161,22 @@ class ChatGPTService(TranslationService):
                 "model": self.model_name,
                 "messages": messages,
                 "temperature": 0.3,
-                "max_tokens": 1000
+                # 按原文长度估算输出token，长文本不再被固定上限截断
+                "max_tokens": estimate_max_tokens(
+                    {"": text},
+                    float(self.config.get("output_token_ratio", 1.5)),
+                    int(self.config.get("max_output_tokens", 8192))
+                )
             }
             
-            # 使用线程本地日志记录，避免多线程日志混乱
-            thread_id = threading.get_ident()
-            
-            # 记录请求信息时隐藏API key
-            if self.enable_logging:
-                safe_headers = headers.copy()
-                safe_headers["Authorization"] = "Bearer ********"
-                self.log_info(f"线程 {thread_id} - ChatGPT请求: URL={self.api_base}/chat/completions, Headers={safe_headers}, Payload={payload}")
-            
-            # 添加超时和取消检查
-            timeout = 60  # 设置60秒超时
-            
-            # 使用带超时的请求
-            response = requests.post(
-                f"{self.api_base}/chat/completions", 
-                headers=headers, 
-                json=payload,
-                timeout=timeout
-            )
-            
-            # 再次检查是否已取消
-            if self.cancel_translation:
-                self.log_info("翻译已取消")
-                return None
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if self.enable_logging:
-                self.log_info(f"线程 {thread_id} - ChatGPT响应: {result}")
+            content, _ = self._chat_completion(payload, on_delta, log_prefix=f"线程 {thread_id} - ChatGPT")
             
-            # 最后一次检查是否已取消
+            # 检查是否已取消
             if self.cancel_translation:
                 self.log_info("翻译已取消")
                 return None
             
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"].strip()
-            else:
-                return None
+            return content
         except requests.exceptions.Timeout:
             self.log_error(f"线程 {thread_id} - ChatGPT请求超时")
             return None
@@ -100,135 +185,163 @@ class ChatGPTService(TranslationService):
             self.log_error(error_msg)
             return None
 
-    def batch_translate(self, texts_dict, target_lang):
-        """批量翻译多个文本"""
+    def _batch_translate(self, texts_dict, target_lang, on_entry=None, stats=None, max_tokens=None):
+        """
+        批量翻译多个文本
+        
+        JSON解析失败、输出被截断或缺少键时，保留已成功的键，
+        将失败部分对半拆分后分别重试，直到单条文本为止。
+        输出被截断时重试请求的max_tokens加倍，不超过max_output_tokens；
+        max_tokens为None时按批次内容估算。
+        """
         if not texts_dict:
             return {}
-            
-        if not self.api_base or not self.api_key or not self.model_name:
+        
+        if not self.endpoints.members or not self.model_name:
             self.log_error("ChatGPT API信息不完整")
             return {}
         
+        # 排队中的批次在开始请求前检查是否已取消
+        if self.cancel_translation:
+            return {}
+        
+        limit = int(self.config.get("max_output_tokens", 8192))
+        if max_tokens is None:
+            # 根据批次内容估算所需的输出token，避免截断或浪费
+            max_tokens = estimate_max_tokens(texts_dict, float(self.config.get("output_token_ratio", 1.5)), limit)
+        result, reason = self._request_batch(texts_dict, target_lang, on_entry, max_tokens)
+        
+        missing = {key: text for key, text in texts_dict.items() if key not in result}
+        # 请求本身失败（已重试过）或已取消时不再拆分
+        if not missing or reason == "request_error" or self.cancel_translation:
+            return result
+        
+        # 输出被截断说明预估的输出空间不足，只缩小批次仍可能再次截断，重试时同时加倍max_tokens
+        retry_tokens = min(limit, max_tokens * 2) if reason == "truncated" else None
+        if len(texts_dict) == 1:
+            # 单条文本被截断时在max_output_tokens以内加大输出空间重试，其他原因失败时放弃
+            if retry_tokens is None or retry_tokens <= max_tokens:
+                return result
+            logging.warning(f"单条翻译输出被截断，max_tokens 由 {max_tokens} 增加到 {retry_tokens} 后重试")
+            return self._batch_translate(texts_dict, target_lang, on_entry, stats, retry_tokens)
+        
+        reason = reason or "missing_keys"
+        keys = list(missing.keys())
+        halves = [keys[:len(keys) // 2], keys[len(keys) // 2:]] if len(keys) > 1 else [keys]
+        self.metrics.increment("batch_splits")
+        if stats is not None:
+            stats.increment("batch_splits")
+        self.batch_splits.append({
+            "reason": reason,
+            "batch_size": len(texts_dict),
+            "succeeded": len(result),
+            "failed": len(missing)
+        })
+        logging.warning(
+            f"批量翻译部分失败({reason})：{len(texts_dict)} 条中 {len(missing)} 条失败，"
+            f"拆分为 {len(halves)} 个批次重试"
+        )
+        
+        for half in halves:
+            result.update(self._batch_translate({key: missing[key] for key in half}, target_lang, on_entry, stats, retry_tokens))
+        return result
+
+    def _batch_messages(self, texts_dict, target_lang):
+        """构建批量翻译请求的消息列表"""
+        # 构建JSON格式的文本列表
+        texts_json = json.dumps(texts_dict, ensure_ascii=False)
+        
+        messages = []
+        # 添加系统提示词
+        if self.system_prompt.strip():
+            messages.append({"role": "system", "content": self.system_prompt})
+        
+        prompt = (
+            f"请将以下JSON格式的文本翻译成{target_lang}。\n"
+            f"JSON中的键是文本ID，值是需要翻译的文本。\n"
+            f"请保持JSON格式不变，只翻译值部分，不要翻译键。\n"
+            f"请直接返回翻译后的JSON，不要添加任何解释或其他内容。\n\n"
+            f"{texts_json}"
+        )
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def estimate_batch_tokens(self, texts_dict, target_lang=""):
+        """输入token按实际发送的消息（含系统提示词和说明）估算"""
+        _, output_tokens = super().estimate_batch_tokens(texts_dict, target_lang)
+        messages = self._batch_messages(texts_dict, target_lang)
+        return estimate_tokens(json.dumps(messages, ensure_ascii=False)), output_tokens
+    
+    def _request_batch(self, texts_dict, target_lang, on_entry=None, max_tokens=8192):
+        """
+        发送一次批量翻译请求，max_tokens为本次请求允许的输出token数
+        
+        Returns:
+            tuple: (有效的翻译结果, 失败原因)，失败原因为 None、"request_error"、"json_error" 或 "truncated"
+        """
+        # 流式响应时增量解析JSON，每个键完成后立即提交
+        parser = StreamingJSONObjectParser()
+        committed = {}
+        
+        def on_delta(delta):
+            for key, value in parser.feed(delta):
+                if key in texts_dict and isinstance(value, str) and value:
+                    committed[key] = value
+                    if on_entry:
+                        on_entry(key, value)
+        
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
-            # 构建JSON格式的文本列表
-            texts_json = json.dumps(texts_dict, ensure_ascii=False)
-            
-            messages = []
-            # 添加系统提示词
-            if self.system_prompt.strip():
-                messages.append({"role": "system", "content": self.system_prompt})
-            
-            prompt = (
-                f"请将以下JSON格式的文本翻译成{target_lang}。\n"
-                f"JSON中的键是文本ID，值是需要翻译的文本。\n"
-                f"请保持JSON格式不变，只翻译值部分，不要翻译键。\n"
-                f"请直接返回翻译后的JSON，不要添加任何解释或其他内容。\n\n"
-                f"{texts_json}"
-            )
-            messages.append({"role": "user", "content": prompt})
+            messages = self._batch_messages(texts_dict, target_lang)
             
             payload = {
                 "model": self.model_name,
                 "messages": messages,
                 "temperature": 0.3,
-                "max_tokens": 4000  # 增加token限制以处理批量文本
+                "max_tokens": max_tokens
             }
             
-            thread_id = threading.get_ident()
-            
-            if self.enable_logging:
-                # 记录请求信息时隐藏API key
-                safe_headers = headers.copy()
-                safe_headers["Authorization"] = "Bearer ********"
-                self.log_info(f"批量翻译 - ChatGPT请求: URL={self.api_base}/chat/completions, Headers={safe_headers}, Payload={payload}")
+            content, finish_reason = self._chat_completion(payload, on_delta, log_prefix="批量翻译 - ChatGPT")
+            if content is None:
+                return committed, "request_error"
             
-            response = requests.post(f"{self.api_base}/chat/completions", headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
+            # 尝试从返回内容中提取JSON
+            try:
+                # 查找JSON内容（可能被包裹在代码块中）
+                json_match = re.search(r'```json\s*([\s\S]*?)\s*```', content)
+                if json_match:
+                    json_str = json_match.group(1)
+                else:
+                    # 如果没有代码块，尝试直接解析整个内容
+                    json_str = content
+                
+                translated_dict = json.loads(json_str)
+            except json.JSONDecodeError as e:
+                self.log_error("解析JSON响应失败: %s, 响应内容: %s", e, PayloadText(content, self.payload_max_chars))
+                # 非流式响应也用增量解析器取回已完整返回的键
+                if not self.enable_streaming:
+                    on_delta(content)
+                return committed, "truncated" if finish_reason == "length" else "json_error"
             
-            if self.enable_logging:
-                self.log_info(f"批量翻译 - ChatGPT响应: {result}")
+            if not isinstance(translated_dict, dict):
+                return committed, "json_error"
             
-            if "choices" in result and len(result["choices"]) > 0:
-                content = result["choices"][0]["message"]["content"].strip()
-                
-                # 尝试从返回内容中提取JSON
-                try:
-                    # 查找JSON内容（可能被包裹在代码块中）
-                    json_match = re.search(r'```json\s*([\s\S]*?)\s*```', content)
-                    if json_match:
-                        json_str = json_match.group(1)
-                    else:
-                        # 如果没有代码块，尝试直接解析整个内容
-                        json_str = content
-                    
-                    translated_dict = json.loads(json_str)
-                    return translated_dict
-                except json.JSONDecodeError as e:
-                    self.log_error(f"解析JSON响应失败: {e}, 响应内容: {content}")
-                    return {}
-            else:
-                return {}
+            result = {
+                key: value for key, value in translated_dict.items()
+                if key in texts_dict and isinstance(value, str) and value
+            }
+            return result, "truncated" if finish_reason == "length" else None
         except Exception as e:
             error_msg = f"批量翻译过程中出现错误: {str(e)}"
             self.log_error(error_msg)
-            return {}
+            return committed, "request_error"
 
-    def translate_with_chatgpt(self, text, target_lang, system_prompt=None):
-        """
-        使用ChatGPT翻译文本
-        
-        Args:
-            text (str): 要翻译的文本
-            target_lang (str): 目标语言代码
-            system_prompt (str, optional): 用于翻译的系统提示
-            
-        Returns:
-            str: 翻译后的文本
-        """
-        # 构建消息列表
-        messages = []
-        
-        # 添加系统提示(如果有)
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        # 添加用户消息
-        messages.append({"role": "user", "content": f"请将以下文本翻译成{target_lang}:\n\n{text}"})
-        
-        # 调用ChatGPT API
-        # ... 现有代码 ...
-        
-        return translated_text
 
-    def translate_with_chatgpt(self, text, target_lang, system_prompt=None):
-        """
-        使用ChatGPT翻译文本
-        
-        Args:
-            text (str): 要翻译的文本
-            target_lang (str): 目标语言代码
-            system_prompt (str, optional): 用于翻译的系统提示
-            
-        Returns:
-            str: 翻译后的文本
-        """
-        # 构建消息列表
-        messages = []
-        
-        # 添加系统提示(如果有)
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        # 添加用户消息
-        messages.append({"role": "user", "content": f"请将以下文本翻译成{target_lang}:\n\n{text}"})
-        
-        # 调用ChatGPT API
-        # ... 现有代码 ...
-        
-        return translated_text 
\ No newline at end of file
+class AsyncChatGPTService(AsyncTranslationService):
+    """ChatGPT的批次调度器，每个批次占用一个并发请求"""
+
+    async def batch_translate(self, texts_dict, target_lang, on_entry=None, stats=None):
+        if not texts_dict:
+            return {}
+        return await self._request(
+            self.service.batch_translate, texts_dict, target_lang, self._threadsafe(on_entry), stats
+        ) or {}
\ No newline at end of file
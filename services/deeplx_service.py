@@ -1,16 +1,52 @@
-import requests
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from .translation_service import TranslationService
+from .async_translation_service import AsyncTranslationService
+from .translation_memory import make_key
+from .endpoint_pool import split_config_list
 
 class DeepLXService(TranslationService):
+    backend = "DeepLX"
+
     def __init__(self, config):
         super().__init__(config)
-        self.api_url = config.get("deeplx_url", "")
+        # 同时进行的请求数，取代max_concurrent_requests
+        self.max_concurrent = max(1, int(config.get("deeplx_max_concurrent", 8)))
+        # 新版DeepLX支持在一个请求中以数组形式发送多条文本
+        self.native_batch = config.get("deeplx_native_batch", False)
+        self.native_batch_size = max(1, int(config.get("deeplx_native_batch_size", 50)))
+
+    def endpoint_specs(self, config):
+        """端点池成员：优先使用deeplx_endpoints列表，否则使用deeplx_url（可用逗号分隔多个）"""
+        endpoints = config.get("deeplx_endpoints") or []
+        if endpoints:
+            return endpoints
+        return [{"url": url} for url in split_config_list(config.get("deeplx_url", ""))]
+    
+    def request_concurrency(self):
+        """逐条请求或按分片请求时都使用deeplx_max_concurrent作为并发上限"""
+        return self.max_concurrent
+
+    def as_async(self):
+        """获取共享本服务连接池和取消标志的批次调度器"""
+        return AsyncDeepLXService(self)
 
-    def translate_text(self, text, target_lang):
+    def memory_key(self, text, target_lang, system_prompt=None):
+        # DeepLX不使用系统提示词
+        return make_key(text, target_lang, "DeepLX")
+    
+    def estimate_requests(self, batches):
+        """逐条翻译时每条文本一次请求，原生批量时每个分片一次请求"""
+        if self.native_batch:
+            size = self.native_batch_size
+            return sum((len(batch) + size - 1) // size for batch in batches)
+        return sum(len(batch) for batch in batches)
+
+    def _translate_text(self, text, target_lang, system_prompt=None, on_delta=None):
         if not text.strip():
             return ""
             
-        if not self.api_url:
+        if not self.endpoints.members:
             self.log_error("DeepLX API URL未设置")
             return None
             
@@ -21,13 +57,19 @@ class DeepLXService(TranslationService):
                 "target_lang": target_lang
             }
             
-            self.log_info(f"DeepLX请求: URL={self.api_url}, Payload={payload}")
+            log_payload = self.sample_payload_logging()
+            if log_payload:
+                self.log_payload("DeepLX请求", payload)
                 
-            response = requests.post(self.api_url + "/translate", json=payload)
+            response = self._post("/translate", json=payload)
+            if response is None:
+                return None
             response.raise_for_status()
-            result = response.json()
+            with self.metrics.timer("response"):
+                result = response.json()
             
-            self.log_info(f"DeepLX响应: {result}")
+            if log_payload:
+                self.log_payload("DeepLX响应", result)
                 
             return result.get("data", "")
         except Exception as e:
@@ -35,11 +77,106 @@ class DeepLXService(TranslationService):
             self.log_error(error_msg)
             return None
 
-    def batch_translate(self, texts_dict, target_lang):
-        """批量翻译多个文本（DeepLX不支持批量，逐个翻译）"""
+    def _batch_translate(self, texts_dict, target_lang, on_entry=None, stats=None):
+        """批量翻译多个文本：启用原生批量时每个请求发送多条文本，否则并发逐条翻译"""
+        if not texts_dict:
+            return {}
+        if self.native_batch:
+            keys = list(texts_dict.keys())
+            chunks = [keys[i:i+self.native_batch_size] for i in range(0, len(keys), self.native_batch_size)]
+            return self._run_concurrently(
+                chunks, lambda chunk: self._translate_chunk(chunk, texts_dict, target_lang), on_entry
+            )
+        return self._translate_each(list(texts_dict.keys()), texts_dict, target_lang, on_entry)
+    
+    def _translate_each(self, keys, texts_dict, target_lang, on_entry=None):
+        """逐条请求翻译，按deeplx_max_concurrent并发"""
+        return self._run_concurrently(
+            [[key] for key in keys],
+            lambda chunk: {chunk[0]: self._translate_text(texts_dict[chunk[0]], target_lang)},
+            on_entry
+        )
+
+    def _run_concurrently(self, chunks, translate_chunk, on_entry=None):
+        """在线程池中并发执行各分片的翻译并合并结果"""
         result = {}
-        for key, text in texts_dict.items():
-            translated = self.translate_text(text, target_lang)
-            if translated:
-                result[key] = translated
-        return result 
\ No newline at end of file
+        
+        def collect(translated):
+            for key, value in (translated or {}).items():
+                if value:
+                    result[key] = value
+                    if on_entry:
+                        on_entry(key, value)
+        
+        if len(chunks) == 1 or self.max_concurrent == 1:
+            for chunk in chunks:
+                collect(translate_chunk(chunk))
+            return result
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent, len(chunks))) as executor:
+            futures = [executor.submit(translate_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                collect(future.result())
+        return result
+
+    def _translate_chunk(self, keys, texts_dict, target_lang):
+        """使用数组形式的请求翻译一组文本，服务端不支持或返回数量不符时改为逐条翻译"""
+        texts = [texts_dict[key] for key in keys]
+        try:
+            payload = {
+                "text": texts,
+                "source_lang": "auto",
+                "target_lang": target_lang
+            }
+            
+            log_payload = self.sample_payload_logging()
+            if log_payload:
+                self.log_payload(f"DeepLX批量请求（{len(texts)} 条文本）", payload)
+            
+            response = self._post("/translate", json=payload)
+            if response is None:
+                return {}
+            response.raise_for_status()
+            with self.metrics.timer("response"):
+                result = response.json()
+            
+            # 兼容两种返回格式: {"data": [...]} 和 {"translations": [{"text": ...}]}
+            translations = result.get("data")
+            if not isinstance(translations, list) and isinstance(result.get("translations"), list):
+                translations = [item.get("text", "") for item in result["translations"]]
+            if isinstance(translations, list) and len(translations) == len(texts):
+                return dict(zip(keys, translations))
+            
+            self.log_error(f"DeepLX批量响应格式不符，改为逐条翻译: {str(result)[:200]}")
+        except Exception as e:
+            self.log_error(f"DeepLX批量翻译过程中出现错误，改为逐条翻译: {str(e)}")
+        
+        if self.cancel_translation:
+            return {}
+        # 逐条翻译仍按配置的并发数进行；完成回调由外层的_run_concurrently统一处理
+        return self._translate_each(keys, texts_dict, target_lang)
+
+
+class AsyncDeepLXService(AsyncTranslationService):
+    """DeepLX的批次调度器，批量翻译时每个文本占用一个并发请求，启用原生批量时每个分片一次请求"""
+
+    async def batch_translate(self, texts_dict, target_lang, on_entry=None, stats=None):
+        if self.service.native_batch:
+            # 每个分片占用一个并发请求，由信号量统一限制，不再在线程中嵌套线程池
+            keys = list(texts_dict.keys())
+            size = self.service.native_batch_size
+            chunks = [{key: texts_dict[key] for key in keys[i:i+size]} for i in range(0, len(keys), size)]
+            results = await asyncio.gather(*(
+                self._request(self.service.batch_translate, chunk, target_lang, self._threadsafe(on_entry), stats)
+                for chunk in chunks
+            ))
+            return {key: value for result in results if result for key, value in result.items()}
+        
+        async def translate_one(key):
+            translated = await self._request(self.service.translate_text, texts_dict[key], target_lang, stats=stats)
+            if translated and on_entry:
+                on_entry(key, translated)
+            return key, translated
+        
+        results = await asyncio.gather(*(translate_one(key) for key in texts_dict))
+        return {key: translated for key, translated in results if translated}
\ No newline at end of file
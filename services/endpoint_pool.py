@@ -0,0 +1,176 @@
+import re
+import time
+import logging
+import threading
+from .rate_limiter import RateLimiter
+
+# 按后端和成员列表缓存的端点池，保证并发计数和健康状态在多次翻译之间保留
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def split_config_list(value):
+    """将逗号、空格或换行分隔的配置值拆分为列表"""
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [part for part in re.split(r'[,\s]+', value or "") if part]
+
+
+def get_endpoint_pool(config, backend, specs):
+    """
+    获取后端共享的端点池
+
+    Args:
+        config: 配置对象
+        backend (str): 后端名称，同时作为限流配置前缀
+        specs (list[dict]): 成员列表，每项包含 url，可选 key、weight、rpm、tpm
+    """
+    members = tuple(
+        (spec["url"].rstrip("/"), spec.get("key", ""), float(spec.get("weight", 1)),
+         float(spec.get("rpm", 0) or 0), float(spec.get("tpm", 0) or 0))
+        for spec in specs if spec.get("url")
+    )
+    prefix = backend.lower()
+    rpm = float(config.get(f"{prefix}_rpm", 0) or 0)
+    tpm = float(config.get(f"{prefix}_tpm", 0) or 0)
+    strategy = config.get("load_balance_strategy", "least_outstanding")
+    key = (backend, members, rpm, tpm, strategy)
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            endpoints = [
+                # 成员未单独设置限流时使用后端的限流配置，每个成员（通常对应一个key）单独计算配额
+                Endpoint(url, api_key, weight, RateLimiter(member_rpm or rpm, member_tpm or tpm))
+                for url, api_key, weight, member_rpm, member_tpm in members
+            ]
+            pool = EndpointPool(
+                backend,
+                endpoints,
+                strategy=strategy,
+                failure_threshold=int(config.get("endpoint_failure_threshold", 3)),
+                base_ejection=float(config.get("endpoint_ejection_seconds", 30)),
+                max_ejection=float(config.get("endpoint_max_ejection_seconds", 300))
+            )
+            _pools[key] = pool
+        return pool
+
+
+class Endpoint:
+    """端点池成员：一个服务地址和对应的凭证"""
+
+    def __init__(self, url, key="", weight=1.0, rate_limiter=None):
+        self.url = url
+        self.key = key
+        self.weight = max(weight, 0.01)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.outstanding = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.current_weight = 0.0
+
+    def __str__(self):
+        # 日志中隐藏完整的key
+        if self.key:
+            return f"{self.url} (key ****{self.key[-4:]})"
+        return self.url
+
+
+class EndpointPool:
+    """
+    多端点负载均衡
+
+    支持最少并发请求（least_outstanding）和加权轮询（weighted_round_robin）两种策略。
+    被动健康检查：连续失败达到阈值的成员被暂时剔除，剔除时间按次数指数增长，到期后重新参与分配。
+    """
+
+    def __init__(self, backend, endpoints, strategy="least_outstanding",
+                 failure_threshold=3, base_ejection=30.0, max_ejection=300.0):
+        self.backend = backend
+        self.members = endpoints
+        self.strategy = strategy
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_ejection = base_ejection
+        self.max_ejection = max_ejection
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """选择一个成员并增加其并发计数，没有成员时返回None"""
+        with self._lock:
+            if not self.members:
+                return None
+
+            now = time.monotonic()
+            healthy = [member for member in self.members if member.ejected_until <= now]
+            if not healthy:
+                # 全部被剔除时选择最早恢复的成员，而不是直接失败
+                healthy = [min(self.members, key=lambda member: member.ejected_until)]
+
+            if self.strategy == "weighted_round_robin":
+                # 平滑加权轮询
+                total = sum(member.weight for member in healthy)
+                for member in healthy:
+                    member.current_weight += member.weight
+                chosen = max(healthy, key=lambda member: member.current_weight)
+                chosen.current_weight -= total
+            else:
+                chosen = min(healthy, key=lambda member: member.outstanding / member.weight)
+
+            chosen.outstanding += 1
+            return chosen
+
+    def release(self, member, success):
+        """请求结束后归还成员，并根据结果更新健康状态"""
+        with self._lock:
+            member.outstanding = max(0, member.outstanding - 1)
+            if success:
+                member.failures = 0
+                member.ejections = 0
+                return
+
+            member.failures += 1
+            if member.failures >= self.failure_threshold:
+                member.failures = 0
+                member.ejections += 1
+                duration = min(self.max_ejection, self.base_ejection * (2 ** (member.ejections - 1)))
+                member.ejected_until = time.monotonic() + duration
+                logging.warning(f"{self.backend}端点 {member} 连续失败，暂时剔除 {duration:.0f} 秒")
+
+    def min_seconds(self, requests, tokens=0):
+        """
+        预估用：按各成员的每分钟请求数和token数限制，发送这些请求至少需要的秒数
+
+        有任一成员不限流时返回0。
+        """
+        request_rate = token_rate = 0.0
+        limited_requests = limited_tokens = bool(self.members)
+        for member in self.members:
+            limiter = member.rate_limiter
+            if limiter.request_bucket:
+                request_rate += limiter.request_bucket.rate
+            else:
+                limited_requests = False
+            if limiter.token_bucket:
+                token_rate += limiter.token_bucket.rate
+            else:
+                limited_tokens = False
+        seconds = 0.0
+        if limited_requests and request_rate > 0:
+            seconds = max(seconds, requests / request_rate)
+        if limited_tokens and token_rate > 0:
+            seconds = max(seconds, tokens / token_rate)
+        return seconds
+
+    def stats(self):
+        """返回各成员的状态"""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "endpoint": str(member),
+                    "outstanding": member.outstanding,
+                    "healthy": member.ejected_until <= now
+                }
+                for member in self.members
+            ]
@@ -0,0 +1,44 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# 按连接池参数缓存的共享会话，进程内所有翻译服务复用同一组长连接
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(config):
+    """获取共享的keep-alive会话，相同连接池配置的服务复用同一个会话"""
+    # 连接池不小于并发请求数（多个文件同时翻译时为各文件并发数之和），否则并发时会反复丢弃连接
+    pool_size = max(
+        1,
+        int(config.get("http_pool_size", 10)),
+        max(int(config.get("max_concurrent_requests", 4)), int(config.get("deeplx_max_concurrent", 8)))
+        * int(config.get("max_concurrent_files", 4))
+    )
+    key = pool_size
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[key] = session
+        return session
+
+
+def get_timeout(config):
+    """获取请求超时设置 (连接超时, 读取超时)"""
+    connect_timeout = float(config.get("http_connect_timeout", 10))
+    read_timeout = float(config.get("http_read_timeout", 60))
+    return (connect_timeout, read_timeout)
+
+
+def close_sessions():
+    """关闭所有共享会话"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,121 @@
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_DIR = "logs"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 进程内只配置一次的日志管道
+_listener = None
+_lock = threading.Lock()
+
+
+def setup_logging(config=None, level=logging.INFO, log_file=True, stream=None):
+    """
+    配置进程的日志管道，只在第一次调用时生效
+
+    翻译线程只把日志记录放入队列，由QueueListener在后台线程写入控制台和日志文件，
+    请求量大时磁盘I/O不再拖慢翻译。日志文件按大小轮转，上限由log_max_bytes和log_backup_count决定。
+    根日志器已有处理器时（如调用方已执行basicConfig）不做任何修改。
+
+    Args:
+        config (Config, optional): 读取日志文件轮转设置
+        level (int): 根日志器的级别
+        log_file (bool): 是否写入 logs/translator_日期.log
+        stream (optional): 控制台输出的流，默认为标准错误
+
+    Returns:
+        bool: 本次调用是否完成了配置
+    """
+    global _listener
+    with _lock:
+        root = logging.getLogger()
+        if _listener is not None or root.handlers:
+            return False
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        handlers = []
+        console = logging.StreamHandler(stream or sys.stderr)
+        console.setFormatter(formatter)
+        handlers.append(console)
+        file_error = None
+        if log_file:
+            max_bytes = int(config.get("log_max_bytes", 10 * 1024 * 1024)) if config else 10 * 1024 * 1024
+            backup_count = int(config.get("log_backup_count", 5)) if config else 5
+            try:
+                os.makedirs(LOG_DIR, exist_ok=True)
+                file_handler = RotatingFileHandler(
+                    os.path.join(LOG_DIR, f'translator_{datetime.now().strftime("%Y%m%d")}.log'),
+                    maxBytes=max_bytes,
+                    backupCount=backup_count,
+                    encoding='utf-8'
+                )
+                file_handler.setFormatter(formatter)
+                handlers.append(file_handler)
+            except OSError as e:
+                file_error = e
+
+        records = queue.SimpleQueue()
+        root.addHandler(_DeferredQueueHandler(records))
+        root.setLevel(level)
+        _listener = QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        # 退出前写完队列中剩余的日志
+        atexit.register(_listener.stop)
+    if file_error is not None:
+        logging.error(f"无法打开日志文件，只输出到控制台: {file_error}")
+    return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    不在记录日志的线程中格式化消息的QueueHandler
+
+    标准的prepare()会在调用线程中执行format()，请求内容的序列化仍会占用翻译线程。
+    这里只把异常堆栈转换为文本（traceback对象不能跨线程保留），消息和参数原样入队，
+    由QueueListener所在的后台线程格式化。
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class PayloadText:
+    """
+    延迟序列化的请求或响应内容，只在日志输出线程格式化记录时才转换为文本
+
+    序列化时边生成边计数，超过max_chars后立即停止，大的内容不会先完整序列化再截断。
+    """
+
+    def __init__(self, payload, max_chars=2000):
+        self.payload = payload
+        self.max_chars = max_chars
+
+    def __str__(self):
+        if isinstance(self.payload, str):
+            text = self.payload
+            if self.max_chars > 0 and len(text) > self.max_chars:
+                return f"{text[:self.max_chars]}...（已截断，共 {len(text)} 字符）"
+            return text
+
+        # 无法序列化的对象按str()输出
+        chunks = json.JSONEncoder(ensure_ascii=False, default=str).iterencode(self.payload)
+        parts = []
+        length = 0
+        for chunk in chunks:
+            parts.append(chunk)
+            length += len(chunk)
+            if self.max_chars > 0 and length > self.max_chars:
+                return f"{''.join(parts)[:self.max_chars]}...（已截断，超过 {self.max_chars} 字符）"
+        return "".join(parts)
@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+# 各阶段的含义，报告中按此顺序输出
+STAGES = {
+    "parse": "解析源文件",
+    "queue_wait": "批次等待并发名额",
+    "rate_limit_wait": "等待限流",
+    "http": "HTTP请求（发送到收到响应头）",
+    "response": "读取和解析响应（流式响应包含生成时间）",
+    "write": "写出输出文件",
+}
+
+COUNTERS = {
+    "requests": "发送的HTTP请求数（含重试）",
+    "retries": "重试次数",
+    "http_errors": "可重试的HTTP错误和连接错误次数",
+    "cache_hits": "翻译记忆命中的条目数",
+    "cache_misses": "翻译记忆未命中、需要调用API的条目数",
+    "batch_splits": "批量翻译部分失败后的拆分次数",
+    "prompt_tokens": "接口返回的输入token数",
+    "completion_tokens": "接口返回的输出token数",
+    "entries_processed": "翻译过程中已处理的条目数（含重复和失败的条目），实时更新",
+    "entries_unresolved": "批次完成后仍没有译文的条目数，实时更新",
+    "entries_translated": "成功翻译的条目数",
+    "entries_failed": "翻译失败的条目数",
+    "files": "写出的输出文件数",
+}
+
+# Prometheus直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 每个阶段保留的耗时样本数，超过后蓄水池抽样，用于计算分位数
+SAMPLE_SIZE = 2048
+
+
+class _Timing:
+    """单个阶段的耗时统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.samples = []
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(seconds)
+        else:
+            index = random.randrange(self.count)
+            if index < SAMPLE_SIZE:
+                self.samples[index] = seconds
+
+    def quantile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": round(self.total, 4),
+            "mean": round(self.total / self.count, 4) if self.count else None,
+            "p50": _round(self.quantile(0.5)),
+            "p95": _round(self.quantile(0.95)),
+            "max": round(self.max, 4)
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    """
+    一次运行的性能指标：各阶段耗时和计数器
+
+    每个翻译服务持有一个实例，翻译器和异步层通过 translation_service.metrics 记录，
+    多个线程同时记录时由锁保护。界面每次开始翻译前调用reset()。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._timings = {}
+            self._counters = dict.fromkeys(COUNTERS, 0)
+            self._inflight = 0
+            self.started_at = datetime.now()
+            self._started = time.monotonic()
+
+    def observe(self, stage, seconds):
+        """记录一次阶段耗时（秒）"""
+        with self._lock:
+            timing = self._timings.get(stage)
+            if timing is None:
+                timing = self._timings[stage] = _Timing()
+            timing.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """记录with块耗时的上下文管理器"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - started)
+
+    @contextmanager
+    def track_inflight(self):
+        """统计with块执行期间正在进行的请求数"""
+        with self._lock:
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def snapshot(self):
+        """当前计数器和进行中的请求数，不计算分位数，适合界面定时刷新"""
+        with self._lock:
+            return dict(self._counters, inflight=self._inflight)
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_usage(self, usage):
+        """记录接口返回的usage字段"""
+        if not isinstance(usage, dict):
+            return
+        with self._lock:
+            for name in ("prompt_tokens", "completion_tokens"):
+                value = usage.get(name)
+                if isinstance(value, (int, float)):
+                    self._counters[name] += int(value)
+
+    def report(self):
+        """
+        生成JSON运行报告
+
+        Returns:
+            dict: 包含开始时间、耗时、吞吐量、计数器和各阶段耗时统计
+        """
+        with self._lock:
+            seconds = time.monotonic() - self._started
+            counters = dict(self._counters)
+            ordered = [stage for stage in STAGES if stage in self._timings]
+            ordered += [stage for stage in self._timings if stage not in STAGES]
+            stages = {stage: self._timings[stage].summary() for stage in ordered}
+        entries = counters["entries_translated"] + counters["entries_failed"]
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "seconds": round(seconds, 3),
+            "entries_per_second": round(entries / seconds, 2) if seconds > 0 and entries else None,
+            "counters": counters,
+            "stages": stages
+        }
+
+    def to_prometheus(self, labels=None, prefix="resource_translator"):
+        """
+        导出Prometheus文本格式，可供node_exporter的textfile收集器读取
+
+        Args:
+            labels (dict, optional): 附加到每个指标的标签，如 {"backend": "ChatGPT"}
+            prefix (str): 指标名前缀
+        """
+        def format_labels(extra=None):
+            merged = dict(labels or {})
+            merged.update(extra or {})
+            if not merged:
+                return ""
+            return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in merged.items()) + "}"
+
+        with self._lock:
+            counters = dict(self._counters)
+            timings = dict(self._timings)
+            lines = []
+            for name, value in counters.items():
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# HELP {metric} {COUNTERS.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{format_labels()} {value}")
+
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# HELP {metric} 各阶段耗时")
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, timing in timings.items():
+                for bound, count in zip(LATENCY_BUCKETS, timing.buckets):
+                    lines.append(f"{metric}_bucket{format_labels({'stage': stage, 'le': bound})} {count}")
+                lines.append(f"{metric}_bucket{format_labels({'stage': stage, 'le': '+Inf'})} {timing.count}")
+                lines.append(f"{metric}_sum{format_labels({'stage': stage})} {timing.total:.6f}")
+                lines.append(f"{metric}_count{format_labels({'stage': stage})} {timing.count}")
+
+            metric = f"{prefix}_run_seconds"
+            lines.append(f"# HELP {metric} 本次运行的耗时")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric}{format_labels()} {time.monotonic() - self._started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def summary_text(self):
+        """界面中显示的简要统计"""
+        report = self.report()
+        counters = report["counters"]
+        text = f"耗时: {report['seconds']:.1f} 秒"
+        if report["entries_per_second"]:
+            text += f"，{report['entries_per_second']:.1f} 条/秒"
+        text += f"\n请求: {counters['requests']} 次，重试 {counters['retries']} 次，翻译记忆命中 {counters['cache_hits']} 条"
+        if counters["prompt_tokens"] or counters["completion_tokens"]:
+            text += f"\nToken: 输入 {counters['prompt_tokens']}，输出 {counters['completion_tokens']}"
+        http = report["stages"].get("http")
+        if http and http["count"]:
+            text += f"\nHTTP延迟: p50 {http['p50'] * 1000:.0f} ms，p95 {http['p95'] * 1000:.0f} ms"
+        return text
+
+
+def write_report(path, report):
+    """保存JSON运行报告"""
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logging.error(f"保存运行报告失败: {e}")
+
+
+def write_prometheus(path, text):
+    """写出Prometheus文本，先写临时文件再替换，避免收集器读到写了一半的文件"""
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.error(f"写出Prometheus指标失败: {e}")
+
+
+# 吞吐量历史中每个后端和模型保留的运行次数
+HISTORY_SIZE = 20
+
+# 没有历史记录时预估耗时使用的默认速度
+DEFAULT_REQUEST_SECONDS = {"DeepLX": 0.5, "ChatGPT": 2.0}
+DEFAULT_TOKENS_PER_SECOND = 30.0
+
+
+def history_path(config):
+    """吞吐量历史文件的路径"""
+    return config.get("throughput_history_path") or os.path.join(
+        os.path.expanduser("~"), ".resource_translator_history.json"
+    )
+
+
+def load_history(path):
+    """读取吞吐量历史，文件不存在或损坏时返回空列表"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logging.warning(f"读取吞吐量历史失败: {e}")
+        return []
+    return [run for run in history if isinstance(run, dict)] if isinstance(history, list) else []
+
+
+def record_throughput(path, backend, model, report, concurrency):
+    """
+    将一次运行的实测速度追加到吞吐量历史，供之后预估耗时使用
+
+    Args:
+        path (str): 历史文件路径
+        backend (str): 后端名称
+        model (str): 模型名称，DeepLX为空
+        report (dict): Metrics.report() 的结果
+        concurrency (int): 本次运行的最大并发请求数
+    """
+    counters = report["counters"]
+    stages = report["stages"]
+    request_seconds = sum(stages[stage]["total"] for stage in ("http", "response") if stage in stages)
+    if not counters["requests"] or request_seconds <= 0:
+        return
+
+    history = load_history(path)
+    history.append({
+        "backend": backend,
+        "model": model or "",
+        "started_at": report["started_at"],
+        "requests": counters["requests"],
+        "request_seconds": round(request_seconds, 3),
+        "completion_tokens": counters["completion_tokens"],
+        "concurrency": concurrency
+    })
+    same = [run for run in history if (run.get("backend"), run.get("model")) == (backend, model or "")]
+    dropped = {id(run) for run in same[:-HISTORY_SIZE]}
+    history = [run for run in history if id(run) not in dropped]
+
+    temp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.error(f"保存吞吐量历史失败: {e}")
+
+
+def estimate_seconds(history, backend, model, requests, output_tokens, concurrency):
+    """
+    根据历史运行的实测速度预估翻译耗时
+
+    有token用量记录时按每个输出token的平均耗时估算（适合生成时间为主的模型接口），
+    否则按每个请求的平均耗时估算。没有同一模型的记录时使用同一后端的记录，都没有时使用默认速度。
+
+    Returns:
+        tuple: (预估秒数, 依据说明)
+    """
+    if not requests:
+        return 0.0, "无需发送请求"
+    runs = [run for run in history if run.get("backend") == backend and run.get("model") == (model or "")]
+    runs = runs or [run for run in history if run.get("backend") == backend]
+    if runs:
+        total_requests = sum(run.get("requests", 0) for run in runs)
+        total_seconds = sum(run.get("request_seconds", 0) for run in runs)
+        total_tokens = sum(run.get("completion_tokens", 0) for run in runs)
+        if output_tokens and total_tokens > 0:
+            work = output_tokens * total_seconds / total_tokens
+        else:
+            work = requests * total_seconds / max(1, total_requests)
+        source = f"依据最近 {len(runs)} 次运行的实测速度"
+    else:
+        work = requests * DEFAULT_REQUEST_SECONDS.get(backend, 1.0)
+        if backend == "ChatGPT":
+            work += output_tokens / DEFAULT_TOKENS_PER_SECOND
+        source = "按默认速度估算，还没有运行记录"
+    return work / max(1, min(concurrency, requests)), source
@@ -0,0 +1,68 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """令牌桶，按每分钟速率补充，最多允许burst_seconds秒的突发量"""
+
+    def __init__(self, rate_per_minute, burst_seconds=10):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """返回取得amount个令牌还需等待的秒数
+
+        超过桶容量的请求只要求桶满即可通过，差额记为欠账，由后续请求等待补足。
+        """
+        self._refill(now)
+        need = min(amount, self.capacity)
+        if self.level >= need:
+            return 0.0
+        return (need - self.level) / self.rate
+
+    def consume(self, amount):
+        self.level -= amount
+
+
+class RateLimiter:
+    """客户端限流：请求数和token数两个令牌桶，以及服务端要求的暂停（Retry-After）"""
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """服务端返回限流时暂停所有请求，避免并发请求同时重试造成错误风暴"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens=0, is_cancelled=None, poll_interval=0.5):
+        """阻塞直到可以发送请求，取消时返回False"""
+        while True:
+            if is_cancelled and is_cancelled():
+                return False
+
+            with self._lock:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if self.request_bucket:
+                    wait = max(wait, self.request_bucket.wait_time(1, now))
+                if self.token_bucket and tokens:
+                    wait = max(wait, self.token_bucket.wait_time(tokens, now))
+
+                if wait <= 0:
+                    if self.request_bucket:
+                        self.request_bucket.consume(1)
+                    if self.token_bucket and tokens:
+                        self.token_bucket.consume(tokens)
+                    return True
+
+            time.sleep(min(wait, poll_interval))
@@ -0,0 +1,90 @@
+import json
+
+
+class StreamingJSONObjectParser:
+    """增量解析流式返回的JSON对象
+
+    模型按片段返回 {"键": "译文", ...}，每次feed新片段后返回其中新完成的键值对，
+    不需要等待整个响应结束。对象前的```json代码块标记会被跳过。
+    """
+
+    _WHITESPACE = " \t\r\n"
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._decoder = json.JSONDecoder()
+        self.items = {}
+
+    def feed(self, chunk):
+        """追加响应片段，返回新完成的 [(键, 值)]"""
+        self._buffer += chunk
+        completed = []
+        if self._finished:
+            return completed
+
+        if not self._started:
+            start = self._buffer.find("{", self._pos)
+            if start < 0:
+                return completed
+            self._pos = start + 1
+            self._started = True
+
+        while True:
+            pos = self._skip(self._pos, self._WHITESPACE + ",")
+            if pos >= len(self._buffer):
+                break
+            if self._buffer[pos] == "}":
+                self._finished = True
+                break
+
+            key, pos = self._decode_string(pos)
+            if key is None:
+                break
+            pos = self._skip(pos, self._WHITESPACE)
+            if pos >= len(self._buffer):
+                break
+            if self._buffer[pos] != ":":
+                # 格式异常，放弃增量解析，交给最终的完整解析处理
+                self._finished = True
+                break
+
+            value, pos = self._decode_value(self._skip(pos + 1, self._WHITESPACE))
+            if pos is None:
+                break
+
+            self._pos = pos
+            self.items[key] = value
+            completed.append((key, value))
+
+        return completed
+
+    def _skip(self, pos, chars):
+        while pos < len(self._buffer) and self._buffer[pos] in chars:
+            pos += 1
+        return pos
+
+    def _decode_string(self, pos):
+        if pos >= len(self._buffer) or self._buffer[pos] != '"':
+            return None, pos
+        try:
+            return self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            # 字符串尚未接收完整
+            return None, pos
+
+    def _decode_value(self, pos):
+        if pos >= len(self._buffer):
+            return None, None
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            return None, None
+        # 数字等非字符串值可能被截断在片段末尾，需要看到后续分隔符才算完成
+        if not isinstance(value, (str, dict, list)):
+            end_pos = self._skip(end, self._WHITESPACE)
+            if end_pos >= len(self._buffer):
+                return None, None
+        return value, end
@@ -0,0 +1,230 @@
+import os
+import time
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# 按数据库路径缓存的翻译记忆实例，进程内所有翻译服务共享
+_memories = {}
+_memories_lock = threading.Lock()
+
+
+def get_translation_memory(config):
+    """获取共享的翻译记忆，未启用时返回None"""
+    if not config.get("enable_translation_memory", True):
+        return None
+
+    db_path = config.get("tm_path") or os.path.join(os.path.expanduser("~"), ".resource_translator_tm.db")
+    with _memories_lock:
+        memory = _memories.get(db_path)
+        if memory is None:
+            try:
+                memory = TranslationMemory(
+                    db_path,
+                    max_entries=int(config.get("tm_max_entries", 200000)),
+                    lru_size=int(config.get("tm_lru_size", 10000))
+                )
+            except Exception as e:
+                logging.error(f"打开翻译记忆失败: {e}")
+                return None
+            _memories[db_path] = memory
+            # 退出前提交缓冲中的写入
+            atexit.register(memory.flush)
+        return memory
+
+
+def normalize_text(text):
+    """规范化原文，用于计算缓存键"""
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def make_key(text, target_lang, backend, model="", system_prompt=""):
+    """根据原文、目标语言、后端、模型和系统提示词生成缓存键"""
+    prompt_hash = hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest()
+    raw = "\x1f".join([normalize_text(text), target_lang, backend, model or "", prompt_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    """
+    本地翻译记忆：SQLite持久化存储，前置进程内LRU缓存
+
+    新译文和命中条目的使用时间先在内存中缓冲，累计FLUSH_ENTRIES条或距上次提交超过FLUSH_SECONDS秒时
+    在一个事务中写入，逐条翻译时不再每条文本提交一次。数据库使用WAL模式，提交时不阻塞读取。
+    翻译结束时调用flush()，进程退出前也会自动提交。
+    """
+
+    # 每写入多少条检查一次数据库容量
+    EVICT_CHECK_INTERVAL = 500
+    # 缓冲的写入和使用时间更新达到此条数时提交
+    FLUSH_ENTRIES = 200
+    # 距上次提交超过此秒数时，下一次写入会提交缓冲
+    FLUSH_SECONDS = 5.0
+
+    def __init__(self, db_path, max_entries=200000, lru_size=10000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.lru_size = lru_size
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+        # 尚未提交的 {缓存键: 译文} 和 {缓存键: 最近使用时间}
+        self._pending = {}
+        self._touched = {}
+        self._flushed_at = time.monotonic()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            # 部分文件系统（如网络共享）不支持WAL，使用默认的回滚日志
+            logging.warning(f"翻译记忆无法启用WAL模式: {e}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tm ("
+            "key TEXT PRIMARY KEY, "
+            "translation TEXT NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tm_last_used ON tm (last_used)")
+        self._conn.commit()
+
+    def _lru_put(self, key, translation):
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys):
+        """批量查询，返回 {缓存键: 译文}，只包含命中的键"""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                elif key in self._pending:
+                    found[key] = self._pending[key]
+                    self._lru_put(key, found[key])
+                else:
+                    missing.append(key)
+
+            if missing:
+                try:
+                    # SQLite单条语句的参数数量有限，分段查询
+                    for i in range(0, len(missing), 500):
+                        chunk = missing[i:i+500]
+                        placeholders = ",".join("?" * len(chunk))
+                        rows = self._conn.execute(
+                            f"SELECT key, translation FROM tm WHERE key IN ({placeholders})", chunk
+                        ).fetchall()
+                        for key, translation in rows:
+                            found[key] = translation
+                            self._lru_put(key, translation)
+                    # 使用时间随下一次提交一起更新
+                    now = time.time()
+                    for key in missing:
+                        if key in found:
+                            self._touched[key] = now
+                    self._maybe_flush()
+                except sqlite3.Error as e:
+                    logging.error(f"查询翻译记忆失败: {e}")
+
+            hit_count = sum(1 for key in keys if key in found)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return found
+
+    def contains_many(self, keys):
+        """只读查询哪些缓存键已有译文，不更新LRU顺序、使用时间和命中统计，用于预估"""
+        found = set()
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._lru or key in self._pending:
+                    found.add(key)
+                else:
+                    missing.append(key)
+            try:
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i:i+500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(f"SELECT key FROM tm WHERE key IN ({placeholders})", chunk).fetchall()
+                    found.update(key for key, in rows)
+            except sqlite3.Error as e:
+                logging.error(f"查询翻译记忆失败: {e}")
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        """批量写入 {缓存键: 译文}，先放入缓冲，达到条数或时间间隔后提交"""
+        if not items:
+            return
+        with self._lock:
+            for key, translation in items.items():
+                self._lru_put(key, translation)
+                self._pending[key] = translation
+                self._touched.pop(key, None)
+            self._maybe_flush()
+
+    def flush(self):
+        """提交缓冲中的写入和使用时间更新"""
+        with self._lock:
+            self._flush()
+
+    def _maybe_flush(self):
+        buffered = len(self._pending) + len(self._touched)
+        if buffered >= self.FLUSH_ENTRIES or (buffered and time.monotonic() - self._flushed_at >= self.FLUSH_SECONDS):
+            self._flush()
+
+    def _flush(self):
+        """在一个事务中写入缓冲，调用方持有锁"""
+        self._flushed_at = time.monotonic()
+        if not self._pending and not self._touched:
+            return
+        pending, self._pending = self._pending, {}
+        touched, self._touched = self._touched, {}
+        now = time.time()
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO tm (key, translation, last_used) VALUES (?, ?, ?)",
+                    [(key, translation, now) for key, translation in pending.items()]
+                )
+                self._conn.executemany(
+                    "UPDATE tm SET last_used = ? WHERE key = ?", [(used, key) for key, used in touched.items()]
+                )
+            self._writes_since_check += len(pending)
+            if self._writes_since_check >= self.EVICT_CHECK_INTERVAL:
+                self._writes_since_check = 0
+                self._evict()
+        except sqlite3.Error as e:
+            logging.error(f"写入翻译记忆失败: {e}")
+
+    def put(self, key, translation):
+        self.put_many({key: translation})
+
+    def _evict(self):
+        """超过容量上限时删除最久未使用的条目"""
+        count = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM tm WHERE key IN (SELECT key FROM tm ORDER BY last_used LIMIT ?)", (overflow,)
+            )
+            self._conn.commit()
+            logging.info(f"翻译记忆超出上限，已清理 {overflow} 条")
+
+    def stats(self):
+        """返回命中统计"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "lru_entries": len(self._lru)}
@@ -1,11 +1,56 @@
 import logging
 import abc
+import time
+import random
+import requests
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from .http_session import get_session, get_timeout
+from .translation_memory import get_translation_memory, make_key
+from .endpoint_pool import get_endpoint_pool
+from .metrics import Metrics
+from .batch_planner import estimate_entry_tokens
+from .log_setup import PayloadText
+
+# 可以重试的HTTP状态码
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+# 鉴权失败的状态码：不重试，但计为该端点的失败，key无效的成员会被剔除
+AUTH_FAILURE_STATUS = (401, 403)
+
+# 保留的批量翻译拆分记录条数
+BATCH_SPLIT_HISTORY = 100
 
 class TranslationService(abc.ABC):
+    # 后端名称，用于限流配置和翻译记忆的缓存键
+    backend = ""
+
     def __init__(self, config):
         self.config = config
         self.enable_logging = config.get("enable_logging", False)
+        # 请求和响应内容的日志：单条最大字符数和抽样比例
+        self.payload_max_chars = int(config.get("log_payload_max_chars", 2000))
+        self.payload_sample_rate = float(config.get("log_payload_sample_rate", 1.0))
         self.cancel_translation = False  # 添加取消标志
+        # 共享的keep-alive连接池，跨多次翻译复用
+        self.session = get_session(config)
+        self.timeout = get_timeout(config)
+        # 本地翻译记忆，命中时不再调用API
+        self.memory = get_translation_memory(config)
+        # 同一后端共享的端点池，每个成员带有自己的限流器
+        self.endpoints = get_endpoint_pool(config, self.backend, self.endpoint_specs(config))
+        # 重试设置
+        self.max_retries = int(config.get("max_retries", 3))
+        self.retry_base_delay = float(config.get("retry_base_delay", 1.0))
+        self.retry_max_delay = float(config.get("retry_max_delay", 60.0))
+        # 最近的批量翻译拆分重试记录，每项包含拆分原因和批次规模；只保留有限条数，
+        # 服务在界面中长期复用时不会无限增长。单次翻译的拆分次数由调用方传入的stats统计
+        self.batch_splits = deque(maxlen=BATCH_SPLIT_HISTORY)
+        # 各阶段耗时、请求和token计数，界面每次翻译前重置
+        self.metrics = Metrics()
+        # 预览翻译的结果 {缓存键: 译文}，未启用翻译记忆时也能在之后的完整翻译中复用
+        self.preview_results = {}
 
     def cancel(self):
         """取消翻译过程"""
@@ -16,52 +61,253 @@ class TranslationService(abc.ABC):
         """重置取消标志"""
         self.cancel_translation = False
 
+    def translate_text(self, text, target_lang, system_prompt=None, on_delta=None, stats=None):
+        """
+        翻译单个文本，优先使用翻译记忆，on_delta在流式响应时接收每段返回内容
+        
+        stats (Metrics, optional) 为调用方的计数器，记录本次调用的翻译记忆命中数(memory_hits)
+        """
+        if not text.strip():
+            return ""
+        
+        if self.memory is None and not self.preview_results:
+            return self._translate_text(text, target_lang, system_prompt, on_delta)
+        
+        key = self.memory_key(text, target_lang, system_prompt)
+        cached = self.memory.get(key) if self.memory is not None else None
+        if cached is not None and stats is not None:
+            stats.increment("memory_hits")
+        if cached is None:
+            # 预览过的文本在未启用翻译记忆时也直接复用
+            cached = self.preview_results.get(key)
+        if cached is not None:
+            self.metrics.increment("cache_hits")
+            return cached
+        
+        self.metrics.increment("cache_misses")
+        translated = self._translate_text(text, target_lang, system_prompt, on_delta)
+        if translated and self.memory is not None:
+            self.memory.put(key, translated)
+        return translated
+
+    def batch_translate(self, texts_dict, target_lang, on_entry=None, stats=None):
+        """
+        批量翻译多个文本，只有翻译记忆未命中的文本才会调用API
+        
+        on_entry(文本ID, 译文) 在每个文本翻译完成时调用，流式响应时可在整个批次完成前调用。
+        stats (Metrics, optional) 为调用方的计数器，记录本次调用的翻译记忆命中数(memory_hits)
+        和批次拆分次数(batch_splits)，多个文件并发翻译时互不影响
+        """
+        if not texts_dict:
+            return {}
+        if self.memory is None and not self.preview_results:
+            return self._batch_translate(texts_dict, target_lang, on_entry, stats)
+        
+        keys = {text_id: self.memory_key(text, target_lang) for text_id, text in texts_dict.items()}
+        cached = self.memory.get_many(list(set(keys.values()))) if self.memory is not None else {}
+        if cached and stats is not None:
+            stats.increment("memory_hits", sum(1 for key in keys.values() if key in cached))
+        for key in keys.values():
+            if key not in cached and key in self.preview_results:
+                cached[key] = self.preview_results[key]
+        
+        result = {text_id: cached[key] for text_id, key in keys.items() if key in cached}
+        misses = {text_id: text for text_id, text in texts_dict.items() if text_id not in result}
+        self.metrics.increment("cache_hits", len(result))
+        self.metrics.increment("cache_misses", len(misses))
+        
+        if on_entry:
+            for text_id, translation in result.items():
+                on_entry(text_id, translation)
+        
+        if misses:
+            translated = self._batch_translate(misses, target_lang, on_entry, stats) or {}
+            new_items = {}
+            for text_id, translation in translated.items():
+                if text_id in misses and translation:
+                    result[text_id] = translation
+                    new_items[keys[text_id]] = translation
+            if self.memory is not None:
+                self.memory.put_many(new_items)
+        
+        return result
+    
+    def preview_translate(self, texts_dict, target_lang, on_entry=None):
+        """
+        翻译预览样本，整个样本作为一个批次请求
+        
+        结果除写入翻译记忆外还保存在本服务中，之后的完整翻译直接复用，不再重复请求。
+        """
+        result = self.batch_translate(texts_dict, target_lang, on_entry)
+        for text_id, translation in result.items():
+            self.preview_results[self.memory_key(texts_dict[text_id], target_lang)] = translation
+        return result
+    
+    def cached_ids(self, texts_dict, target_lang):
+        """
+        预估用：返回翻译记忆中已有译文的文本ID集合
+        
+        只读查询，不调用API，也不影响命中统计。
+        """
+        if not texts_dict or (self.memory is None and not self.preview_results):
+            return set()
+        keys = {text_id: self.memory_key(text, target_lang) for text_id, text in texts_dict.items()}
+        found = self.memory.contains_many(list(set(keys.values()))) if self.memory is not None else set()
+        found.update(key for key in keys.values() if key in self.preview_results)
+        return {text_id for text_id, key in keys.items() if key in found}
+    
+    def estimate_requests(self, batches):
+        """预估翻译这些批次需要的请求数，默认每个批次一次请求"""
+        return len(batches)
+    
+    def estimate_batch_tokens(self, texts_dict, target_lang=""):
+        """预估一个批次的 (输入token, 输出token)"""
+        output_ratio = float(self.config.get("output_token_ratio", 1.5))
+        input_tokens = output_tokens = 0
+        for key, text in texts_dict.items():
+            entry_input, entry_output = estimate_entry_tokens(key, text, output_ratio)
+            input_tokens += entry_input
+            output_tokens += entry_output
+        return input_tokens, output_tokens
+
+    def memory_key(self, text, target_lang, system_prompt=None):
+        """生成翻译记忆的缓存键，子类可加入模型和系统提示词"""
+        return make_key(text, target_lang, self.backend or type(self).__name__, "", system_prompt or "")
+
     @abc.abstractmethod
-    def translate_text(self, text, target_lang, system_prompt=None):
-        """翻译单个文本"""
+    def _translate_text(self, text, target_lang, system_prompt=None, on_delta=None):
+        """调用API翻译单个文本"""
         pass
 
     @abc.abstractmethod
-    def batch_translate(self, texts_dict, target_lang):
-        """批量翻译多个文本"""
+    def _batch_translate(self, texts_dict, target_lang, on_entry=None, stats=None):
+        """调用API批量翻译多个文本，拆分重试时记录到stats的batch_splits"""
         pass
 
-    def log_info(self, message):
-        if self.enable_logging:
-            logging.info(message)
+    def request_concurrency(self):
+        """每个文件同时进行的请求数上限，默认为max_concurrent_requests"""
+        return max(1, int(self.config.get("max_concurrent_requests", 4)))
+    
+    def as_async(self):
+        """获取本服务的批次调度器 (AsyncTranslationService)"""
+        raise NotImplementedError("子类必须实现as_async方法")
 
-    def log_error(self, message):
-        logging.error(message)
+    def endpoint_specs(self, config):
+        """返回端点池成员列表 [{"url": ..., "key": ..., "weight": ...}]，由子类实现"""
+        return []
 
-    def translate_text(self, prompt, target_lang, system_prompt=None):
+    def _post(self, path, tokens=0, headers=None, **kwargs):
         """
-        翻译文本到目标语言
+        经过负载均衡、限流和重试发送POST请求
+        
+        每次尝试从端点池选择一个成员。遇到429/5xx、连接错误或超时时按抖动指数退避重试，
+        优先遵守服务端的Retry-After，重试时可能换到其他成员。
         
         Args:
-            prompt (str): 要翻译的文本
-            target_lang (str): 目标语言代码
-            system_prompt (str, optional): 翻译器特定的系统提示
+            path (str): 相对于端点地址的请求路径
+            tokens (int): 本次请求预计消耗的token数，用于token限流
+            headers (dict, optional): 请求头，成员有key时自动添加Authorization
             
         Returns:
-            str: 翻译后的文本
+            requests.Response: 最后一次请求的响应，取消时返回None
         """
-        # 获取当前选择的翻译器
-        translator = self.get_current_translator()
-        
-        # 获取用户配置的系统提示(如果有)
-        user_system_prompt = self.config.get_config().get("system_prompt", "")
-        
-        # 合并系统提示
-        combined_system_prompt = None
-        if user_system_prompt and system_prompt:
-            # 如果两者都存在，可以合并或作为两条消息处理
-            combined_system_prompt = f"{user_system_prompt}\n\n{system_prompt}"
-        elif user_system_prompt:
-            combined_system_prompt = user_system_prompt
-        elif system_prompt:
-            combined_system_prompt = system_prompt
-        
-        # 调用翻译器的翻译方法，传入系统提示
-        translated_text = translator.translate(prompt, target_lang, system_prompt=combined_system_prompt)
-        
-        return translated_text 
\ No newline at end of file
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            member = self.endpoints.acquire()
+            if member is None:
+                raise ValueError(f"{self.backend}未配置可用的端点")
+            
+            try:
+                with self.metrics.timer("rate_limit_wait"):
+                    acquired = member.rate_limiter.acquire(tokens, lambda: self.cancel_translation)
+                if not acquired:
+                    self.endpoints.release(member, success=True)
+                    return None
+                
+                request_headers = dict(headers or {})
+                if member.key:
+                    request_headers["Authorization"] = f"Bearer {member.key}"
+                self.log_info("%s请求发送至 %s%s", self.backend, member, path)
+                
+                retry_after = None
+                self.metrics.increment("requests")
+                with self.metrics.timer("http"):
+                    response = self.session.post(member.url + path, headers=request_headers, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.endpoints.release(member, success=response.status_code not in AUTH_FAILURE_STATUS)
+                    return response
+                self.endpoints.release(member, success=False)
+                self.metrics.increment("http_errors")
+                if attempt >= self.max_retries:
+                    return response
+                retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+                reason = f"HTTP {response.status_code}"
+                response.close()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.endpoints.release(member, success=False)
+                self.metrics.increment("http_errors")
+                if attempt >= self.max_retries:
+                    raise
+                reason = type(e).__name__
+            except Exception:
+                self.endpoints.release(member, success=False)
+                raise
+            
+            if retry_after is not None:
+                delay = min(retry_after, self.retry_max_delay)
+                # 服务端明确要求等待时，该成员的所有请求一起暂停
+                member.rate_limiter.pause(delay)
+            else:
+                # 全抖动指数退避
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+            
+            attempt += 1
+            self.metrics.increment("retries")
+            logging.warning(f"{self.backend}请求 {member} 失败({reason})，{delay:.1f}秒后第{attempt}次重试")
+            if not self._sleep(delay):
+                return None
+
+    def _sleep(self, seconds, poll_interval=0.2):
+        """可被取消打断的等待，取消时返回False"""
+        deadline = time.monotonic() + seconds
+        while True:
+            if self.cancel_translation:
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, poll_interval))
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """解析Retry-After头，支持秒数和HTTP日期两种格式"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def log_info(self, message, *args):
+        """启用日志时记录，参数按logging的%格式延迟到输出时再格式化"""
+        if self.enable_logging:
+            logging.info(message, *args)
+
+    def sample_payload_logging(self):
+        """决定本次请求是否记录请求和响应内容，按log_payload_sample_rate抽样"""
+        if not self.enable_logging or not logging.getLogger().isEnabledFor(logging.INFO):
+            return False
+        return self.payload_sample_rate >= 1 or random.random() < self.payload_sample_rate
+    
+    def log_payload(self, label, payload):
+        """记录请求或响应内容，超过log_payload_max_chars的部分截断，序列化在日志输出线程中进行"""
+        logging.info("%s: %s", label, PayloadText(payload, self.payload_max_chars))
+    
+    def log_error(self, message, *args):
+        logging.error(message, *args)
\ No newline at end of file
@@ -1,7 +1,30 @@
+import os
 import abc
+import time
 import logging
-import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from services.batch_planner import plan_batches
+from services.metrics import Metrics, estimate_seconds, history_path, load_history
+from services.log_setup import setup_logging
+from .incremental import save_fingerprints
+
+# 预估结果中可以按文件累加的计数
+ESTIMATE_COUNTS = (
+    "entries", "unique", "memory_hits", "to_translate", "characters",
+    "batches", "requests", "input_tokens", "output_tokens"
+)
+
+
+def merge_estimates(estimates):
+    """累加多个文件的预估结果，耗时需在合计后由finish_estimate重新计算"""
+    total = {}
+    for estimate in estimates:
+        for key, value in estimate.items():
+            if key != "seconds" and isinstance(value, int) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+    for key in ESTIMATE_COUNTS:
+        total.setdefault(key, 0)
+    return total
 
 class BaseTranslator(abc.ABC):
     def __init__(self, config, translation_service):
@@ -11,17 +34,8 @@ class BaseTranslator(abc.ABC):
         self.cancel_translation = False
         
     def setup_logging(self):
-        if not os.path.exists('logs'):
-            os.makedirs('logs')
-        log_file = os.path.join('logs', f'translator_{datetime.now().strftime("%Y%m%d")}.log')
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        # 日志管道在进程内只配置一次，创建多个翻译器不会重复添加处理器
+        setup_logging(self.config)
     
     @abc.abstractmethod
     def parse_file(self, file_path):
@@ -29,15 +43,555 @@ class BaseTranslator(abc.ABC):
         pass
     
     @abc.abstractmethod
+    def preview_sample(self, file_path, count):
+        """
+        选择预览用的样本
+        
+        Returns:
+            tuple: (可翻译条目总数, [(文本ID, 原文)])
+        
+        Raises:
+            ValueError: 文件无法读取或解析，异常信息可直接显示
+        """
+        pass
+    
+    def translate_preview(self, sample, on_entry=None):
+        """
+        将预览样本作为一个批次翻译为配置的目标语言
+        
+        译文保存在翻译服务中，之后的完整翻译遇到相同原文时直接复用。
+        
+        Args:
+            sample (list[tuple]): (文本ID, 原文) 列表
+            on_entry (callable, optional): 每条译文完成时回调 (文本ID, 原文, 译文)，可能在工作线程中调用
+        
+        Returns:
+            dict: {文本ID: 译文}，翻译失败的条目不在结果中
+        """
+        # 重置取消标志
+        self.cancel_translation = False
+        self.translation_service.reset_cancel()
+        
+        target_lang = self.config.get("target_lang", "英语")
+        _, unique = self.dedupe_entries(sample)
+        texts_dict = dict(unique)
+        ids_by_text = {}
+        for entry_id, text in sample:
+            ids_by_text.setdefault(text, []).append(entry_id)
+        
+        result = {}
+        
+        def entry_done(unique_id, translation):
+            text = texts_dict.get(unique_id)
+            for entry_id in ids_by_text.get(text, []):
+                if entry_id not in result:
+                    result[entry_id] = translation
+                    if on_entry:
+                        on_entry(entry_id, text, translation)
+        
+        translated = self.translation_service.preview_translate(texts_dict, target_lang, entry_done)
+        # 不支持逐条回调的请求方式在整个批次完成后补齐
+        for unique_id, translation in (translated or {}).items():
+            entry_done(unique_id, translation)
+        return result
+    
     def preview_translation(self, file_path):
-        """预览翻译结果"""
+        """抽样翻译并返回预览文本"""
+        count = max(1, int(self.config.get("preview_sample_size", 5)))
+        try:
+            total, sample = self.preview_sample(file_path, count)
+        except ValueError as e:
+            return str(e)
+        if not sample:
+            return "未找到可翻译的内容"
+        
+        translations = self.translate_preview(sample)
+        preview_text = self.format_preview_header(total, len(sample))
+        for entry_id, text in sample:
+            preview_text += self.format_preview_entry(entry_id, text, translations.get(entry_id))
+        return preview_text
+    
+    def format_preview_header(self, total, count):
+        return f"从{total}个条目中随机选择{count}个进行预览（译文已保存，执行翻译时直接复用）:\n\n"
+    
+    def format_preview_entry(self, entry_id, original, translation):
+        text = f"{entry_id}\n   原文: {original}\n"
+        return text + f"   译文: {translation if translation else '[翻译失败]'}\n\n"
+    
+    def translate_file_languages(self, file_path, outputs, progress_callback=None):
+        """
+        将文件同时翻译为多个目标语言，每个语言完成后立即保存
+        
+        源文件只解析一次，各语言的批次共用同一个并发请求池。不重置取消标志，多个文件可以在不同线程中同时调用。
+        启用断点续传时，每个完成的批次追加到输出文件旁的断点日志，
+        并每隔checkpoint_flush_interval秒写出一次部分结果（未完成的条目保留原文）；
+        取消或出错后再次运行同一任务，只翻译日志中没有的条目。
+        断点日志和输出文件在单独的写出线程中按顺序写入，事件循环线程不等待磁盘I/O。
+        
+        Args:
+            file_path (str): 源文件
+            outputs (dict): {目标语言: 输出路径}
+            progress_callback (callable, optional): 进度回调，按所有语言合计
+        
+        Returns:
+            dict: {目标语言: 文件结果}，文件结果包含 success、message、translated、failed、unchanged、pending
+        """
+        result = {"success": False, "translated": 0, "failed": 0, "unchanged": 0, "pending": 0}
+        results = {}
+        states = {}
+        metrics = self.translation_service.metrics
+        incremental = self.config.get("incremental_mode", False)
+        flush_interval = float(self.config.get("checkpoint_flush_interval", 60))
+        # 单线程执行，断点日志的追加、部分结果和最终结果按提交顺序写出
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="output-writer")
+        try:
+            try:
+                source, states = self._prepare_languages(file_path, outputs)
+            except ValueError as e:
+                return {lang: dict(result, message=str(e)) for lang in outputs}
+            
+            def write_output(lang, translations):
+                """按目前的译文写出输出文件，返回 (成功翻译数, 失败数)"""
+                state = states[lang]
+                merged = dict(state["resumed"])
+                merged.update(translations)
+                with metrics.timer("write"):
+                    translated, failed = self.save_output(file_path, outputs[lang], source, state, merged)
+                if incremental:
+                    # 翻译失败的键不记录指纹，下次运行时重新翻译
+                    save_fingerprints(outputs[lang], file_path, state["fingerprints"])
+                return translated, failed
+            
+            def write_partial(lang, translations):
+                try:
+                    write_output(lang, translations)
+                    logging.info(f"已写出 {lang} 部分译文: {outputs[lang]}")
+                except Exception as e:
+                    logging.error(f"写出部分译文 {outputs[lang]} 出错: {str(e)}")
+            
+            def record_batch(lang, batch_translations, translations):
+                state = states[lang]
+                if state["journal"] is None:
+                    return
+                writer.submit(state["journal"].append, batch_translations)
+                # 定期写出部分结果，进程意外退出时输出文件中也保留已完成的译文
+                if flush_interval > 0 and time.monotonic() - state["flushed_at"] >= flush_interval:
+                    state["flushed_at"] = time.monotonic()
+                    # 事件循环线程会继续更新translations，交给写出线程的是当前的副本
+                    writer.submit(write_partial, lang, dict(translations))
+            
+            def write_language(lang, translations):
+                # 检查是否取消
+                if self.cancel_translation or self.translation_service.cancel_translation:
+                    return
+                output_path = outputs[lang]
+                state = states[lang]
+                try:
+                    translated, failed = write_output(lang, translations)
+                    if state["journal"] is not None:
+                        state["journal"].remove()
+                    metrics.increment("entries_translated", translated)
+                    metrics.increment("entries_failed", failed)
+                    metrics.increment("files")
+                    
+                    message = f"翻译完成!\n成功翻译: {translated}\n失败: {failed}\n"
+                    if state["resumed"]:
+                        message += f"断点续传: 沿用 {len(state['resumed'])} 条上次已完成的译文\n"
+                    if incremental:
+                        message += f"增量模式: 沿用 {state['unchanged']} 条未变化的译文\n"
+                    results[lang] = {
+                        "success": True,
+                        "message": message,
+                        "translated": translated,
+                        "failed": failed,
+                        "unchanged": state["unchanged"],
+                        "pending": len(state["pending"])
+                    }
+                    logging.info(f"已保存 {lang} 译文: {output_path}")
+                except Exception as e:
+                    logging.error(f"写入 {output_path} 过程中出现错误: {str(e)}")
+                    results[lang] = dict(result, message=f"翻译过程中出现错误: {str(e)}")
+            
+            all_translations, stats = self.translate_languages(
+                self._entries_to_translate(states),
+                progress_callback,
+                lambda lang, translations: writer.submit(write_language, lang, translations),
+                record_batch
+            )
+            # 等待写出线程完成所有已提交的写入
+            writer.shutdown(wait=True)
+            
+            # 统计为所有语言合计，在全部完成后追加到每个成功的结果中
+            for lang, output_path in outputs.items():
+                if lang not in results:
+                    partial = self.save_partial(lang, states[lang], all_translations[lang], write_output)
+                    results[lang] = dict(result, message="翻译已取消" + partial)
+                elif results[lang]["success"]:
+                    results[lang]["message"] += self.format_stats(stats) + f"保存至: {output_path}"
+            return results
+        
+        except Exception as e:
+            logging.error(f"翻译 {file_path} 过程中出现错误: {str(e)}")
+            error = dict(result, message=f"翻译过程中出现错误: {str(e)}")
+            return {lang: results.get(lang, error) for lang in outputs}
+        finally:
+            writer.shutdown(wait=True)
+            for state in states.values():
+                if state["journal"] is not None:
+                    state["journal"].close()
+    
+    @abc.abstractmethod
+    def _prepare_languages(self, file_path, outputs):
+        """
+        解析源文件，按语言筛选需要翻译的条目
+        
+        Returns:
+            tuple: (解析结果, {目标语言: 任务状态})，解析结果原样传给write_output；
+                任务状态包含 pending、unchanged、fingerprints、resumed、journal、flushed_at
+        
+        Raises:
+            ValueError: 文件无法读取或解析，异常信息可直接显示
+        """
         pass
     
     @abc.abstractmethod
-    def translate_file(self, file_path, output_path, progress_callback=None):
-        """翻译文件并保存"""
+    def _entries_to_translate(self, states):
+        """各语言需要发送翻译的 (文本ID, 原文)，断点日志中已完成的不再发送"""
+        pass
+    
+    @abc.abstractmethod
+    def write_output(self, file_path, output_path, source, state, translations):
+        """
+        按译文写出一个语言的输出文件，翻译成功的条目记录到state的fingerprints
+        
+        Args:
+            file_path (str): 源文件
+            output_path (str): 要写入的路径
+            source: _prepare_languages返回的解析结果
+            state (dict): 该语言的任务状态
+            translations (dict): {原文: 译文}，已合并断点日志中的译文
+        
+        Returns:
+            tuple: (成功翻译数, 失败数)
+        """
         pass
     
+    def save_output(self, file_path, output_path, source, state, translations):
+        """先写入同目录的临时文件再替换输出文件，写出过程中中断时已有的输出文件保持完整"""
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        temp_path = output_path + ".tmp"
+        try:
+            counts = self.write_output(file_path, temp_path, source, state, translations)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return counts
+    
+    @abc.abstractmethod
+    def estimate_file_languages(self, file_path, outputs):
+        """
+        不调用接口，预估将文件翻译为多个目标语言的请求数、token数和耗时
+        
+        与translate_file_languages相同地解析文件并应用增量模式和断点日志的筛选，不写出任何文件。
+        
+        Returns:
+            dict: estimate_languages 的结果，另含 unchanged、resumed、seconds、eta_source
+        """
+        pass
+    
+    def translate_file_result(self, file_path, output_path, progress_callback=None):
+        """翻译文件为配置的目标语言并保存，返回结构化的文件结果"""
+        target_lang = self.config.get("target_lang", "英语")
+        return self.translate_file_languages(file_path, {target_lang: output_path}, progress_callback)[target_lang]
+    
+    def translate_file(self, file_path, output_path, progress_callback=None):
+        """翻译文件并保存，返回 (是否成功, 结果信息)"""
+        # 重置取消标志
+        self.cancel_translation = False
+        self.translation_service.reset_cancel()
+        
+        result = self.translate_file_result(file_path, output_path, progress_callback)
+        return result["success"], result["message"]
+    
+    def translate_file_to_languages(self, file_path, outputs, progress_callback=None):
+        """翻译文件为多个目标语言并保存，返回 (是否全部成功, 按语言汇总的结果信息)"""
+        # 重置取消标志
+        self.cancel_translation = False
+        self.translation_service.reset_cancel()
+        
+        results = self.translate_file_languages(file_path, outputs, progress_callback)
+        message = "\n\n".join(f"[{lang}]\n{result['message']}" for lang, result in results.items())
+        return all(result["success"] for result in results.values()), message
+    
+    def plan_batches(self, entries):
+        """按配置的token预算将 (文本ID, 原文) 列表打包成批次"""
+        return plan_batches(
+            entries,
+            token_budget=int(self.config.get("batch_token_budget", 3000)),
+            max_entries=int(self.config.get("batch_max_entries", 100)),
+            output_ratio=float(self.config.get("output_token_ratio", 1.5))
+        )
+    
+    def dedupe_entries(self, entries):
+        """
+        合并相同原文，使用第一次出现时的ID作为批量请求中的键
+        
+        Returns:
+            tuple: ({原文: 出现次数}, [(文本ID, 原文)])
+        """
+        counts = {}
+        unique = []
+        used_ids = set()
+        for entry_id, text in entries:
+            if text in counts:
+                counts[text] += 1
+                continue
+            counts[text] = 1
+            # 不同原文使用了相同ID时加后缀区分，避免批量请求中的键冲突
+            unique_id = entry_id
+            suffix = 1
+            while unique_id in used_ids:
+                suffix += 1
+                unique_id = f"{entry_id}#{suffix}"
+            used_ids.add(unique_id)
+            unique.append((unique_id, text))
+        return counts, unique
+    
+    def translate_languages(self, entries_by_lang, progress_callback=None, on_language_done=None, on_batch_done=None):
+        """
+        将同一份源文件的条目同时翻译为多个目标语言
+        
+        每个语言分别去重和打包批次，所有语言的批次在同一个事件循环中并发翻译，
+        共用服务的并发请求数限制。某个语言的批次全部完成时立即回调，
+        调用方可以先写出该语言的文件，不必等待其他语言。
+        
+        Args:
+            entries_by_lang (dict): {目标语言: [(文本ID, 原文)]}
+            progress_callback (callable, optional): 进度回调 (百分比, 已完成条目数, 总条目数)，按所有语言合计
+            on_language_done (callable, optional): 某个语言完成时回调 (目标语言, {原文: 译文})，
+                取消时未完成的语言不会回调
+            on_batch_done (callable, optional): 每个批次完成时回调 (目标语言, 本批次的{原文: 译文}, 该语言目前的{原文: 译文})，
+                用于记录断点和定期写出部分结果
+        
+        Returns:
+            tuple: ({目标语言: {原文: 译文}}, 统计)，统计为所有语言合计
+        """
+        metrics = self.translation_service.metrics
+        # 本次调用的计数器：服务的翻译记忆和拆分记录由并发翻译的多个文件共用，不能按差值统计
+        call_stats = Metrics()
+        
+        batches = []
+        batch_langs = []
+        counts = {}
+        entry_texts = {}
+        remaining = {}
+        translations = {}
+        unique_total = 0
+        for lang, entries in entries_by_lang.items():
+            lang_counts, unique = self.dedupe_entries(entries)
+            counts[lang] = lang_counts
+            entry_texts[lang] = dict(unique)
+            translations[lang] = {}
+            unique_total += len(unique)
+            # DeepLX逐条并发请求，ChatGPT每个批次一次请求
+            lang_batches = self.plan_batches(unique)
+            remaining[lang] = len(lang_batches)
+            batches.extend(lang_batches)
+            batch_langs.extend([lang] * len(lang_batches))
+        
+        total = sum(len(entries) for entries in entries_by_lang.values())
+        processed = 0
+        done_ids = set()
+        
+        def mark_done(lang, entry_ids):
+            nonlocal processed
+            before = processed
+            for entry_id in entry_ids:
+                if (lang, entry_id) not in done_ids:
+                    done_ids.add((lang, entry_id))
+                    processed += counts[lang][entry_texts[lang][entry_id]]
+            metrics.increment("entries_processed", processed - before)
+            if progress_callback and total:
+                progress_callback(processed / total * 100, processed, total)
+        
+        def finish_language(lang):
+            if on_language_done:
+                on_language_done(lang, translations[lang])
+        
+        def on_entry_done(batch_idx, entry_id, translation):
+            # 流式响应时每条译文完成即更新进度
+            lang = batch_langs[batch_idx]
+            if entry_id in entry_texts[lang] and (lang, entry_id) not in done_ids:
+                mark_done(lang, [entry_id])
+        
+        def batch_done(batch_idx, translated_texts):
+            lang = batch_langs[batch_idx]
+            batch = batches[batch_idx]
+            batch_translations = {}
+            for entry_id, text in batch:
+                if translated_texts.get(entry_id):
+                    batch_translations[text] = translated_texts[entry_id]
+            translations[lang].update(batch_translations)
+            unresolved = sum(counts[lang][text] for entry_id, text in batch if not translated_texts.get(entry_id))
+            if unresolved:
+                metrics.increment("entries_unresolved", unresolved)
+            if on_batch_done:
+                on_batch_done(lang, batch_translations, translations[lang])
+            mark_done(lang, [entry_id for entry_id, _ in batch])
+            remaining[lang] -= 1
+            if remaining[lang] == 0:
+                finish_language(lang)
+        
+        # 没有待翻译条目的语言（如增量模式下全部未变化）直接完成
+        for lang, count in remaining.items():
+            if count == 0:
+                finish_language(lang)
+        
+        if batches:
+            # 批次按完成顺序回调，各语言独立完成，不按批次顺序等待
+            self.translation_service.as_async().run_batches(
+                [dict(batch) for batch in batches],
+                batch_langs,
+                batch_done,
+                on_entry_done,
+                call_stats
+            )
+            if self.translation_service.memory is not None:
+                # 提交本次运行缓冲的翻译记忆写入
+                self.translation_service.memory.flush()
+        
+        counted = call_stats.snapshot()
+        stats = {
+            "entries": total,
+            "unique": unique_total,
+            "memory_hits": counted.get("memory_hits", 0) if self.translation_service.memory else None,
+            "batch_splits": counted["batch_splits"]
+        }
+        return translations, stats
+    
+    def estimate_languages(self, entries_by_lang):
+        """
+        预估翻译这些条目需要的请求数和token数，不调用接口
+        
+        与translate_languages相同地去重和打包批次，再去掉翻译记忆中已有的条目
+        （只读查询，不影响命中统计），按后端的请求方式计算请求数。
+        
+        Args:
+            entries_by_lang (dict): {目标语言: [(文本ID, 原文)]}
+        
+        Returns:
+            dict: 预估结果，包含 entries、unique、memory_hits、to_translate、characters、
+                batches、requests、input_tokens、output_tokens
+        """
+        service = self.translation_service
+        estimate = dict.fromkeys(ESTIMATE_COUNTS, 0)
+        for lang, entries in entries_by_lang.items():
+            _, unique = self.dedupe_entries(entries)
+            cached = service.cached_ids(dict(unique), lang)
+            estimate["entries"] += len(entries)
+            estimate["unique"] += len(unique)
+            estimate["memory_hits"] += len(cached)
+            for batch in self.plan_batches(unique):
+                # 批次中命中翻译记忆的条目不会发送，全部命中的批次不发请求
+                texts_dict = {entry_id: text for entry_id, text in batch if entry_id not in cached}
+                if not texts_dict:
+                    continue
+                input_tokens, output_tokens = service.estimate_batch_tokens(texts_dict, lang)
+                estimate["to_translate"] += len(texts_dict)
+                estimate["characters"] += sum(len(text) for text in texts_dict.values())
+                estimate["batches"] += 1
+                estimate["requests"] += service.estimate_requests([texts_dict])
+                estimate["input_tokens"] += input_tokens
+                estimate["output_tokens"] += output_tokens
+        return estimate
+    
+    def finish_estimate(self, estimate, parallel_files=1):
+        """
+        根据吞吐量历史和限流配置计算预估耗时，写入 seconds 和 eta_source
+        
+        Args:
+            estimate (dict): estimate_languages 的结果，可以是多个文件合计
+            parallel_files (int): 同时翻译的文件数，每个文件有各自的并发请求数限制
+        """
+        service = self.translation_service
+        concurrency = service.request_concurrency() * max(1, parallel_files)
+        model = getattr(service, "model_name", "")
+        seconds, source = estimate_seconds(
+            load_history(history_path(self.config)),
+            service.backend, model, estimate["requests"], estimate["output_tokens"], concurrency
+        )
+        rate_limited = service.endpoints.min_seconds(
+            estimate["requests"], estimate["input_tokens"] + estimate["output_tokens"]
+        )
+        if rate_limited > seconds:
+            seconds = rate_limited
+            source += "，受每分钟请求数/token数限制"
+        estimate["seconds"] = round(seconds, 1)
+        estimate["eta_source"] = source
+        return estimate
+    
+    def format_estimate(self, estimate):
+        """将预估结果格式化为报告文本"""
+        if estimate.get("error"):
+            return f"无法预估: {estimate['error']}"
+        message = ""
+        if estimate.get("files"):
+            message += f"文件: {estimate['files']} 个\n"
+        message += f"条目: {estimate['entries']} 条，去重后 {estimate['unique']} 条"
+        if estimate.get("unchanged"):
+            message += f"，增量模式沿用 {estimate['unchanged']} 条"
+        if estimate.get("resumed"):
+            message += f"，断点续传沿用 {estimate['resumed']} 条"
+        message += f"\n翻译记忆命中: {estimate['memory_hits']} 条"
+        message += f"\n需要翻译: {estimate['to_translate']} 条（{estimate['characters']} 字符），"
+        message += f"{estimate['batches']} 个批次，约 {estimate['requests']} 个请求"
+        message += f"\n预计token: 输入约 {estimate['input_tokens']}，输出约 {estimate['output_tokens']}"
+        minutes, seconds = divmod(int(round(estimate.get("seconds", 0))), 60)
+        duration = f"{minutes} 分 {seconds} 秒" if minutes else f"{seconds} 秒"
+        message += f"\n预计耗时: 约 {duration}（{estimate.get('eta_source', '')}）"
+        errors = estimate.get("errors") or []
+        if errors:
+            message += f"\n\n无法解析的文件 ({len(errors)} 个):\n" + "\n".join(errors[:10])
+            if len(errors) > 10:
+                message += f"\n... 另有 {len(errors) - 10} 个"
+        return message
+    
+    def save_partial(self, lang, state, translations, write_output):
+        """
+        取消后写出已完成的部分译文，断点日志保留，再次运行时只翻译剩余的条目
+        
+        Args:
+            lang (str): 目标语言
+            state (dict): 该语言的任务状态，包含journal和resumed
+            translations (dict): 本次运行已完成的 {原文: 译文}
+            write_output (callable): write_output(目标语言, 译文) 写出输出文件并返回 (成功翻译数, 失败数)
+        
+        Returns:
+            str: 追加到结果信息中的说明，未启用断点续传或没有已完成的译文时为空
+        """
+        if state["journal"] is None or not (translations or state["resumed"]):
+            return ""
+        try:
+            translated, _ = write_output(lang, translations)
+        except Exception as e:
+            logging.error(f"写出部分译文出错: {str(e)}")
+            return ""
+        return f"\n已保存 {translated} 条已完成的译文，再次运行将从断点继续"
+    
+    def format_stats(self, stats):
+        """将translate_languages的统计格式化为报告文本"""
+        message = ""
+        if stats["entries"]:
+            dedup_ratio = (1 - stats["unique"] / stats["entries"]) * 100
+            message += f"去重: {stats['entries']} 条文本合并为 {stats['unique']} 条待翻译文本 (减少 {dedup_ratio:.1f}%)\n"
+        if stats["memory_hits"] is not None:
+            message += f"翻译记忆命中: {stats['memory_hits']}\n"
+        if stats["batch_splits"]:
+            message += f"批次拆分重试: {stats['batch_splits']} 次\n"
+        return message
+    
     def cancel(self):
         """取消翻译过程"""
         self.cancel_translation = True
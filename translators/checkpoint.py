@@ -0,0 +1,114 @@
+import os
+import json
+import logging
+from .incremental import fingerprint
+
+# 断点日志与输出文件放在一起，每行记录一个已完成批次的译文
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+def journal_path(output_path):
+    return output_path + JOURNAL_SUFFIX
+
+
+class CheckpointJournal:
+    """翻译任务的断点日志
+
+    只追加写入，每个批次完成后写入一行并立即刷到磁盘，进程崩溃或断电最多丢失正在进行的批次。
+    第一行记录源文件和目标语言，之后每行为 {"entries": {原文指纹: 译文}}。
+    按原文指纹而不是键记录，源文件在两次运行之间有修改时，未变化的原文仍可复用。
+    """
+
+    def __init__(self, output_path, source_path, target_lang):
+        self.path = journal_path(output_path)
+        self.source = os.path.abspath(source_path)
+        self.target_lang = target_lang
+        self._file = None
+        # 已有日志属于当前任务时追加，否则重新创建
+        self._resumable = False
+
+    def load(self):
+        """
+        读取上次运行已完成的译文
+
+        Returns:
+            dict: {原文指纹: 译文}，没有日志或日志属于其他源文件、目标语言时为空
+        """
+        if not os.path.exists(self.path):
+            return {}
+        entries = {}
+        header = None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 崩溃时最后一行可能只写入了一半
+                        continue
+                    if header is None:
+                        header = record
+                        if header.get("source") != self.source or header.get("target_lang") != self.target_lang:
+                            logging.warning(f"断点日志 {self.path} 不属于当前任务，将重新开始")
+                            return {}
+                        continue
+                    entries.update(record.get("entries", {}))
+        except OSError as e:
+            logging.error(f"读取断点日志失败: {e}")
+            return {}
+        self._resumable = header is not None
+        return entries
+
+    def resume(self, texts):
+        """
+        从日志中取出给定原文已完成的译文
+
+        Args:
+            texts (iterable): 待翻译的原文
+
+        Returns:
+            dict: {原文: 译文}
+        """
+        entries = self.load()
+        if not entries:
+            return {}
+        resumed = {}
+        for text in texts:
+            translation = entries.get(fingerprint(text))
+            if translation:
+                resumed[text] = translation
+        return resumed
+
+    def append(self, translations):
+        """记录一个已完成批次的 {原文: 译文}，写入后立即刷到磁盘"""
+        if not translations:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a' if self._resumable else 'w', encoding='utf-8')
+                if not self._resumable:
+                    self._write({"source": self.source, "target_lang": self.target_lang})
+                    self._resumable = True
+            self._write({"entries": {fingerprint(text): value for text, value in translations.items()}})
+        except OSError as e:
+            logging.error(f"写入断点日志失败: {e}")
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """任务完成后删除日志"""
+        self.close()
+        self._resumable = False
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except OSError as e:
+            logging.error(f"删除断点日志失败: {e}")
@@ -0,0 +1,51 @@
+import os
+import json
+import hashlib
+import logging
+
+# 指纹文件与输出文件放在一起，记录上次翻译时每个键的原文指纹
+FINGERPRINT_SUFFIX = ".fingerprints.json"
+
+
+def fingerprint(text):
+    """计算原文指纹"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def fingerprint_path(output_path):
+    return output_path + FINGERPRINT_SUFFIX
+
+
+def load_fingerprints(output_path):
+    """读取输出文件对应的指纹，不存在或读取失败时返回None"""
+    path = fingerprint_path(output_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("keys", {})
+    except Exception as e:
+        logging.error(f"读取指纹文件失败: {e}")
+        return None
+
+
+def save_fingerprints(output_path, source_path, fingerprints):
+    """保存输出文件对应的指纹"""
+    try:
+        with open(fingerprint_path(output_path), 'w', encoding='utf-8') as f:
+            json.dump(
+                {"source": os.path.basename(source_path), "keys": fingerprints},
+                f, ensure_ascii=False, indent=2, sort_keys=True
+            )
+    except Exception as e:
+        logging.error(f"保存指纹文件失败: {e}")
+
+
+def is_unchanged(key, text, old_fingerprints):
+    """判断键的原文自上次翻译后是否未变化
+
+    没有指纹文件时（首次启用增量模式）视为未变化，保留已有译文。
+    """
+    if old_fingerprints is None:
+        return True
+    return old_fingerprints.get(key) == fingerprint(text)
@@ -0,0 +1,224 @@
+import re
+import codecs
+import shutil
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from xml.sax.saxutils import escape, quoteattr
+
+XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>\n"
+
+# 按块读取，大文件也只占用固定大小的缓冲区
+CHUNK_SIZE = 1024 * 1024
+
+_ENCODING_PATTERN = re.compile(rb'^(?:\xef\xbb\xbf)?<\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)["\']')
+
+
+def is_translatable(data_node):
+    """带type或mimetype属性的data是嵌入的二进制资源或非字符串类型，不需要翻译"""
+    if data_node.get("type") or data_node.get("mimetype"):
+        return False
+    value_node = data_node.find("value")
+    return value_node is not None and bool(value_node.text)
+
+
+def iter_data_entries(file_path):
+    """
+    逐个读取RESX文件中可翻译的data条目
+
+    基于iterparse，每个根节点的子节点处理完后立即释放，内存占用与文件大小无关。
+
+    Yields:
+        tuple: (名称, 原文)
+    """
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if elem.tag == "data" and is_translatable(elem):
+            yield elem.get("name"), elem.find("value").text
+        if depth == 1:
+            root.clear()
+
+
+def write_translated(source_path, output_path, replace):
+    """
+    逐个节点重写RESX文件，将data的值替换为译文
+
+    与iter_data_entries一样按根节点的子节点增量读取和写出，不在内存中保留整个文档。
+
+    Args:
+        source_path (str): 源文件
+        output_path (str): 输出文件
+        replace (callable): replace(名称, 原文) 返回译文，返回None时保留原文
+
+    Returns:
+        int: 替换的条目数
+    """
+    replaced = 0
+    root = None
+    previous = None
+    depth = 0
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        out.write(XML_DECLARATION)
+        for event, elem in ET.iterparse(source_path, events=("start-ns", "start", "end")):
+            if event == "start-ns":
+                # 保留原文件的命名空间前缀（如xsd、msdata），避免输出为ns0
+                prefix, uri = elem
+                if prefix:
+                    ET.register_namespace(prefix, uri)
+                continue
+
+            if event == "start":
+                if root is None:
+                    root = elem
+                    out.write(_start_tag(elem))
+                depth += 1
+                continue
+
+            depth -= 1
+            if elem.tag == "data" and is_translatable(elem):
+                value_node = elem.find("value")
+                translation = replace(elem.get("name"), value_node.text)
+                if translation:
+                    value_node.text = translation
+                    replaced += 1
+
+            if depth == 1:
+                # 节点之后的空白（tail）在读到下一个节点时才完整，因此延后一个节点写出
+                if previous is None:
+                    out.write(root.text or "")
+                else:
+                    out.write(previous.tail or "")
+                    root.remove(previous)
+                tail = elem.tail
+                elem.tail = None
+                out.write(ET.tostring(elem, encoding="unicode"))
+                elem.tail = tail
+                # 只释放子节点，clear()会同时清掉尚未读到的tail
+                del elem[:]
+                previous = elem
+            elif depth == 0:
+                out.write(previous.tail or "" if previous is not None else root.text or "")
+                out.write(f"</{root.tag}>")
+
+    return replaced
+
+
+def _start_tag(elem):
+    attributes = "".join(f" {name}={quoteattr(value)}" for name, value in elem.attrib.items())
+    return f"<{elem.tag}{attributes}>"
+
+
+def iter_value_spans(file_path):
+    """
+    逐个读取可翻译的data条目及其<value>文本在文件中的字节范围
+
+    基于expat按块解析，范围从文本（或CDATA段）的第一个字节开始，到</value>之前结束。
+
+    Yields:
+        tuple: (名称, 原文, 起始字节, 结束字节)
+    """
+    parser = expat.ParserCreate()
+    found = []
+    stack = []
+    state = {"name": None, "translatable": False, "in_value": False, "start": None, "text": []}
+
+    def start_element(tag, attrs):
+        stack.append(tag)
+        if tag == "data":
+            state["name"] = attrs.get("name")
+            state["translatable"] = not (attrs.get("type") or attrs.get("mimetype"))
+        elif tag == "value" and len(stack) >= 2 and stack[-2] == "data" and state["translatable"]:
+            state.update(in_value=True, start=None, text=[])
+
+    def mark_start(*args):
+        if state["in_value"] and state["start"] is None:
+            state["start"] = parser.CurrentByteIndex
+
+    def character_data(data):
+        if state["in_value"]:
+            mark_start()
+            state["text"].append(data)
+
+    def end_element(tag):
+        if tag == "value" and state["in_value"]:
+            state["in_value"] = False
+            text = "".join(state["text"])
+            if text:
+                found.append((state["name"], text, state["start"], parser.CurrentByteIndex))
+        stack.pop()
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+    parser.StartCdataSectionHandler = mark_start
+
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            parser.Parse(chunk, not chunk)
+            yield from found
+            found.clear()
+            if not chunk:
+                break
+
+
+def detect_encoding(file_path):
+    """读取XML声明中的编码，没有声明时为UTF-8"""
+    with open(file_path, "rb") as f:
+        match = _ENCODING_PATTERN.match(f.read(200))
+    encoding = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        encoding = "utf-8"
+    return encoding
+
+
+def escape_text(text):
+    """转义元素文本，回车写成字符引用以免被XML解析器规范化为换行"""
+    return escape(text).replace("\r", "&#xD;")
+
+
+def rewrite_spans(source_path, output_path, replacements):
+    """
+    只替换指定字节范围的文本，其余内容（注释、引号、空白、换行）按原字节复制
+
+    Args:
+        source_path (str): 源文件
+        output_path (str): 输出文件
+        replacements (list[tuple]): (起始字节, 结束字节, 新文本)，新文本为None的范围保持不变
+
+    Returns:
+        int: 替换的范围数
+    """
+    encoding = detect_encoding(source_path)
+    replaced = 0
+    pos = 0
+    with open(source_path, "rb") as src, open(output_path, "wb") as out:
+        for start, end, text in sorted(replacements):
+            if not text:
+                continue
+            _copy_bytes(src, out, start - pos)
+            src.seek(end)
+            pos = end
+            out.write(escape_text(text).encode(encoding, "xmlcharrefreplace"))
+            replaced += 1
+        shutil.copyfileobj(src, out, CHUNK_SIZE)
+    return replaced
+
+
+def _copy_bytes(src, out, count):
+    while count > 0:
+        chunk = src.read(min(count, CHUNK_SIZE))
+        if not chunk:
+            break
+        out.write(chunk)
+        count -= len(chunk)
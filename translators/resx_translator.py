@@ -1,149 +1,152 @@
 import os
-import xml.etree.ElementTree as ET
+import logging
 import random
-from .base_translator import BaseTranslator
+import time
+from .base_translator import BaseTranslator, merge_estimates
+from .resx_stream import iter_data_entries, iter_value_spans, write_translated, rewrite_spans
+from .incremental import fingerprint, load_fingerprints, is_unchanged
+from .checkpoint import CheckpointJournal
 
 class ResxTranslator(BaseTranslator):
     def __init__(self, config, translation_service):
         super().__init__(config, translation_service)
     
     def parse_file(self, file_path):
+        """逐个读取可翻译的data条目 (名称, 原文)，不在内存中保留整个文档"""
+        return iter_data_entries(file_path)
+    
+    def preview_sample(self, file_path, count):
+        """蓄水池抽样count个条目，只遍历一次文件"""
+        sample = []
+        total = 0
         try:
-            # 读取原始XML以保留格式
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 使用ElementTree解析
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            return root, content
+            for entry in self.parse_file(file_path):
+                total += 1
+                if len(sample) < count:
+                    sample.append(entry)
+                else:
+                    index = random.randrange(total)
+                    if index < count:
+                        sample[index] = entry
         except Exception as e:
             logging.error(f"解析XML文件出错: {str(e)}")
-            return None, None
+            raise ValueError("文件解析失败")
+        return total, sample
     
-    def preview_translation(self, file_path):
-        root, _ = self.parse_file(file_path)
-        if not root:
-            return "文件解析失败"
-            
-        preview_text = ""
+    def write_output(self, file_path, output_path, source, state, translations):
+        """
+        将译文写回所有相同原文的节点，边读边写新文件，嵌入资源很大的文件内存占用也保持稳定
         
-        # 随机选择几个条目进行预览
-        data_nodes = root.findall(".//data")
-        preview_count = min(1, len(data_nodes))
+        输出方式由resx_output_mode决定：
+        preserve（默认）按原文件逐字节复制，只替换<value>文本所在的字节范围，注释、引号和空白保持不变；
+        rewrite按节点重新序列化整个文档。
+        """
+        translated = 0
+        failed = 0
+        for name, text in state["pending"]:
+            if translations.get(text):
+                state["fingerprints"][name] = fingerprint(text)
+                translated += 1
+            else:
+                failed += 1
         
-        if preview_count == 0:
-            return "未找到可翻译的内容"
-            
-        preview_text += f"从{len(data_nodes)}个条目中随机选择{preview_count}个进行预览:\n\n"
+        def replace(name, text):
+            if name in state["reused"]:
+                return state["existing"][name]
+            return translations.get(text)
         
-        sample_nodes = random.sample(data_nodes, preview_count)
-        target_lang = self.config.get("target_lang", "英语")
+        if self.config.get("resx_output_mode", "preserve") != "rewrite":
+            rewrite_spans(
+                file_path,
+                output_path,
+                [(start, end, replace(name, text)) for name, text, start, end in source]
+            )
+        else:
+            write_translated(file_path, output_path, replace)
+        return translated, failed
+    
+    def _prepare_languages(self, file_path, outputs):
+        """
+        解析源文件，按语言筛选需要翻译的条目
         
-        for i, node in enumerate(sample_nodes):
-            name = node.get('name', '')
-            value_node = node.find('value')
-            if value_node is not None and value_node.text:
-                original = value_node.text
-                translation = self.translation_service.translate_text(original, target_lang)
-                
-                preview_text += f"{i+1}. {name}\n"
-                preview_text += f"   原文: {original}\n"
-                if translation:
-                    preview_text += f"   译文: {translation}\n\n"
-                else:
-                    preview_text += f"   译文: [翻译失败]\n\n"
+        增量模式下跳过未变化的键，启用断点续传时读取断点日志中已完成的译文。
         
-        return preview_text
-    
-    def translate_file(self, file_path, output_path, progress_callback=None):
-        root, _ = self.parse_file(file_path)
-        if not root:
-            return False, "文件解析失败"
-            
-        # 翻译所有data/value节点
-        data_nodes = root.findall(".//data")
-        total = len(data_nodes)
-        translated = 0
-        failed = 0
+        Returns:
+            tuple: ([(名称, 原文, 起始字节, 结束字节)], {目标语言: 任务状态})，rewrite模式下字节范围为None
+        """
+        # 增量模式：目标文件已存在时，只翻译新增或原文有变化的键
+        incremental = self.config.get("incremental_mode", False)
+        preserve = self.config.get("resx_output_mode", "preserve") != "rewrite"
+        checkpoint = self.config.get("enable_checkpoint", True)
         
-        self.cancel_translation = False
+        with self.translation_service.metrics.timer("parse"):
+            if preserve:
+                # 同时记录<value>文本的字节范围，写出时只替换这些范围
+                source = list(iter_value_spans(file_path))
+            else:
+                source = [(name, text, None, None) for name, text in self.parse_file(file_path)]
         
-        # 确定使用哪种翻译方法
-        api_type = self.config.get("api_type", "DeepLX")
-        target_lang = self.config.get("target_lang", "英语")
+        # 按语言收集需要翻译的条目，相同原文由translate_languages合并为一次翻译
+        states = {}
+        for lang, output_path in outputs.items():
+            existing = {}
+            old_fingerprints = None
+            if incremental and os.path.exists(output_path):
+                existing = self._load_existing_translations(output_path)
+                old_fingerprints = load_fingerprints(output_path)
+            state = {
+                "existing": existing,
+                "pending": [],
+                "reused": set(),
+                "unchanged": 0,
+                "fingerprints": {},
+                "resumed": {},
+                "journal": None,
+                "flushed_at": time.monotonic()
+            }
+            for i, (name, text, start, end) in enumerate(source):
+                # 未变化的键直接沿用已有译文
+                if name in existing and is_unchanged(name, text, old_fingerprints):
+                    state["fingerprints"][name] = fingerprint(text)
+                    state["reused"].add(name)
+                    state["unchanged"] += 1
+                    continue
+                state["pending"].append((name or f"item_{i}", text))
+            if checkpoint:
+                # 上次运行中断时，日志中已完成的原文不再发送
+                state["journal"] = CheckpointJournal(output_path, file_path, lang)
+                state["resumed"] = state["journal"].resume(text for _, text in state["pending"])
+            states[lang] = state
+        return source, states
+    
+    def _entries_to_translate(self, states):
+        """各语言需要发送翻译的 (名称, 原文)，断点日志中已完成的不再发送"""
+        return {
+            lang: [(name, text) for name, text in state["pending"] if text not in state["resumed"]]
+            for lang, state in states.items()
+        }
+    
+    def estimate_file_languages(self, file_path, outputs):
+        """
+        不调用接口，预估将RESX文件翻译为多个目标语言的请求数、token数和耗时
         
+        Returns:
+            dict: 预估结果，文件解析失败时包含 error
+        """
+        try:
+            source, states = self._prepare_languages(file_path, outputs)
+        except Exception as e:
+            logging.error(f"解析XML文件出错: {str(e)}")
+            return dict(merge_estimates([]), error=f"文件解析失败: {str(e)}")
+        estimate = self.estimate_languages(self._entries_to_translate(states))
+        estimate["unchanged"] = sum(state["unchanged"] for state in states.values())
+        estimate["resumed"] = sum(len(state["resumed"]) for state in states.values())
+        return self.finish_estimate(estimate)
+    
+    def _load_existing_translations(self, output_path):
+        """读取已有目标文件中的译文 {键: 译文}"""
         try:
-            if api_type == "DeepLX":
-                # 逐个翻译所有节点
-                for i, node in enumerate(data_nodes):
-                    # 检查是否取消
-                    if self.cancel_translation:
-                        return False, "翻译已取消"
-                        
-                    value_node = node.find('value')
-                    if value_node is not None and value_node.text:
-                        original = value_node.text
-                        translation = self.translation_service.translate_text(original, target_lang)
-                        
-                        if translation:
-                            value_node.text = translation
-                            translated += 1
-                        else:
-                            failed += 1
-                    
-                    # 更新进度
-                    if progress_callback:
-                        progress = (i + 1) / total * 100
-                        progress_callback(progress, i+1, total)
-            else:  # ChatGPT批量翻译
-                batch_size = self.config.get("batch_size", 5)
-                
-                # 将节点分成批次
-                batches = [data_nodes[i:i+batch_size] for i in range(0, len(data_nodes), batch_size)]
-                
-                processed = 0
-                for batch_idx, batch in enumerate(batches):
-                    # 检查是否取消
-                    if self.cancel_translation:
-                        return False, "翻译已取消"
-                    
-                    # 收集这个批次中需要翻译的文本
-                    texts_to_translate = {}
-                    for i, node in enumerate(batch):
-                        value_node = node.find('value')
-                        if value_node is not None and value_node.text:
-                            # 使用节点名称作为ID
-                            node_id = node.get('name', f"item_{batch_idx}_{i}")
-                            texts_to_translate[node_id] = value_node.text
-                    
-                    # 批量翻译
-                    if texts_to_translate:
-                        translated_texts = self.translation_service.batch_translate(texts_to_translate, target_lang)
-                        
-                        # 将翻译结果写回XML
-                        for node in batch:
-                            node_id = node.get('name')
-                            value_node = node.find('value')
-                            
-                            if node_id in translated_texts and value_node is not None:
-                                value_node.text = translated_texts[node_id]
-                                translated += 1
-                            else:
-                                failed += 1
-                    
-                    # 更新进度
-                    processed += len(batch)
-                    if progress_callback:
-                        progress = processed / total * 100
-                        progress_callback(progress, processed, total)
-            
-            # 写入新文件
-            tree = ET.ElementTree(root)
-            tree.write(output_path, encoding='utf-8', xml_declaration=True)
-            
-            return True, f"翻译完成!\n成功翻译: {translated}\n失败: {failed}\n保存至: {output_path}"
-            
+            return {name: text for name, text in iter_data_entries(output_path) if name}
         except Exception as e:
-            logging.error(f"翻译过程中出现错误: {str(e)}")
-            return False, f"翻译过程中出现错误: {str(e)}" 
\ No newline at end of file
+            logging.error(f"读取已有目标文件出错: {str(e)}")
+            return {}
\ No newline at end of file
@@ -0,0 +1,316 @@
+import re
+
+# 字符串转义序列
+_SIMPLE_ESCAPES = {
+    "n": "\n", "r": "\r", "t": "\t", "b": "\b", "f": "\f", "v": "\v", "0": "\0"
+}
+
+_IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*')
+_HEX = re.compile(r'[0-9a-fA-F]+')
+_NUMBER = re.compile(r'-?(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)')
+
+_CLOSING = {"{": "}", "[": "]", "(": ")"}
+
+
+class TsStringLiteral:
+    """资源对象中的一个字符串值
+
+    path为键路径（嵌套对象用"."连接，数组元素使用下标），
+    start和end为字面量（含引号）在源文本中的偏移，用于将译文写回原位置。
+    """
+
+    def __init__(self, path, value, start, end, quote):
+        self.path = path
+        self.value = value
+        self.start = start
+        self.end = end
+        self.quote = quote
+
+    def __repr__(self):
+        return f"TsStringLiteral({self.path!r}, {self.value!r})"
+
+
+class TsParseError(ValueError):
+    """TS资源文件格式无法解析"""
+
+
+def extract_strings(content):
+    """
+    从TS资源文件的 export default { ... } 对象字面量中提取字符串值
+
+    支持嵌套对象、数组、带引号的键、注释和末尾逗号，也支持先声明常量再 export default 常量名的写法。
+    含 ${...} 插值的模板字符串、函数调用等表达式会被跳过。
+
+    Returns:
+        list[TsStringLiteral]: 按在源文本中出现的顺序排列
+    """
+    start = _find_root_object(content)
+    if start is None:
+        raise TsParseError("未找到 export default 导出的对象")
+    parser = _ObjectParser(content)
+    parser.parse_object(start, ())
+    return parser.strings
+
+
+def splice(content, replacements):
+    """
+    将译文按偏移写回源文本
+
+    Args:
+        content (str): 源文本
+        replacements (list[tuple]): (TsStringLiteral, 译文) 列表
+
+    Returns:
+        str: 替换后的文本，其余内容（键、注释、缩进）保持不变
+    """
+    parts = []
+    pos = 0
+    for literal, text in sorted(replacements, key=lambda item: item[0].start):
+        parts.append(content[pos:literal.start])
+        parts.append(quote_string(text, literal.quote))
+        pos = literal.end
+    parts.append(content[pos:])
+    return "".join(parts)
+
+
+def quote_string(text, quote):
+    """按原字面量的引号类型生成字符串字面量"""
+    text = text.replace("\\", "\\\\")
+    if quote == "`":
+        # 模板字符串可以保留换行
+        return "`" + text.replace("`", "\\`").replace("${", "\\${") + "`"
+    text = text.replace(quote, "\\" + quote).replace("\r", "\\r").replace("\n", "\\n")
+    return quote + text.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029") + quote
+
+
+def _find_root_object(content):
+    """返回导出对象左花括号的位置"""
+    scanner = _ObjectParser(content)
+    match = re.search(r'\bexport\s+default\s+', content)
+    if match:
+        pos = scanner.skip_trivia(match.end())
+        if content.startswith("{", pos):
+            return pos
+        # export default zh; 形式，查找对应的常量声明
+        name = _IDENTIFIER.match(content, pos)
+        if name:
+            declaration = re.search(
+                r'\b(?:const|let|var)\s+' + re.escape(name.group(0)) + r'\b[^=]*=\s*',
+                content
+            )
+            if declaration:
+                pos = scanner.skip_trivia(declaration.end())
+                if content.startswith("{", pos):
+                    return pos
+    return None
+
+
+class _ObjectParser:
+    """对象字面量的递归下降解析器，只关心字符串值的位置"""
+
+    def __init__(self, content):
+        self.content = content
+        self.strings = []
+
+    def skip_trivia(self, pos):
+        """跳过空白和注释"""
+        content = self.content
+        while pos < len(content):
+            char = content[pos]
+            if char.isspace():
+                pos += 1
+            elif content.startswith("//", pos):
+                end = content.find("\n", pos)
+                pos = len(content) if end < 0 else end + 1
+            elif content.startswith("/*", pos):
+                end = content.find("*/", pos + 2)
+                if end < 0:
+                    raise TsParseError("注释未结束")
+                pos = end + 2
+            else:
+                break
+        return pos
+
+    def expect(self, pos, char):
+        pos = self.skip_trivia(pos)
+        if not self.content.startswith(char, pos):
+            raise TsParseError(f"第 {self.line(pos)} 行缺少 '{char}'")
+        return pos + 1
+
+    def line(self, pos):
+        return self.content.count("\n", 0, pos) + 1
+
+    def parse_object(self, pos, path):
+        """解析以pos处的 { 开始的对象，返回 } 之后的位置"""
+        pos = self.expect(pos, "{")
+        while True:
+            pos = self.skip_trivia(pos)
+            if self.content.startswith("}", pos):
+                return pos + 1
+
+            if self.content.startswith("...", pos):
+                # 展开运算符，内容来自其他对象，跳过
+                pos = self.skip_expression(pos + 3)
+            else:
+                key, pos = self.parse_key(pos)
+                pos = self.skip_trivia(pos)
+                if self.content.startswith(":", pos):
+                    pos = self.parse_value(pos + 1, path + (key,) if key is not None else None)
+                else:
+                    # 简写属性或方法定义，不包含可翻译的字符串值
+                    pos = self.skip_expression(pos)
+
+            pos = self.skip_trivia(pos)
+            if self.content.startswith(",", pos):
+                pos += 1
+            elif not self.content.startswith("}", pos):
+                raise TsParseError(f"第 {self.line(pos)} 行对象格式无法解析")
+
+    def parse_array(self, pos, path):
+        pos = self.expect(pos, "[")
+        index = 0
+        while True:
+            pos = self.skip_trivia(pos)
+            if self.content.startswith("]", pos):
+                return pos + 1
+            pos = self.parse_value(pos, path + (str(index),) if path is not None else None)
+            index += 1
+            pos = self.skip_trivia(pos)
+            if self.content.startswith(",", pos):
+                pos += 1
+            elif not self.content.startswith("]", pos):
+                raise TsParseError(f"第 {self.line(pos)} 行数组格式无法解析")
+
+    def parse_key(self, pos):
+        """返回 (键, 键之后的位置)，计算属性名的键为None"""
+        content = self.content
+        char = content[pos:pos + 1]
+        if char in ("'", '"'):
+            value, end = self.read_string(pos)
+            return value, end
+        if char == "[":
+            return None, self.skip_balanced(pos)
+        match = _IDENTIFIER.match(content, pos) or _NUMBER.match(content, pos)
+        if not match:
+            raise TsParseError(f"第 {self.line(pos)} 行无法识别的键")
+        return match.group(0), match.end()
+
+    def parse_value(self, pos, path):
+        """解析一个值，记录其中的字符串字面量，返回值之后的位置"""
+        pos = self.skip_trivia(pos)
+        char = self.content[pos:pos + 1]
+        if char in ("'", '"', "`"):
+            value, end = self.read_string(pos)
+            # 字符串之后还有拼接或类型断言等表达式时不作为可翻译的值
+            after = self.skip_trivia(end)
+            if after < len(self.content) and self.content[after] not in ",}]":
+                return self.skip_expression(after)
+            if value is not None and path is not None:
+                self.strings.append(TsStringLiteral(".".join(path), value, pos, end, char))
+            return end
+        if char == "{":
+            end = self.parse_object(pos, path)
+        elif char == "[":
+            end = self.parse_array(pos, path)
+        else:
+            return self.skip_expression(pos)
+        # 对象之后的 as const 等后缀
+        return self.skip_expression(end)
+
+    def read_string(self, pos):
+        """
+        读取pos处的字符串或模板字面量
+
+        Returns:
+            tuple: (解码后的值, 结束位置)，含插值的模板字符串值为None
+        """
+        content = self.content
+        quote = content[pos]
+        chars = []
+        has_expression = False
+        i = pos + 1
+        while i < len(content):
+            char = content[i]
+            if char == "\\":
+                decoded, i = self._read_escape(i + 1)
+                chars.append(decoded)
+                continue
+            if char == quote:
+                return (None if has_expression else "".join(chars)), i + 1
+            if quote == "`" and content.startswith("${", i):
+                has_expression = True
+                i = self.skip_balanced(i + 1)
+                continue
+            if char == "\n" and quote != "`":
+                break
+            chars.append(char)
+            i += 1
+        raise TsParseError(f"第 {self.line(pos)} 行字符串未结束")
+
+    def _read_escape(self, i):
+        content = self.content
+        char = content[i:i + 1]
+        if char in _SIMPLE_ESCAPES and not (char == "0" and content[i + 1:i + 2].isdigit()):
+            # 只有\0需要区分旧式八进制转义，其他简单转义后面跟数字也照常解码
+            return _SIMPLE_ESCAPES[char], i + 1
+        if char == "x":
+            return self._hex_char(content[i + 1:i + 3], 2, i), i + 3
+        if char == "u":
+            if content.startswith("{", i + 1):
+                end = content.find("}", i + 2)
+                if end < 0:
+                    raise TsParseError(f"位置 {i} 的 \\u{{...}} 转义缺少右花括号")
+                return self._hex_char(content[i + 2:end], None, i), end + 1
+            return self._hex_char(content[i + 1:i + 5], 4, i), i + 5
+        if char == "\r" and content.startswith("\n", i + 1):
+            return "", i + 2
+        if char in ("\n", "\r", "\u2028", "\u2029"):
+            # 行继续符
+            return "", i + 1
+        return char, i + 1
+    
+    def _hex_char(self, digits, length, pos):
+        """解码\\x和\\u转义的十六进制码点，位数不符或超出Unicode范围时抛出TsParseError"""
+        if not _HEX.fullmatch(digits) or (length is not None and len(digits) != length):
+            raise TsParseError(f"位置 {pos} 的转义序列无效: {digits!r}")
+        code = int(digits, 16)
+        if code > 0x10FFFF:
+            raise TsParseError(f"位置 {pos} 的转义超出Unicode范围: {digits!r}")
+        return chr(code)
+
+    def skip_balanced(self, pos):
+        """跳过pos处开始的成对括号，返回右括号之后的位置"""
+        stack = [_CLOSING[self.content[pos]]]
+        pos += 1
+        while stack:
+            pos = self.skip_trivia(pos)
+            if pos >= len(self.content):
+                raise TsParseError("括号未闭合")
+            char = self.content[pos]
+            if char in ("'", '"', "`"):
+                _, pos = self.read_string(pos)
+            elif char in _CLOSING:
+                stack.append(_CLOSING[char])
+                pos += 1
+            elif char == stack[-1]:
+                stack.pop()
+                pos += 1
+            else:
+                pos += 1
+        return pos
+
+    def skip_expression(self, pos):
+        """跳过表达式直到同一层级的 , } 或 ]"""
+        while True:
+            pos = self.skip_trivia(pos)
+            if pos >= len(self.content):
+                return pos
+            char = self.content[pos]
+            if char in ",}]":
+                return pos
+            if char in ("'", '"', "`"):
+                _, pos = self.read_string(pos)
+            elif char in _CLOSING:
+                pos = self.skip_balanced(pos)
+            else:
+                pos += 1
@@ -1,27 +1,20 @@
 import os
-import re
-import json
+import time
+import random
 import logging
 import glob
-from .base_translator import BaseTranslator
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .base_translator import BaseTranslator, merge_estimates
+from .incremental import fingerprint, load_fingerprints, is_unchanged
+from .checkpoint import CheckpointJournal
+from .ts_parser import extract_strings, splice, TsParseError
 
 class TsTranslator(BaseTranslator):
     def __init__(self, config, translation_service):
         super().__init__(config, translation_service)
-        self.prompts = self._load_prompts()
-    
-    def _load_prompts(self):
-        """加载系统提示词配置"""
-        try:
-            config_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config')
-            prompts_file = os.path.join(config_dir, 'prompts.json')
-            
-            with open(prompts_file, 'r', encoding='utf-8') as f:
-                prompts = json.load(f)
-            return prompts.get('ts_translator', {})
-        except Exception as e:
-            logging.error(f"加载提示词配置失败: {str(e)}")
-            return {}
+        # 最近一次scan_folder每个文件的翻译结果
+        self.file_results = []
     
     def parse_file(self, file_path):
         """简单读取TS文件内容，不进行复杂解析"""
@@ -54,144 +47,317 @@ class TsTranslator(BaseTranslator):
         }
         return lang_codes.get(lang_name, "en")
     
-    def preview_translation(self, file_path):
-        """预览翻译结果"""
+    def extract_strings(self, content):
+        """提取TS资源对象中的字符串值，解析失败时返回None"""
+        try:
+            return extract_strings(content)
+        except TsParseError as e:
+            logging.error(f"解析TS文件出错: {str(e)}")
+            return None
+    
+    def preview_sample(self, file_path, count):
+        """随机选择count条非空字符串，键路径作为文本ID"""
         content = self.parse_file(file_path)
         if not content:
-            return "文件读取失败"
-        
-        # 提取前200个字符进行预览
-        preview_content = content[:200] + ("..." if len(content) > 200 else "")
+            raise ValueError("文件读取失败")
         
-        target_lang = self.config.get("target_lang", "英语")
+        strings = self.extract_strings(content)
+        if strings is None:
+            raise ValueError("文件解析失败，未找到 export default 导出的对象")
         
-        preview_text = f"文件内容预览:\n\n{preview_content}\n\n"
-        preview_text += f"该文件将被整体翻译为{target_lang}，并保存为 {self.get_language_file_code(target_lang)}.ts"
+        literals = [literal for literal in strings if literal.value.strip()]
+        sample = random.sample(literals, min(count, len(literals)))
+        return len(literals), [(literal.path, literal.value) for literal in sample]
+    
+    def write_output(self, file_path, output_path, source, state, translations):
+        """将译文拼接回源文件内容并写出，翻译失败的字符串保留原文，保证输出仍是有效的TS文件"""
+        replacements = list(state["replacements"])
+        translated = 0
+        failed = 0
+        for literal in state["pending"]:
+            if translations.get(literal.value):
+                replacements.append((literal, translations[literal.value]))
+                state["fingerprints"][literal.path] = fingerprint(literal.value)
+                translated += 1
+            else:
+                failed += 1
         
-        return preview_text
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(splice(source, replacements))
+        return translated, failed
     
-    def translate_file(self, file_path, output_path, progress_callback=None):
-        """翻译TS文件并保存"""
-        try:
-            # 重置取消标志
-            self.translation_service.reset_cancel()
-            
+    def _prepare_languages(self, file_path, outputs):
+        """
+        读取并解析源文件，按语言筛选需要翻译的字符串
+        
+        增量模式下跳过未变化的键，启用断点续传时读取断点日志中已完成的译文。
+        
+        Returns:
+            tuple: (文件内容, {目标语言: 任务状态})
+        
+        Raises:
+            ValueError: 文件读取或解析失败
+        """
+        with self.translation_service.metrics.timer("parse"):
             content = self.parse_file(file_path)
             if not content:
-                return False, "文件读取失败"
-            
-            # 更新进度
-            if progress_callback:
-                progress_callback(10, 1, 3, "正在读取文件...")
-            
-            # 检查是否取消
-            if self.translation_service.cancel_translation:
-                return False, "翻译已取消"
-            
-            # 获取目标语言
-            target_lang = self.config.get("target_lang", "英语")
-            
-            # 从配置加载系统提示词
-            system_prompt = self.prompts.get('translate_file', {}).get('system_prompt', {}).get('zh', '')
-            if system_prompt:
-                system_prompt = system_prompt.replace('{target_lang}', target_lang)
-            
-            # 更新进度
-            if progress_callback:
-                progress_callback(30, 2, 3, "正在翻译文件...")
-            
-            # 检查是否取消
-            if self.translation_service.cancel_translation:
-                return False, "翻译已取消"
-            
-            # 使用翻译服务翻译整个文件
-            translated_content = self.translation_service.translate_text(
-                content, 
-                target_lang,
-                system_prompt=system_prompt
-            )
-            
-            # 检查是否取消
-            if self.translation_service.cancel_translation:
-                return False, "翻译已取消"
-                
-            if not translated_content:
-                return False, "翻译失败，请检查API设置"
-            
-            # 提取翻译后的代码部分（可能包含在代码块中）
-            # 去掉包裹的 ```json 标记
-            # translated_content = re.sub(r"^```json|```$", "", translated_content.strip(), flags=re.MULTILINE).strip()
-            translated_content = re.sub(r"^```(json|typescript|ts|js|javascript|tex)|```$", "", translated_content.strip(), flags=re.MULTILINE).strip()
-
-            # 更新进度
-            if progress_callback:
-                progress_callback(80, 3, 3, "正在保存翻译结果...")
-            
-            # 检查是否取消
-            if self.translation_service.cancel_translation:
-                return False, "翻译已取消"
-            
-            # 确保输出目录存在
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # 写入翻译后的内容
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(translated_content)
-            
-            # 更新进度
-            if progress_callback:
-                progress_callback(100, 3, 3, "翻译完成")
-            
-            return True, f"翻译完成!\n保存至: {output_path}"
-            
+                raise ValueError("文件读取失败")
+            try:
+                strings = extract_strings(content)
+            except TsParseError as e:
+                # 信息中包含出错位置，如无效的转义序列
+                logging.error(f"解析TS文件 {file_path} 出错: {str(e)}")
+                raise ValueError(f"文件解析失败: {str(e)}")
+        
+        # 增量模式：目标文件已存在时，只翻译新增或原文有变化的键
+        incremental = self.config.get("incremental_mode", False)
+        checkpoint = self.config.get("enable_checkpoint", True)
+        states = {}
+        for lang, output_path in outputs.items():
+            existing = {}
+            old_fingerprints = None
+            if incremental and os.path.exists(output_path):
+                existing = self._load_existing_translations(output_path)
+                old_fingerprints = load_fingerprints(output_path)
+            state = {
+                "replacements": [],
+                "pending": [],
+                "unchanged": 0,
+                "fingerprints": {},
+                "resumed": {},
+                "journal": None,
+                "flushed_at": time.monotonic()
+            }
+            for literal in strings:
+                if not literal.value.strip():
+                    continue
+                # 未变化的键直接沿用已有译文
+                if literal.path in existing and is_unchanged(literal.path, literal.value, old_fingerprints):
+                    state["fingerprints"][literal.path] = fingerprint(literal.value)
+                    state["replacements"].append((literal, existing[literal.path]))
+                    state["unchanged"] += 1
+                    continue
+                state["pending"].append(literal)
+            if checkpoint:
+                # 上次运行中断时，日志中已完成的原文不再发送
+                state["journal"] = CheckpointJournal(output_path, file_path, lang)
+                state["resumed"] = state["journal"].resume(literal.value for literal in state["pending"])
+            states[lang] = state
+        return content, states
+    
+    def _entries_to_translate(self, states):
+        """各语言需要发送翻译的 (键路径, 原文)，断点日志中已完成的不再发送"""
+        return {
+            lang: [
+                (literal.path, literal.value) for literal in state["pending"]
+                if literal.value not in state["resumed"]
+            ]
+            for lang, state in states.items()
+        }
+    
+    def estimate_file_languages(self, file_path, outputs):
+        """
+        不调用接口，预估将TS文件翻译为多个目标语言的请求数、token数和耗时
+        
+        Returns:
+            dict: 预估结果，文件读取或解析失败时包含 error
+        """
+        try:
+            content, states = self._prepare_languages(file_path, outputs)
+        except ValueError as e:
+            return dict(merge_estimates([]), error=str(e))
         except Exception as e:
-            logging.error(f"翻译过程中出现错误: {str(e)}")
-            return False, f"翻译过程中出现错误: {str(e)}"
+            # 单个文件出错不影响文件夹中其他文件的预估
+            logging.error(f"预估 {file_path} 出错: {str(e)}")
+            return dict(merge_estimates([]), error=f"文件解析失败: {str(e)}")
+        estimate = self.estimate_languages(self._entries_to_translate(states))
+        estimate["unchanged"] = sum(state["unchanged"] for state in states.values())
+        estimate["resumed"] = sum(len(state["resumed"]) for state in states.values())
+        return self.finish_estimate(estimate)
+    
+    def estimate_folder(self, folder_path, filename_pattern, target_lang):
+        """
+        不调用接口，预估翻译文件夹中所有匹配文件的请求数、token数和耗时
+        
+        Args:
+            folder_path (str): 文件夹
+            filename_pattern (str): 文件名匹配模式
+            target_lang (str|list): 目标语言，列表时按同时翻译为多个语言预估
+        
+        Returns:
+            dict: 所有文件合计的预估结果，另含 files（文件数）和 errors（无法解析的文件），
+                没有匹配的文件时包含 error
+        """
+        matching_files = self._find_files(folder_path, filename_pattern)
+        if not matching_files:
+            return dict(merge_estimates([]), error=f"在文件夹 {folder_path} 中未找到匹配 {filename_pattern} 的文件")
+        
+        target_langs = list(target_lang) if isinstance(target_lang, (list, tuple)) else [target_lang]
+        estimates = []
+        errors = []
+        for file_path in matching_files:
+            estimate = self.estimate_file_languages(file_path, self._language_outputs(file_path, target_langs))
+            if "error" in estimate:
+                errors.append(f"{os.path.relpath(file_path, folder_path)}: {estimate['error']}")
+            else:
+                estimates.append(estimate)
+        
+        total = merge_estimates(estimates)
+        total["files"] = len(matching_files)
+        total["errors"] = errors
+        parallel_files = max(1, min(int(self.config.get("max_concurrent_files", 4)), len(matching_files)))
+        return self.finish_estimate(total, parallel_files)
+    
+    def _find_files(self, folder_path, filename_pattern):
+        """递归查找文件夹中所有匹配的文件"""
+        search_pattern = os.path.join(folder_path, "**", filename_pattern)
+        return glob.glob(search_pattern, recursive=True)
+    
+    def _language_outputs(self, file_path, target_langs):
+        """各目标语言的输出路径：源文件同目录下的 <语言代码>.ts"""
+        return {
+            lang: os.path.join(os.path.dirname(file_path), f"{self.get_language_file_code(lang)}.ts")
+            for lang in target_langs
+        }
+    
+    def _load_existing_translations(self, output_path):
+        """读取已有目标文件中的译文 {键路径: 译文}"""
+        content = self.parse_file(output_path)
+        if not content:
+            return {}
+        strings = self.extract_strings(content)
+        return {literal.path: literal.value for literal in strings or []}
     
     def scan_folder(self, folder_path, filename_pattern, target_lang, progress_callback=None):
-        """扫描文件夹并翻译所有匹配的文件"""
+        """
+        扫描文件夹并翻译所有匹配的文件
+        
+        文件之间互不依赖，由max_concurrent_files个线程同时翻译，每个文件内的批次仍按服务的并发请求数并发。
+        target_lang为列表时，每个文件只解析一次，同时翻译为所有语言，分别保存为同目录下的 <语言代码>.ts。
+        取消时所有线程在当前请求结束后停止，尚未开始的文件不再翻译。
+        每个文件每个语言的结果保存在 self.file_results 中。
+        """
         # 重置取消标志
+        self.cancel_translation = False
         self.translation_service.reset_cancel()
+        self.file_results = []
         
         # 查找所有匹配的文件
-        search_pattern = os.path.join(folder_path, "**", filename_pattern)
-        matching_files = glob.glob(search_pattern, recursive=True)
+        matching_files = self._find_files(folder_path, filename_pattern)
         
         if not matching_files:
             return False, f"在文件夹 {folder_path} 中未找到匹配 {filename_pattern} 的文件"
         
         total_files = len(matching_files)
-        translated_files = 0
+        target_langs = list(target_lang) if isinstance(target_lang, (list, tuple)) else [target_lang]
+        incremental = self.config.get("incremental_mode", False)
+        max_workers = max(1, min(int(self.config.get("max_concurrent_files", 4)), total_files))
+        
+        # 各线程共享的汇总进度，回调在锁内调用，保证进度和计数一致
+        lock = threading.Lock()
+        active = {}
+        results = {}
         failed_files = 0
         
-        for i, file_path in enumerate(matching_files):
-            # 检查是否取消
-            if self.translation_service.cancel_translation:
-                return False, "翻译已取消"
+        def is_cancelled():
+            return self.cancel_translation or self.translation_service.cancel_translation
+        
+        def report(current_file=None, current=None, total=None):
+            if not progress_callback:
+                return
+            done = len(results)
+            progress = (done + sum(active.values())) / total_files * 100
+            status = f"已完成 {done}/{total_files} 个文件，进行中 {len(active)} 个，失败 {failed_files} 个"
+            if current_file:
+                status += f"\n正在翻译 {current_file}"
+                if total:
+                    status += f" ({current}/{total})"
+            progress_callback(progress, done, total_files, status)
+        
+        def translate_one(index, file_path):
+            nonlocal failed_files
+            if is_cancelled():
+                return
             
             # 生成输出文件路径
-            dir_name = os.path.dirname(file_path)
-            lang_code = self.get_language_file_code(target_lang)
-            output_path = os.path.join(dir_name, f"{lang_code}.ts")
+            outputs = self._language_outputs(file_path, target_langs)
+            name = os.path.relpath(file_path, folder_path)
+            with lock:
+                active[index] = 0.0
+                report(name)
             
-            # 更新总进度
-            if progress_callback:
-                file_progress = (i / total_files) * 100
-                progress_callback(file_progress, i, total_files, f"正在翻译 {os.path.basename(file_path)}")
-            
-            # 翻译文件
             def file_progress_callback(progress, current, total, status=""):
-                if progress_callback:
-                    # 计算总体进度
-                    overall_progress = ((i + progress/100) / total_files) * 100
-                    progress_callback(overall_progress, i, total_files, f"正在翻译 {os.path.basename(file_path)} ({current}/{total}) {status}")
+                with lock:
+                    if index in active:
+                        active[index] = progress / 100
+                        report(name, current, total)
             
-            success, message = self.translate_file(file_path, output_path, file_progress_callback)
+            started = time.monotonic()
+            file_results = self.translate_file_languages(file_path, outputs, file_progress_callback)
+            seconds = time.monotonic() - started
+            for lang, result in file_results.items():
+                result.update(file=name, target_lang=lang, output=outputs[lang], seconds=seconds)
             
-            if success:
-                translated_files += 1
-            else:
-                failed_files += 1
-                logging.error(f"翻译文件 {file_path} 失败: {message}")
+            with lock:
+                active.pop(index, None)
+                # 已取消的语言不计入结果
+                if is_cancelled():
+                    file_results = {lang: result for lang, result in file_results.items() if result["success"]}
+                    if not file_results:
+                        return
+                results[index] = [file_results[lang] for lang in target_langs if lang in file_results]
+                if not all(result["success"] for result in results[index]):
+                    failed_files += 1
+                for result in results[index]:
+                    if not result["success"]:
+                        logging.error(f"翻译文件 {file_path} ({result['target_lang']}) 失败: {result['message']}")
+                report()
+            
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(translate_one, i, file_path) for i, file_path in enumerate(matching_files)]
+            for future in as_completed(futures):
+                future.result()
+        
+        self.file_results = [result for i in sorted(results) for result in results[i]]
+        summary = self._format_file_results(self.file_results, incremental)
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info(self._format_file_results(self.file_results, incremental, limit=None))
+        
+        if is_cancelled():
+            return False, f"翻译已取消\n{summary}"
+        return True, f"文件夹翻译完成!\n{summary}"
+    
+    def _format_file_results(self, file_results, incremental, limit=30):
+        """生成按文件的结果汇总，失败的文件排在前面，limit为None时不限制行数"""
+        succeeded = [result for result in file_results if result["success"]]
+        failed = [result for result in file_results if not result["success"]]
+        
+        # 同时翻译多个语言时按输出文件统计，并在每行附带输出文件名
+        multiple = len({result.get("target_lang") for result in file_results}) > 1
+        unit = "个输出文件" if multiple else "个文件"
+        
+        def label(result):
+            if multiple:
+                return f"{result['file']} -> {os.path.basename(result['output'])}"
+            return result["file"]
+        
+        summary = f"成功翻译: {len(succeeded)} {unit}\n失败: {len(failed)} {unit}\n"
+        if incremental:
+            unchanged_files = sum(1 for result in succeeded if not result["pending"])
+            summary += f"增量模式: {unchanged_files} 个文件没有新增或变化的文本\n"
+        
+        lines = []
+        for result in failed:
+            lines.append(f"[失败] {label(result)}: {result['message']}")
+        for result in succeeded:
+            line = f"[成功] {label(result)}: 翻译 {result['translated']} 条"
+            if result["failed"]:
+                line += f"，失败 {result['failed']} 条"
+            if result["unchanged"]:
+                line += f"，沿用 {result['unchanged']} 条"
+            lines.append(line + f" ({result['seconds']:.1f}秒)")
         
-        return True, f"文件夹翻译完成!\n成功翻译: {translated_files} 个文件\n失败: {failed_files} 个文件"
\ No newline at end of file
+        summary += "\n文件结果:\n" + "\n".join(lines[:limit])
+        if limit is not None and len(lines) > limit:
+            summary += f"\n... 另有 {len(lines) - limit} 个文件，详见日志"
+        return summary
@@ -5,7 +5,7 @@ class ConfigDialog:
     def __init__(self, parent, config):
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("配置")
-        self.dialog.geometry("500x600")
+        self.dialog.geometry("500x710")
         self.dialog.resizable(False, False)
         self.dialog.transient(parent)
         self.dialog.grab_set()
@@ -78,6 +78,28 @@ class ConfigDialog:
         ttk.Label(self.deeplx_frame, text="API URL:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
         self.deeplx_url = tk.StringVar(value=self.config.get("deeplx_url", ""))
         ttk.Entry(self.deeplx_frame, textvariable=self.deeplx_url, width=50).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(self.deeplx_frame, text="(多个实例用逗号分隔)").grid(row=1, column=1, sticky=tk.W, padx=5)
+        
+        ttk.Label(self.deeplx_frame, text="每分钟请求上限:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
+        self.deeplx_rpm = tk.IntVar(value=self.config.get("deeplx_rpm", 0))
+        ttk.Entry(self.deeplx_frame, textvariable=self.deeplx_rpm, width=10).grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        ttk.Label(self.deeplx_frame, text="并发请求数:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=5)
+        self.deeplx_max_concurrent = tk.IntVar(value=self.config.get("deeplx_max_concurrent", 8))
+        ttk.Spinbox(
+            self.deeplx_frame, 
+            from_=1, 
+            to=64, 
+            textvariable=self.deeplx_max_concurrent, 
+            width=5
+        ).grid(row=3, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        self.deeplx_native_batch = tk.BooleanVar(value=self.config.get("deeplx_native_batch", False))
+        ttk.Checkbutton(
+            self.deeplx_frame, 
+            text="服务端支持批量文本（一个请求发送多条）", 
+            variable=self.deeplx_native_batch
+        ).grid(row=4, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
         
         # ChatGPT设置
         self.chatgpt_frame = ttk.LabelFrame(self.api_frame, text="ChatGPT设置", padding=10)
@@ -105,21 +127,72 @@ class ConfigDialog:
         self.prompt_button = ttk.Button(prompt_frame, text="编辑", command=self.edit_system_prompt)
         self.prompt_button.pack(side=tk.LEFT)
         
+        # 流式响应
+        self.enable_streaming = tk.BooleanVar(value=self.config.get("enable_streaming", False))
+        ttk.Checkbutton(
+            self.chatgpt_frame, 
+            text="启用流式响应（实时显示进度）", 
+            variable=self.enable_streaming
+        ).grid(row=4, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
+        # 限流设置，0表示不限制
+        ttk.Label(self.chatgpt_frame, text="每分钟请求上限:").grid(row=5, column=0, sticky=tk.W, padx=5, pady=5)
+        self.chatgpt_rpm = tk.IntVar(value=self.config.get("chatgpt_rpm", 0))
+        ttk.Entry(self.chatgpt_frame, textvariable=self.chatgpt_rpm, width=10).grid(row=5, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        ttk.Label(self.chatgpt_frame, text="每分钟Token上限:").grid(row=6, column=0, sticky=tk.W, padx=5, pady=5)
+        self.chatgpt_tpm = tk.IntVar(value=self.config.get("chatgpt_tpm", 0))
+        ttk.Entry(self.chatgpt_frame, textvariable=self.chatgpt_tpm, width=10).grid(row=6, column=1, sticky=tk.W, padx=5, pady=5)
+        ttk.Label(self.chatgpt_frame, text="(Base URL和Key均可用逗号分隔多个，每个组合各自计算限额)").grid(row=7, column=0, columnspan=2, sticky=tk.W, padx=5)
+        
         # 初始化界面
         self.toggle_api_fields()
     
     def create_advanced_settings(self):
         """创建高级设置界面"""
         # 批处理设置
-        ttk.Label(self.advanced_frame, text="批处理大小:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
-        self.batch_size = tk.IntVar(value=self.config.get("batch_size", 5))
+        ttk.Label(self.advanced_frame, text="每批Token预算:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        self.batch_token_budget = tk.IntVar(value=self.config.get("batch_token_budget", 3000))
+        ttk.Spinbox(
+            self.advanced_frame, 
+            from_=500, 
+            to=32000, 
+            increment=500, 
+            textvariable=self.batch_token_budget, 
+            width=7
+        ).grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        # 并发设置
+        ttk.Label(self.advanced_frame, text="最大并发请求数:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
+        self.max_concurrent_requests = tk.IntVar(value=self.config.get("max_concurrent_requests", 4))
         ttk.Spinbox(
             self.advanced_frame, 
             from_=1, 
-            to=20, 
-            textvariable=self.batch_size, 
+            to=32, 
+            textvariable=self.max_concurrent_requests, 
             width=5
-        ).grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
+        ).grid(row=1, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        # 连接池设置
+        ttk.Label(self.advanced_frame, text="连接池大小:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
+        self.http_pool_size = tk.IntVar(value=self.config.get("http_pool_size", 10))
+        ttk.Spinbox(
+            self.advanced_frame, 
+            from_=1, 
+            to=100, 
+            textvariable=self.http_pool_size, 
+            width=5
+        ).grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        ttk.Label(self.advanced_frame, text="请求超时(秒):").grid(row=3, column=0, sticky=tk.W, padx=5, pady=5)
+        self.http_read_timeout = tk.IntVar(value=self.config.get("http_read_timeout", 60))
+        ttk.Spinbox(
+            self.advanced_frame, 
+            from_=5, 
+            to=600, 
+            textvariable=self.http_read_timeout, 
+            width=5
+        ).grid(row=3, column=1, sticky=tk.W, padx=5, pady=5)
         
         # 日志设置
         self.enable_logging = tk.BooleanVar(value=self.config.get("enable_logging", False))
@@ -127,7 +200,96 @@ class ConfigDialog:
             self.advanced_frame, 
             text="启用API日志", 
             variable=self.enable_logging
-        ).grid(row=1, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        ).grid(row=4, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
+        # 翻译记忆设置
+        self.enable_translation_memory = tk.BooleanVar(value=self.config.get("enable_translation_memory", True))
+        ttk.Checkbutton(
+            self.advanced_frame, 
+            text="启用翻译记忆（复用已翻译的文本）", 
+            variable=self.enable_translation_memory
+        ).grid(row=5, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
+        # 增量翻译设置
+        self.incremental_mode = tk.BooleanVar(value=self.config.get("incremental_mode", False))
+        ttk.Checkbutton(
+            self.advanced_frame, 
+            text="增量翻译（目标文件已存在时只翻译新增或修改的内容）", 
+            variable=self.incremental_mode
+        ).grid(row=6, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
+        # 重试设置
+        ttk.Label(self.advanced_frame, text="最大重试次数:").grid(row=7, column=0, sticky=tk.W, padx=5, pady=5)
+        self.max_retries = tk.IntVar(value=self.config.get("max_retries", 3))
+        ttk.Spinbox(
+            self.advanced_frame, 
+            from_=0, 
+            to=10, 
+            textvariable=self.max_retries, 
+            width=5
+        ).grid(row=7, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        # 多端点负载均衡策略
+        ttk.Label(self.advanced_frame, text="负载均衡策略:").grid(row=8, column=0, sticky=tk.W, padx=5, pady=5)
+        self.load_balance_strategy = tk.StringVar(value=self.config.get("load_balance_strategy", "least_outstanding"))
+        ttk.Combobox(
+            self.advanced_frame, 
+            textvariable=self.load_balance_strategy, 
+            values=["least_outstanding", "weighted_round_robin"], 
+            width=22, 
+            state="readonly"
+        ).grid(row=8, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        ttk.Label(self.advanced_frame, text="同时翻译的文件数:").grid(row=9, column=0, sticky=tk.W, padx=5, pady=5)
+        self.max_concurrent_files = tk.IntVar(value=self.config.get("max_concurrent_files", 4))
+        ttk.Spinbox(
+            self.advanced_frame, 
+            from_=1, 
+            to=32, 
+            textvariable=self.max_concurrent_files, 
+            width=5
+        ).grid(row=9, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        # RESX输出方式
+        ttk.Label(self.advanced_frame, text="RESX输出方式:").grid(row=10, column=0, sticky=tk.W, padx=5, pady=5)
+        self.resx_output_mode = tk.StringVar(value=self.config.get("resx_output_mode", "preserve"))
+        ttk.Combobox(
+            self.advanced_frame, 
+            textvariable=self.resx_output_mode, 
+            values=["preserve", "rewrite"], 
+            width=22, 
+            state="readonly"
+        ).grid(row=10, column=1, sticky=tk.W, padx=5, pady=5)
+    
+        # 断点续传设置
+        self.enable_checkpoint = tk.BooleanVar(value=self.config.get("enable_checkpoint", True))
+        ttk.Checkbutton(
+            self.advanced_frame, 
+            text="断点续传（中断后再次翻译同一文件时只翻译剩余内容）", 
+            variable=self.enable_checkpoint
+        ).grid(row=11, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
+        ttk.Label(self.advanced_frame, text="部分结果写出间隔(秒):").grid(row=12, column=0, sticky=tk.W, padx=5, pady=5)
+        self.checkpoint_flush_interval = tk.IntVar(value=self.config.get("checkpoint_flush_interval", 60))
+        ttk.Spinbox(
+            self.advanced_frame, 
+            from_=0, 
+            to=3600, 
+            increment=30, 
+            textvariable=self.checkpoint_flush_interval, 
+            width=5
+        ).grid(row=12, column=1, sticky=tk.W, padx=5, pady=5)
+    
+        # 预览设置
+        ttk.Label(self.advanced_frame, text="预览条目数:").grid(row=13, column=0, sticky=tk.W, padx=5, pady=5)
+        self.preview_sample_size = tk.IntVar(value=self.config.get("preview_sample_size", 5))
+        ttk.Spinbox(
+            self.advanced_frame, 
+            from_=1, 
+            to=50, 
+            textvariable=self.preview_sample_size, 
+            width=5
+        ).grid(row=13, column=1, sticky=tk.W, padx=5, pady=5)
     
     def toggle_api_fields(self):
         """切换API设置界面"""
@@ -168,12 +330,30 @@ class ConfigDialog:
         config_data = {
             "api_type": self.api_type.get(),
             "deeplx_url": self.deeplx_url.get(),
+            "deeplx_rpm": self.deeplx_rpm.get(),
+            "deeplx_max_concurrent": self.deeplx_max_concurrent.get(),
+            "deeplx_native_batch": self.deeplx_native_batch.get(),
             "chatgpt_base": self.chatgpt_base.get(),
             "chatgpt_key": self.chatgpt_key.get(),
             "chatgpt_model": self.chatgpt_model.get(),
             "system_prompt": self.system_prompt.get(),
-            "batch_size": self.batch_size.get(),
+            "enable_streaming": self.enable_streaming.get(),
+            "chatgpt_rpm": self.chatgpt_rpm.get(),
+            "chatgpt_tpm": self.chatgpt_tpm.get(),
+            "batch_token_budget": self.batch_token_budget.get(),
+            "max_concurrent_requests": self.max_concurrent_requests.get(),
+            "http_pool_size": self.http_pool_size.get(),
+            "http_read_timeout": self.http_read_timeout.get(),
             "enable_logging": self.enable_logging.get(),
+            "enable_translation_memory": self.enable_translation_memory.get(),
+            "incremental_mode": self.incremental_mode.get(),
+            "max_retries": self.max_retries.get(),
+            "load_balance_strategy": self.load_balance_strategy.get(),
+            "max_concurrent_files": self.max_concurrent_files.get(),
+            "resx_output_mode": self.resx_output_mode.get(),
+            "enable_checkpoint": self.enable_checkpoint.get(),
+            "checkpoint_flush_interval": self.checkpoint_flush_interval.get(),
+            "preview_sample_size": self.preview_sample_size.get(),
             "target_lang": self.config.get("target_lang", "英语"),
             "last_file_type": self.config.get("last_file_type", "RESX")
         }
@@ -1,4 +1,5 @@
 import os
+import queue
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import logging
@@ -7,6 +8,8 @@ from datetime import datetime
 from config import Config
 from services.deeplx_service import DeepLXService
 from services.chatgpt_service import ChatGPTService
+from services.log_setup import setup_logging
+from services.metrics import write_report, write_prometheus, record_throughput, history_path
 from translators.resx_translator import ResxTranslator
 from translators.ts_translator import TsTranslator
 from ui.config_dialog import ConfigDialog
@@ -22,6 +25,12 @@ class MainWindow:
         self.config = Config()
         self.setup_logging()
         
+        # 翻译服务在多次翻译之间复用，配置变更后重建
+        self.translation_service = None
+        self.translation_service_type = None
+        # 正在进行的预览使用的翻译器，预览未在进行时为None
+        self.preview_translator = None
+        
         # 创建主框架
         main_frame = ttk.Frame(master, padding="10")
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -103,8 +112,22 @@ class MainWindow:
         )
         target_lang_combo.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
         
+        # 同时翻译的其他语言，多选菜单
+        ttk.Label(trans_frame, text="同时翻译为:").grid(row=0, column=2, sticky=tk.W, padx=5, pady=5)
+        extra_langs = self.config.get("extra_target_langs", []) or []
+        self.extra_lang_vars = {}
+        self.extra_lang_button = ttk.Menubutton(trans_frame, width=12)
+        extra_lang_menu = tk.Menu(self.extra_lang_button, tearoff=0)
+        for lang in languages:
+            var = tk.BooleanVar(value=lang in extra_langs)
+            self.extra_lang_vars[lang] = var
+            extra_lang_menu.add_checkbutton(label=lang, variable=var, command=self.on_extra_langs_change)
+        self.extra_lang_button["menu"] = extra_lang_menu
+        self.extra_lang_button.grid(row=0, column=3, sticky=tk.W, padx=5, pady=5)
+        self.update_extra_lang_label()
+        
         # API设置按钮
-        ttk.Button(trans_frame, text="API设置", command=self.open_config_dialog).grid(row=0, column=2, padx=5, pady=5)
+        ttk.Button(trans_frame, text="API设置", command=self.open_config_dialog).grid(row=0, column=4, padx=5, pady=5)
         
         # 预览区域
         preview_frame = ttk.LabelFrame(main_frame, text="翻译预览", padding="5")
@@ -122,8 +145,12 @@ class MainWindow:
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(fill=tk.X, pady=10)
         
-        ttk.Button(btn_frame, text="预览翻译", command=self.preview_translation).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="执行翻译", command=self.translate_file).pack(side=tk.LEFT, padx=5)
+        self.preview_button = ttk.Button(btn_frame, text="预览翻译", command=self.preview_translation)
+        self.preview_button.pack(side=tk.LEFT, padx=5)
+        self.estimate_button = ttk.Button(btn_frame, text="预估工作量", command=self.estimate_translation)
+        self.estimate_button.pack(side=tk.LEFT, padx=5)
+        self.translate_button = ttk.Button(btn_frame, text="执行翻译", command=self.translate_file)
+        self.translate_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="退出", command=self.on_closing).pack(side=tk.RIGHT, padx=5)
         
         # 状态栏
@@ -139,17 +166,7 @@ class MainWindow:
     
     def setup_logging(self):
         """设置日志"""
-        if not os.path.exists('logs'):
-            os.makedirs('logs')
-        log_file = os.path.join('logs', f'translator_{datetime.now().strftime("%Y%m%d")}.log')
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_logging(self.config)
     
     def toggle_file_type(self):
         """切换文件类型界面"""
@@ -189,26 +206,29 @@ class MainWindow:
             for key, value in new_config.items():
                 self.config.set(key, value)
             
+            # 配置已变化，下次翻译时重建翻译服务
+            self.translation_service = None
+            
             self.status_var.set("配置已更新")
     
     def get_translation_service(self):
-        """获取翻译服务"""
+        """获取翻译服务，配置未变化时复用已有服务及其连接池"""
         api_type = self.config.get("api_type", "DeepLX")
         
-        if api_type == "DeepLX":
-            return DeepLXService(self.config)
-        else:  # ChatGPT
-            return ChatGPTService(self.config)
+        if self.translation_service is None or self.translation_service_type != api_type:
+            if api_type == "DeepLX":
+                self.translation_service = DeepLXService(self.config)
+            else:  # ChatGPT
+                self.translation_service = ChatGPTService(self.config)
+            self.translation_service_type = api_type
+        
+        # 取消标志由开始翻译或预览的方法重置，这里不清除，以免丢失仍在生效的取消请求
+        return self.translation_service
     
     def get_translator(self, file_type):
         """获取翻译器实例"""
-        # 根据配置创建翻译服务
-        api_type = self.config.get("api_type", "DeepLX")
-        
-        if api_type == "DeepLX":
-            translation_service = DeepLXService(self.config)
-        else:  # ChatGPT
-            translation_service = ChatGPTService(self.config)
+        # 根据配置获取翻译服务
+        translation_service = self.get_translation_service()
         
         # 创建翻译器
         if file_type == "RESX":
@@ -217,66 +237,178 @@ class MainWindow:
             return TsTranslator(self.config, translation_service)
     
     def preview_translation(self):
-        """预览翻译"""
+        """在后台抽样翻译预览，译文逐条显示；预览进行中再次点击按钮则取消"""
+        if self.preview_translator is not None:
+            self.preview_translator.cancel()
+            self.preview_button.config(state=tk.DISABLED)
+            self.status_var.set("正在取消预览...")
+            return
+        
         file_type = self.file_type.get()
-        translator = self.get_translator(file_type)
         
+        if file_type == "RESX":
+            file_path = self.resx_file_path.get()
+            if not file_path:
+                messagebox.showwarning("警告", "请先选择一个RESX文件")
+                return
+            header = ""
+        else:  # TS
+            folder_path = self.ts_folder_path.get()
+            filename = self.ts_filename.get()
+            
+            if not folder_path:
+                messagebox.showwarning("警告", "请先选择一个文件夹")
+                return
+            
+            if not filename:
+                messagebox.showwarning("警告", "请输入要查找的文件名")
+                return
+            
+            # 查找匹配的文件
+            import glob
+            search_pattern = os.path.join(folder_path, "**", filename)
+            matching_files = glob.glob(search_pattern, recursive=True)
+            
+            self.preview_text.delete(1.0, tk.END)
+            if not matching_files:
+                self.preview_text.insert(tk.END, f"在文件夹 {folder_path} 中未找到匹配 {filename} 的文件")
+                self.status_var.set("预览完成")
+                return
+            
+            # 预览第一个匹配的文件
+            file_path = matching_files[0]
+            header = f"找到 {len(matching_files)} 个匹配的文件，预览第一个:\n文件: {file_path}\n\n"
+        
+        translator = self.get_translator(file_type)
+        self.preview_translator = translator
         self.preview_text.delete(1.0, tk.END)
+        self.preview_text.insert(tk.END, header)
+        self.preview_button.config(text="取消预览")
+        # 预览与翻译共用服务的取消标志，预览进行中不允许开始翻译或预估
+        self.estimate_button.config(state=tk.DISABLED)
+        self.translate_button.config(state=tk.DISABLED)
         self.status_var.set("正在预览翻译...")
-        self.master.update()
         
-        try:
-            if file_type == "RESX":
-                file_path = self.resx_file_path.get()
-                if not file_path:
-                    messagebox.showwarning("警告", "请先选择一个RESX文件")
-                    self.status_var.set("就绪")
+        # 工作线程只投递事件，由界面线程定时取出显示
+        events = queue.SimpleQueue()
+        
+        def preview_thread():
+            try:
+                count = max(1, int(self.config.get("preview_sample_size", 5)))
+                try:
+                    total, sample = translator.preview_sample(file_path, count)
+                except ValueError as e:
+                    events.put(("error", str(e)))
                     return
-                
-                preview_result = translator.preview_translation(file_path)
-                self.preview_text.insert(tk.END, preview_result)
-            else:  # TS
-                folder_path = self.ts_folder_path.get()
-                filename = self.ts_filename.get()
-                
-                if not folder_path:
-                    messagebox.showwarning("警告", "请先选择一个文件夹")
-                    self.status_var.set("就绪")
+                if not sample:
+                    events.put(("error", "未找到可翻译的内容"))
                     return
+                events.put(("text", translator.format_preview_header(total, len(sample))))
                 
-                if not filename:
-                    messagebox.showwarning("警告", "请输入要查找的文件名")
-                    self.status_var.set("就绪")
-                    return
+                # 整个样本作为一个批次请求，流式响应时每条译文完成即显示
+                translations = translator.translate_preview(
+                    sample,
+                    lambda entry_id, text, translation: events.put(
+                        ("text", translator.format_preview_entry(entry_id, text, translation))
+                    )
+                )
+                for entry_id, text in sample:
+                    if entry_id not in translations:
+                        events.put(("text", translator.format_preview_entry(entry_id, text, None)))
+                events.put(("done", None))
+            except Exception as e:
+                logging.error(f"预览翻译出错: {str(e)}")
+                events.put(("error", f"预览过程中出现错误: {str(e)}"))
                 
-                # 查找匹配的文件
-                import glob
-                search_pattern = os.path.join(folder_path, "**", filename)
-                matching_files = glob.glob(search_pattern, recursive=True)
+        def pump():
+            finished = None
+            while finished is None:
+                try:
+                    kind, value = events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "text":
+                    self.preview_text.insert(tk.END, value)
+                    self.preview_text.see(tk.END)
+                else:
+                    finished = (kind, value)
                 
-                if not matching_files:
-                    self.preview_text.insert(tk.END, f"在文件夹 {folder_path} 中未找到匹配 {filename} 的文件")
-                    self.status_var.set("预览完成")
-                    return
+            if finished is None:
+                self.master.after(100, pump)
+                return
                 
-                # 预览第一个匹配的文件
-                preview_result = translator.preview_translation(matching_files[0])
+            kind, value = finished
+            cancelled = translator.cancel_translation or translator.translation_service.cancel_translation
+            if kind == "error":
+                self.preview_text.insert(tk.END, value)
+                self.status_var.set("预览失败")
+            else:
+                self.status_var.set("预览已取消" if cancelled else "预览完成")
+            self.preview_translator = None
+            self.preview_button.config(text="预览翻译", state=tk.NORMAL)
+            self.estimate_button.config(state=tk.NORMAL)
+            self.translate_button.config(state=tk.NORMAL)
                 
-                self.preview_text.insert(tk.END, f"找到 {len(matching_files)} 个匹配的文件，预览第一个:\n")
-                self.preview_text.insert(tk.END, f"文件: {matching_files[0]}\n\n")
-                self.preview_text.insert(tk.END, preview_result)
-            
-            self.status_var.set("预览完成")
-        except Exception as e:
-            self.preview_text.insert(tk.END, f"预览过程中出现错误: {str(e)}")
-            self.status_var.set("预览失败")
-            logging.error(f"预览翻译出错: {str(e)}")
+        import threading
+        thread = threading.Thread(target=preview_thread)
+        thread.daemon = True
+        thread.start()
+        self.master.after(100, pump)
+    
+    def estimate_translation(self):
+        """不调用接口，预估请求数、token数和耗时，显示在预览区域"""
+        file_type = self.file_type.get()
+        translator = self.get_translator(file_type)
+        target_langs = self.get_target_langs()
+        
+        if file_type == "RESX":
+            file_path = self.resx_file_path.get()
+            if not file_path:
+                messagebox.showwarning("警告", "请先选择一个RESX文件")
+                return
+            # 按默认的输出位置预估，增量模式和断点日志以这些文件为准
+            name, ext = os.path.splitext(file_path)
+            outputs = {lang: f"{name}.{translator.get_language_code(lang)}{ext}" for lang in target_langs}
+            estimate_task = lambda: translator.estimate_file_languages(file_path, outputs)
+        else:  # TS
+            folder_path = self.ts_folder_path.get()
+            filename = self.ts_filename.get()
+            if not folder_path or not filename:
+                messagebox.showwarning("警告", "请先选择文件夹并输入要查找的文件名")
+                return
+            estimate_task = lambda: translator.estimate_folder(folder_path, filename, target_langs)
+        
+        self.preview_text.delete(1.0, tk.END)
+        self.status_var.set("正在预估...")
+        
+        def show(text, status):
+            self.preview_text.delete(1.0, tk.END)
+            self.preview_text.insert(tk.END, text)
+            self.status_var.set(status)
+        
+        # 解析大文件需要时间，在后台线程中进行，界面保持响应
+        def estimate_thread():
+            try:
+                estimate = estimate_task()
+                text = f"预估（{'、'.join(target_langs)}，不调用翻译接口）:\n\n" + translator.format_estimate(estimate)
+                self.master.after(0, lambda: show(text, "预估完成"))
+            except Exception as e:
+                logging.error(f"预估出错: {str(e)}")
+                # except块结束后e会被删除，先生成消息再交给回调
+                msg = f"预估过程中出现错误: {str(e)}"
+                self.master.after(0, lambda: show(msg, "预估失败"))
+        
+        import threading
+        thread = threading.Thread(target=estimate_thread)
+        thread.daemon = True
+        thread.start()
     
     def translate_file(self):
         """执行翻译"""
         file_type = self.file_type.get()
         translator = self.get_translator(file_type)
         target_lang = self.target_lang.get()
+        target_langs = self.get_target_langs()
         
         try:
             if file_type == "RESX":
@@ -306,23 +438,41 @@ class MainWindow:
                 if not output_path:  # 用户取消了保存对话框
                     return
                 
+                # 其他语言保存在同一目录，命名为 名称.语言代码.resx
+                output_dir = os.path.dirname(output_path)
+                outputs = {target_lang: output_path}
+                for lang in target_langs[1:]:
+                    outputs[lang] = os.path.join(output_dir, f"{name}.{translator.get_language_code(lang)}{ext}")
+                
+                # 每次翻译单独统计性能指标
+                translator.translation_service.metrics.reset()
+                
                 # 显示进度对话框
-                progress_dialog = ProgressDialog(self.master, "翻译进度")
+                progress_dialog = ProgressDialog(self.master, "翻译进度", translator.translation_service.metrics)
                 progress_dialog.set_cancel_callback(translator.cancel)
                 
                 # 执行翻译
                 def translate_thread():
                     try:
-                        success, message = translator.translate_file(
-                            file_path, 
-                            output_path, 
-                            progress_dialog.update_progress
-                        )
+                        if len(outputs) > 1:
+                            # 源文件只解析一次，所有语言共用同一个并发请求池
+                            success, message = translator.translate_file_to_languages(
+                                file_path,
+                                outputs,
+                                progress_dialog.update_progress
+                            )
+                        else:
+                            success, message = translator.translate_file(
+                                file_path, 
+                                output_path, 
+                                progress_dialog.update_progress
+                            )
                         
                         # 在主线程中更新UI
                         self.master.after(0, lambda: self.handle_translation_result(success, message, progress_dialog))
                     except Exception as e:
-                        self.master.after(0, lambda: self.handle_translation_error(str(e), progress_dialog))
+                        error_message = str(e)
+                        self.master.after(0, lambda: self.handle_translation_error(error_message, progress_dialog))
                 
                 import threading
                 thread = threading.Thread(target=translate_thread)
@@ -345,8 +495,11 @@ class MainWindow:
                 if not messagebox.askyesno("确认", f"确定要扫描文件夹 {folder_path} 并翻译所有匹配 {filename} 的文件吗?"):
                     return
                 
+                # 每次翻译单独统计性能指标
+                translator.translation_service.metrics.reset()
+                
                 # 显示进度对话框
-                progress_dialog = ProgressDialog(self.master, "翻译进度")
+                progress_dialog = ProgressDialog(self.master, "翻译进度", translator.translation_service.metrics)
                 progress_dialog.set_cancel_callback(translator.cancel)
                 
                 # 执行翻译
@@ -355,14 +508,15 @@ class MainWindow:
                         success, message = translator.scan_folder(
                             folder_path, 
                             filename, 
-                            target_lang, 
+                            target_langs if len(target_langs) > 1 else target_lang, 
                             progress_dialog.update_progress
                         )
                         
                         # 在主线程中更新UI
                         self.master.after(0, lambda: self.handle_translation_result(success, message, progress_dialog))
                     except Exception as e:
-                        self.master.after(0, lambda: self.handle_translation_error(str(e), progress_dialog))
+                        error_message = str(e)
+                        self.master.after(0, lambda: self.handle_translation_error(error_message, progress_dialog))
                 
                 import threading
                 thread = threading.Thread(target=translate_thread)
@@ -378,6 +532,11 @@ class MainWindow:
         """处理翻译结果"""
         progress_dialog.close()
         
+        # 附加本次运行的性能统计
+        metrics_text = self.save_run_metrics()
+        if metrics_text:
+            message += f"\n\n{metrics_text}"
+        
         if success:
             messagebox.showinfo("成功", message)
             self.status_var.set("翻译完成")
@@ -385,6 +544,28 @@ class MainWindow:
             messagebox.showwarning("警告", message)
             self.status_var.set("翻译未完成")
     
+    def save_run_metrics(self):
+        """按配置保存本次运行的指标报告，返回界面中显示的简要统计"""
+        service = self.translation_service
+        if service is None:
+            return ""
+        metrics = service.metrics
+        if self.config.get("save_run_report", True):
+            report = dict(metrics.report(), api_type=self.config.get("api_type", "DeepLX"))
+            write_report(os.path.join("logs", f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"), report)
+        prometheus_path = self.config.get("metrics_prometheus_path", "")
+        if prometheus_path:
+            write_prometheus(prometheus_path, metrics.to_prometheus({"backend": service.backend}))
+        # 记录实测速度，供之后预估耗时
+        record_throughput(
+            history_path(self.config),
+            service.backend,
+            getattr(service, "model_name", ""),
+            metrics.report(),
+            service.request_concurrency()
+        )
+        return metrics.summary_text()
+    
     def handle_translation_error(self, error_message, progress_dialog):
         """处理翻译错误"""
         progress_dialog.close()
@@ -400,4 +581,28 @@ class MainWindow:
         """当目标语言改变时自动保存配置"""
         selected_lang = self.target_lang.get()
         self.config.set("target_lang", selected_lang)
-        self.status_var.set(f"目标语言已设置为: {selected_lang}") 
\ No newline at end of file
+        self.status_var.set(f"目标语言已设置为: {selected_lang}")
+    
+    def get_target_langs(self):
+        """目标语言在前，其后为同时翻译的其他语言"""
+        target_lang = self.target_lang.get()
+        return [target_lang] + [
+            lang for lang, var in self.extra_lang_vars.items() if var.get() and lang != target_lang
+        ]
+    
+    def update_extra_lang_label(self):
+        selected = [lang for lang, var in self.extra_lang_vars.items() if var.get()]
+        if not selected:
+            text = "无"
+        elif len(selected) <= 2:
+            text = "、".join(selected)
+        else:
+            text = f"{len(selected)} 个语言"
+        self.extra_lang_button.config(text=text)
+    
+    def on_extra_langs_change(self):
+        """其他目标语言改变时自动保存配置"""
+        selected = [lang for lang, var in self.extra_lang_vars.items() if var.get()]
+        self.config.set("extra_target_langs", selected)
+        self.update_extra_lang_label()
+        self.status_var.set(f"同时翻译为: {'、'.join(selected) or '无'}")
\ No newline at end of file
@@ -1,17 +1,33 @@
+import time
+import queue
 import tkinter as tk
+from collections import deque
 from tkinter import ttk
 
+# 界面线程合并显示进度的间隔（毫秒）
+PUMP_INTERVAL_MS = 100
+
+# 计算速度和剩余时间时使用最近多少秒的进度
+RATE_WINDOW_SECONDS = 10
+
 class ProgressDialog:
-    def __init__(self, parent, translator=None):
+    def __init__(self, parent, translator=None, metrics=None):
         self.parent = parent
         self.translator = translator
+        # 翻译服务的性能指标，用于显示速度、进行中的请求数和失败数
+        self.metrics = metrics
         self.dialog = None
+        # 工作线程只向队列投递进度事件，Tk控件只在界面线程中更新
+        self._events = queue.SimpleQueue()
+        self._samples = deque()
+        self._after_id = None
         self.setup_ui()
+        self._after_id = self.dialog.after(PUMP_INTERVAL_MS, self._pump)
     
     def setup_ui(self):
         self.dialog = tk.Toplevel(self.parent)
         self.dialog.title("处理中")
-        self.dialog.geometry("400x170")
+        self.dialog.geometry("400x215")
         self.dialog.resizable(False, False)
         self.dialog.transient(self.parent)
         self.dialog.grab_set()
@@ -25,7 +41,7 @@ class ProgressDialog:
         self.dialog.geometry('{}x{}+{}+{}'.format(width, height, x, y))
         
         # 进度信息
-        self.status_label = ttk.Label(self.dialog, text="准备中...")
+        self.status_label = ttk.Label(self.dialog, text="准备中...", wraplength=360, justify=tk.CENTER)
         self.status_label.pack(pady=(20, 5))
         
         self.progress_text = ttk.Label(self.dialog, text="0%")
@@ -41,6 +57,10 @@ class ProgressDialog:
         )
         self.progress_bar.pack(pady=5, padx=20)
         
+        # 速度、进行中的请求、失败数和剩余时间
+        self.stats_label = ttk.Label(self.dialog, text="", wraplength=360, justify=tk.CENTER)
+        self.stats_label.pack(pady=(0, 5))
+        
         # 取消按钮
         self.cancel_button = ttk.Button(
             self.dialog, 
@@ -53,14 +73,62 @@ class ProgressDialog:
         self.dialog.protocol("WM_DELETE_WINDOW", self.on_cancel)
     
     def update_progress(self, progress, current, total, status=None):
-        """更新进度信息"""
-        self.progress_var.set(progress)
-        self.progress_text.config(text=f"{progress:.1f}% ({current}/{total})")
+        """更新进度信息，可以在多个线程中调用，事件在界面线程中定时合并显示"""
+        self._events.put((progress, current, total, status))
+    
+    def _pump(self):
+        """界面线程定时取出队列中的所有进度事件，只按最新的进度刷新一次"""
+        latest = None
+        status = None
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            latest = event
+            if event[3]:
+                status = event[3]
         
-        if status:
-            self.status_label.config(text=status)
+        if latest:
+            progress, current, total, _ = latest
+            self.progress_var.set(progress)
+            self.progress_text.config(text=f"{progress:.1f}% ({current}/{total})")
+            if status:
+                self.status_label.config(text=status)
+            self._samples.append((time.monotonic(), progress, self._processed(current)))
+        self._update_stats()
+            
+        self._after_id = self.dialog.after(PUMP_INTERVAL_MS, self._pump)
+    
+    def _processed(self, current):
+        """已处理的条目数，有性能指标时使用指标中的实时计数，否则使用回调中的数量"""
+        if self.metrics is not None:
+            return self.metrics.snapshot()["entries_processed"]
+        return current
+    
+    def _update_stats(self):
+        now = time.monotonic()
+        while len(self._samples) > 2 and now - self._samples[1][0] > RATE_WINDOW_SECONDS:
+            self._samples.popleft()
         
-        self.dialog.update()
+        parts = []
+        if len(self._samples) >= 2:
+            (start, start_progress, start_count), (end, progress, count) = self._samples[0], self._samples[-1]
+            elapsed = end - start
+            if elapsed > 0:
+                parts.append(f"{(count - start_count) / elapsed:.1f} 条/秒")
+                speed = (progress - start_progress) / elapsed
+                if speed > 0 and progress < 100:
+                    minutes, seconds = divmod(int((100 - progress) / speed), 60)
+                    parts.append(f"剩余约 {minutes} 分 {seconds} 秒" if minutes else f"剩余约 {seconds} 秒")
+        if self.metrics is not None:
+            snapshot = self.metrics.snapshot()
+            parts.append(f"进行中请求: {snapshot['inflight']}")
+            failures = f"失败: {snapshot['entries_unresolved']} 条"
+            if snapshot["retries"]:
+                failures += f"，重试 {snapshot['retries']} 次"
+            parts.append(failures)
+        self.stats_label.config(text="  |  ".join(parts))
     
     def set_cancel_callback(self, callback):
         """设置取消回调函数"""
@@ -78,6 +146,9 @@ class ProgressDialog:
     def close(self):
         """关闭对话框"""
         if self.dialog:
+            if self._after_id is not None:
+                self.dialog.after_cancel(self._after_id)
+                self._after_id = None
             self.dialog.grab_release()
             self.dialog.destroy()
     